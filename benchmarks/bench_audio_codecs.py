@@ -0,0 +1,73 @@
+"""
+Bytes and CPU per streamed second of audio for each browser-leg codec (?codec=).
+
+Assistant audio starts as the realtime API's deltas (PCM16, or mu-law for
+g711_ulaw) and is encoded to the wire per frame; microphone frames are decoded
+back to PCM16 for VAD. SNR is of the wire round trip against the source.
+
+    python -m benchmarks.bench_audio_codecs --seconds 30 --delta-ms 40
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src_v1.audio_codecs import CODECS, mulaw_encode
+from src_v1.wire import HEADER_SIZE
+
+
+def speech_like(seconds, fs, rng):
+    """Harmonics under a syllable-rate envelope, plus a little noise."""
+    t = np.arange(int(seconds * fs)) / fs
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / fs
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    signal = 6000 * voice * envelope + rng.normal(0, 200, len(t))
+    return np.clip(signal, -32768, 32767).astype('<i2')
+
+
+def cpu(fn, frames, repeat=5):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = [fn(frame) for frame in frames]
+        best = min(best, time.process_time() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--delta-ms', type=int, default=40)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{args.seconds:.0f}s of audio in {args.delta_ms} ms frames")
+    print(f"{'codec':10s} {'rate':>6s} {'KB/s':>8s} {'vs pcm16':>9s} {'encode us/s':>12s} "
+          f"{'decode us/s':>12s} {'SNR dB':>7s}")
+    baseline = None
+    for name, codec in CODECS.items():
+        source = speech_like(args.seconds, codec.sample_rate, rng)
+        samples = codec.sample_rate * args.delta_ms // 1000
+        pcm_frames = [source[i:i + samples].tobytes() for i in range(0, len(source), samples)]
+        # What the realtime API sends for this codec
+        upstream = pcm_frames if codec.upstream_format == 'pcm16' else [mulaw_encode(f) for f in pcm_frames]
+
+        encode_cpu, wire = cpu(codec.to_wire, upstream)
+        decode_cpu, decoded = cpu(codec.from_wire, wire)
+        size = sum(HEADER_SIZE + len(frame) for frame in wire) / args.seconds
+        baseline = baseline or size
+
+        received = np.frombuffer(b''.join(decoded), dtype='<i2').astype(np.float64)
+        error = received - source.astype(np.float64)
+        noise = np.sum(error ** 2)
+        snr = 10 * np.log10(np.sum(source.astype(np.float64) ** 2) / noise) if noise else np.inf
+        print(f"{name:10s} {codec.sample_rate:6d} {size / 1024:8.1f} {size / baseline:8.0%} "
+              f"{encode_cpu / args.seconds * 1e6:12.1f} {decode_cpu / args.seconds * 1e6:12.1f} {snr:7.1f}")
+
+
+if __name__ == '__main__':
+    main()
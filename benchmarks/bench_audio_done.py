@@ -0,0 +1,98 @@
+"""
+End-of-turn audio path: base64 string accumulation + WAV re-send vs streaming only.
+
+Replays one assistant response of --seconds audio in --delta-ms deltas through
+the old and new server paths and reports peak Python memory (tracemalloc),
+bytes written to the browser socket and CPU time per turn.
+
+    python -m benchmarks.bench_audio_done --seconds 30
+"""
+
+import argparse
+import base64
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from src_v1.codec import base64_to_pcm16, pcm16_to_base64, pcm16_to_wav
+from src_v1.turn_store import TurnAudioStore
+
+FS = 24000
+
+
+class _Holder:
+    pass
+
+
+def legacy_turn(deltas):
+    """RealtimeOpenAIClient._total_audio_data + accumulated_pcm_base64 + WAV re-send."""
+    client, manager = _Holder(), _Holder()
+    client.total = ''
+    manager.accumulated = ''
+    wire = 0
+    for delta in deltas:
+        client.total += delta
+        wire += len(json.dumps({"type": "audio_chunk", "audio": delta}))
+        manager.accumulated += delta
+    wav_base64 = base64.b64encode(pcm16_to_wav(base64.b64decode(manager.accumulated), FS)).decode('ascii')
+    wire += len(json.dumps({"type": "audio_chunk", "audio": wav_base64}))
+    wire += len(json.dumps({"type": "audio_response_done"}))
+    return wire
+
+
+def streaming_turn(deltas, replay):
+    """Current path: deltas streamed as they arrive, decoded PCM kept only for replay sessions."""
+    store = TurnAudioStore()
+    wire = 0
+    for delta in deltas:
+        wire += len(json.dumps({"type": "audio_chunk", "audio": delta}))
+        if replay:
+            store.append('bench', 1, base64_to_pcm16(delta))
+    wire += len(json.dumps({"type": "audio_response_done", "turn_id": 1}))
+    return wire, store
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.process_time()
+    result = fn(*args)
+    cpu = time.process_time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, cpu, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--delta-ms', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    samples_per_delta = FS * args.delta_ms // 1000
+    count = int(args.seconds * 1000 / args.delta_ms)
+    deltas = [pcm16_to_base64(rng.integers(-8000, 8000, samples_per_delta, dtype='<i2').tobytes())
+              for _ in range(count)]
+
+    rows = []
+    wire, cpu, peak = measure(legacy_turn, deltas)
+    rows.append(('legacy (concat + WAV re-send)', wire, cpu, peak))
+    (wire, _), cpu, peak = measure(streaming_turn, deltas, False)
+    rows.append(('streamed, replay off', wire, cpu, peak))
+    (wire, store), cpu, peak = measure(streaming_turn, deltas, True)
+    rows.append(('streamed, replay on', wire, cpu, peak))
+    wav_start = time.process_time()
+    store.wav_bytes('bench', 1)
+    wav_ms = (time.process_time() - wav_start) * 1000
+
+    print(f"{args.seconds:.0f}s response, {count} deltas of {args.delta_ms} ms")
+    print(f"{'path':32s} {'wire KB':>10s} {'cpu ms':>10s} {'peak KB':>10s}")
+    for name, wire, cpu, peak in rows:
+        print(f"{name:32s} {wire / 1024:10.1f} {cpu * 1000:10.1f} {peak / 1024:10.1f}")
+    print(f"lazy WAV build on GET /turns/...: {wav_ms:.1f} ms (only when requested)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Cost of capturing one utterance frame by frame: `bytes += frame` vs CaptureBuffer.
+
+Reports total CPU and the worst single append (what the audio callback sees
+at the end of a long turn).
+
+    python -m benchmarks.bench_capture --seconds 30 --pre-roll-ms 300
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src_v1.capture import CaptureBuffer
+
+FS = 24000
+FRAME = 720  # 30 ms
+
+
+def concat(frames, speech, seconds, pre_roll_ms):
+    audio_buffer = b''
+    worst = 0.0
+    for frame, is_speech in zip(frames, speech):
+        start = time.perf_counter()
+        if is_speech:
+            audio_buffer += frame
+        worst = max(worst, time.perf_counter() - start)
+    return len(audio_buffer), worst
+
+
+def capture(frames, speech, seconds, pre_roll_ms):
+    audio_buffer = CaptureBuffer(seconds, FS, pre_roll_ms)
+    worst = 0.0
+    for frame, is_speech in zip(frames, speech):
+        start = time.perf_counter()
+        audio_buffer.push(frame, is_speech)
+        worst = max(worst, time.perf_counter() - start)
+    return audio_buffer.nbytes, worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--pre-roll-ms', type=int, default=300)
+    parser.add_argument('--speech-ratio', type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    count = int(args.seconds * FS / FRAME)
+    frames = [rng.integers(-8000, 8000, FRAME, dtype='<i2').tobytes() for _ in range(count)]
+    speech = rng.random(count) < args.speech_ratio
+
+    print(f"{count} frames of 30 ms ({args.seconds:.0f}s), {speech.mean() * 100:.0f}% speech")
+    print(f"{'buffer':14s} {'cpu ms':>10s} {'worst append us':>16s} {'captured KB':>12s}")
+    for name, fn in (('bytes +=', concat), ('CaptureBuffer', capture)):
+        start = time.process_time()
+        size, worst = fn(frames, speech, args.seconds, args.pre_roll_ms)
+        cpu = time.process_time() - start
+        print(f"{name:14s} {cpu * 1000:10.1f} {worst * 1e6:16.1f} {size / 1024:12.0f}")
+
+
+if __name__ == '__main__':
+    main()
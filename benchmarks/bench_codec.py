@@ -0,0 +1,66 @@
+"""
+Microbenchmark: per-sample struct.pack PCM encoder vs the NumPy codec.
+
+Run from the repository root:
+    python -m benchmarks.bench_codec [--seconds 30]
+"""
+
+import argparse
+import base64
+import struct
+import time
+
+import numpy as np
+
+from src_v1.codec import float32_to_pcm16, float32_to_base64, pcm16_to_base64
+
+FS = 24000
+
+
+def legacy_float_to_16bit_pcm(float32_array):
+    clipped = [max(-1.0, min(1.0, x)) for x in float32_array]
+    return b''.join(struct.pack('<h', int(x * 32767)) for x in clipped)
+
+
+def legacy_send_path(pcm_bytes):
+    # record_with_vad_auto_send: int16 -> float32 -> per-sample pack -> base64
+    audio_np = np.frombuffer(pcm_bytes, dtype=np.int16).astype(np.float32) / 32767.0
+    return base64.b64encode(legacy_float_to_16bit_pcm(audio_np)).decode('ascii')
+
+
+def timeit(fn, arg, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=30.0, help='utterance length in seconds')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(int(FS * args.seconds)) * 0.4).astype(np.float32)
+    pcm = float32_to_pcm16(audio)
+
+    assert legacy_float_to_16bit_pcm(audio) == float32_to_pcm16(audio), 'encoder output differs'
+
+    cases = [
+        ('float->pcm16 (struct.pack)', legacy_float_to_16bit_pcm, audio),
+        ('float->pcm16 (numpy)', float32_to_pcm16, audio),
+        ('float->base64 (numpy)', float32_to_base64, audio),
+        ('send_audio (legacy round-trip)', legacy_send_path, pcm),
+        ('send_audio (pcm16->base64)', pcm16_to_base64, pcm),
+    ]
+    print(f"{'case':34s} {'total ms':>10s} {'ms / audio s':>14s}")
+    for name, fn, arg in cases:
+        elapsed = timeit(fn, arg, args.repeat)
+        print(f"{name:34s} {elapsed * 1000:10.2f} {elapsed * 1000 / args.seconds:14.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Per-turn latency vs conversation length, with and without a context window.
+
+Runs the mock realtime server in-process with --think-ms-per-ktoken, so a
+response starts later the more (estimated) tokens the conversation holds,
+like a model that reads the whole conversation for every answer. One asyncio
+realtime client sends --turns prompts with --user-audio-s seconds of audio
+each and measures prompt sent -> first audio delta, for:
+
+    unbounded      - every turn stays in the conversation (today's behaviour)
+    turns=N        - ConversationWindow(max_turns=N)
+    tokens=N+sum   - ConversationWindow(max_tokens=N, summarize=True)
+
+The chart shows the latency of every --every-th turn per configuration, and
+the summary the growth per 10 turns (least-squares slope) and the tokens
+left in the conversation at the end. --csv writes every turn.
+
+    python -m benchmarks.bench_context_window --turns 40
+    python -m benchmarks.bench_context_window --turns 60 --think-ms-per-ktoken 400 --csv context.csv
+"""
+
+import argparse
+import asyncio
+import base64
+import csv
+
+import numpy as np
+
+from src_v1.async_backend import AsyncRealtimeOpenAIClient
+from src_v1.conversation_window import ConversationWindow
+from src_v1.mock_realtime import MockRealtimeServer
+
+
+async def run_conversation(uri, turns, user_audio_s, window):
+    """[(first audio ms, tokens in the conversation when the prompt was sent)] per turn"""
+    loop = asyncio.get_running_loop()
+    first_audio = None
+    client = AsyncRealtimeOpenAIClient(api_key='bench', api_version='bench', deployment_name='bench', uri=uri,
+                                       retain_audio=False)
+
+    def on_audio(delta):
+        if first_audio is not None and not first_audio.done():
+            first_audio.set_result(loop.time())
+    client.audio_callback = on_audio
+    await client.connect()
+    client.set_context_window(window)
+    audio_b64 = base64.b64encode(bytes(int(user_audio_s * 24000) * 2)).decode('ascii')
+    results = []
+    try:
+        for _ in range(turns):
+            tokens = window.usage()[2]
+            first_audio = loop.create_future()
+            sent = loop.time()
+            client.send_prompt('', audio_base64=audio_b64)
+            first = await asyncio.wait_for(first_audio, timeout=60)
+            while client.response_active:
+                # response.done trims the conversation before the next turn
+                await asyncio.sleep(0.005)
+            results.append(((first - sent) * 1000, tokens))
+    finally:
+        await client.aclose()
+    return results
+
+
+def slope_per_10_turns(latencies):
+    turns = np.arange(len(latencies))
+    return float(np.polyfit(turns, latencies, 1)[0]) * 10 if len(latencies) > 1 else float('nan')
+
+
+async def run(args):
+    mock = await MockRealtimeServer(port=0, delta_count=args.delta_count, delta_ms=args.delta_ms,
+                                    think_ms=args.think_ms, think_ms_per_ktoken=args.think_ms_per_ktoken).start()
+    configs = [
+        ('unbounded', lambda: ConversationWindow()),
+        (f'turns={args.max_turns}', lambda: ConversationWindow(max_turns=args.max_turns)),
+        (f'tokens={args.max_tokens}+sum', lambda: ConversationWindow(max_tokens=args.max_tokens, summarize=True)),
+    ]
+    results = {}
+    try:
+        for name, make_window in configs:
+            window = make_window()
+            results[name] = (await run_conversation(mock.uri, args.turns, args.user_audio_s, window), window)
+    finally:
+        await mock.stop()
+
+    print(f"{args.turns} turns, {args.user_audio_s:.1f} s user audio + {args.delta_count * args.delta_ms / 1000:.1f} s "
+          f"answer each; mock think {args.think_ms} ms + {args.think_ms_per_ktoken} ms per 1k tokens")
+    width = 30
+    peak = max(ms for rows, _ in results.values() for ms, _ in rows)
+    print(f"\nfirst audio (ms) by turn, one bar per configuration ({', '.join(results)})")
+    for turn in range(0, args.turns, args.every):
+        for i, (name, (rows, _)) in enumerate(results.items()):
+            ms = rows[turn][0]
+            label = f"{turn + 1:5d}" if i == 0 else ' ' * 5
+            print(f"{label} {name:>16s} {ms:7.0f} {'#' * max(1, round(ms / peak * width))}")
+    print(f"\n{'window':>16s} {'first':>7s} {'last':>7s} {'+ms/10 turns':>13s} {'tokens at end':>14s} "
+          f"{'evicted turns':>14s}")
+    for name, (rows, window) in results.items():
+        latencies = [ms for ms, _ in rows]
+        stats = window.stats()
+        print(f"{name:>16s} {latencies[0]:7.0f} {latencies[-1]:7.0f} {slope_per_10_turns(latencies):13.1f} "
+              f"{stats['tokens']:14d} {stats['evicted_turns']:14d}")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['turn'] + [f'{name} {column}' for name in results for column in ('ms', 'tokens')])
+            for turn in range(args.turns):
+                writer.writerow([turn + 1] + [round(value, 1) for rows, _ in results.values() for value in rows[turn]])
+        print(f"\nper-turn results written to {args.csv}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=40)
+    parser.add_argument('--every', type=int, default=5, help='chart every n-th turn')
+    parser.add_argument('--user-audio-s', type=float, default=3.0)
+    parser.add_argument('--delta-count', type=int, default=10)
+    parser.add_argument('--delta-ms', type=int, default=50)
+    parser.add_argument('--think-ms', type=int, default=300)
+    parser.add_argument('--think-ms-per-ktoken', type=float, default=250)
+    parser.add_argument('--max-turns', type=int, default=6)
+    parser.add_argument('--max-tokens', type=int, default=400)
+    parser.add_argument('--csv', help='write per-turn latency and tokens to this file')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
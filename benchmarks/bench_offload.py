@@ -0,0 +1,80 @@
+"""
+Event loop lag while large turns finish: CPU-bound work inline vs through the Offloader.
+
+Each of --turns concurrent "turns" does what the server does at the end of a long
+answer: build the replay WAV of --seconds of audio, encode its audio as coalesced
+ADPCM frames and format a long answer text. Meanwhile LoopLagMonitor measures how
+late the loop runs its timers - the delay every other session's audio deltas see.
+
+    python -m benchmarks.bench_offload --turns 8 --seconds 30
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from src_v1.audio_codecs import adpcm_encode
+from src_v1.metrics import LoopLagMonitor
+from src_v1.offload import Offloader
+from src_v1.text_format import format_text
+from src_v1.turn_store import build_wav
+
+FS = 24000
+FRAME_MS = 120  # a coalesced outbound frame
+
+
+async def turn(offload, chunks, frames, text):
+    await offload.thread(build_wav, chunks, FS, size=sum(len(chunk) for chunk in chunks), name='replay_wav')
+    for frame in frames:
+        await offload.thread(adpcm_encode, frame, name='encode_audio')
+    await offload.process(format_text, text, size=len(text), name='format_text')
+
+
+async def run(args, threads, processes, chunks, frames, text):
+    offload = Offloader(threads=threads, processes=processes, min_bytes=args.min_bytes)
+    # Warm the pools up so startup is not counted
+    await asyncio.gather(offload.thread(len, b''), offload.process(len, ''))
+    monitor = LoopLagMonitor(interval=args.interval_ms / 1000)
+    monitor.start()
+    await asyncio.sleep(args.interval_ms / 1000 * 3)
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(offload, chunks, frames, text) for _ in range(args.turns)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(args.interval_ms / 1000 * 2)
+    monitor.stop()
+    offload.shutdown()
+    return elapsed, monitor.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=8, help='large turns finishing at the same time')
+    parser.add_argument('--seconds', type=float, default=30.0, help='audio per turn')
+    parser.add_argument('--text-kb', type=int, default=64, help='answer text per turn')
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--min-bytes', type=int, default=32768)
+    parser.add_argument('--interval-ms', type=float, default=10.0, help='loop lag probe period')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pcm = rng.integers(-8000, 8000, int(args.seconds * FS), dtype='<i2').tobytes()
+    delta = FS * 40 // 1000 * 2
+    chunks = [pcm[i:i + delta] for i in range(0, len(pcm), delta)]
+    frame = FS * FRAME_MS // 1000 * 2
+    frames = [pcm[i:i + frame] for i in range(0, len(pcm), frame)]
+    text = ("คำตอบ **ตัวหนา** และ *ตัวเอียง* 1. ข้อแรก 2. ข้อสอง\n" * (args.text_kb * 1024 // 64))
+
+    print(f"{args.turns} turns x {args.seconds:.0f}s audio + {args.text_kb} KB text, probe every {args.interval_ms} ms")
+    print(f"{'executor':22s} {'wall s':>7s} {'lag p50':>8s} {'lag p99':>8s} {'lag max':>8s}")
+    for name, threads, processes in (('inline', 0, 0),
+                                     (f'{args.threads} threads', args.threads, 0),
+                                     (f'{args.threads}t + {args.processes} processes', args.threads, args.processes)):
+        elapsed, lag = asyncio.run(run(args, threads, processes, chunks, frames, text))
+        print(f"{name:22s} {elapsed:7.2f} {lag['p50_ms']:8.2f} {lag['p99_ms']:8.2f} {lag['max_ms']:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Outbound path to one browser: a task per delta vs the per-session OutboundSender.
+
+A fake WebSocket writes one message at a time and takes `--send-ms` (+/- jitter)
+per message, so a value above the delta cadence emulates a slow browser.
+Reports messages sent, frames delivered out of order, peak pending messages
+(tasks or queue depth), the worst enqueue -> sent lag and the deltas the sender
+coalesced. "+ text" also queues a text_delta after every audio delta, as the
+transcript streams alongside the audio.
+
+    python -m benchmarks.bench_outbound --deltas 500 --delta-ms 20 --send-ms 30
+    python -m benchmarks.bench_outbound --max-queue 8 --max-lag-ms 200
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from src_v1.codec import base64_to_pcm16, pcm16_to_base64
+from src_v1.outbound import OutboundSender
+from src_v1.wire import FRAME_AUDIO_OUT, PROTOCOL_BINARY, pack_frame, unpack_frame
+
+
+class SlowWebSocket:
+    def __init__(self, send_ms, jitter_ms):
+        self.send_ms = send_ms
+        self.jitter_ms = jitter_ms
+        self.seqs = []
+        self.texts = 0
+        self.lock = asyncio.Lock()
+
+    async def _wait(self):
+        async with self.lock:
+            await asyncio.sleep(max(0.0, self.send_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+    async def send_bytes(self, data):
+        await self._wait()
+        self.seqs.append(unpack_frame(data)[3])
+
+    async def send_text(self, text):
+        await self._wait()
+        self.texts += 1
+
+
+def out_of_order(seqs):
+    return sum(1 for a, b in zip(seqs, seqs[1:]) if b < a)
+
+
+async def task_per_delta(deltas, args):
+    ws = SlowWebSocket(args.send_ms, args.jitter_ms)
+    pending = set()
+    peak = 0
+    lags = []
+
+    async def send(seq, enqueued):
+        await ws.send_bytes(pack_frame(FRAME_AUDIO_OUT, 1, seq, base64_to_pcm16(deltas[seq])))
+        lags.append((time.monotonic() - enqueued) * 1000)
+
+    for seq in range(len(deltas)):
+        task = asyncio.create_task(send(seq, time.monotonic()))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        peak = max(peak, len(pending))
+        await asyncio.sleep(args.delta_ms / 1000)
+    await asyncio.gather(*pending)
+    return len(ws.seqs), out_of_order(ws.seqs), peak, max(lags), None
+
+
+async def outbound_sender(deltas, args, text=False):
+    ws = SlowWebSocket(args.send_ms, args.jitter_ms)
+    sender = OutboundSender(ws, PROTOCOL_BINARY, max_queue=args.max_queue, coalesce_ms=args.coalesce_ms,
+                            max_lag_ms=args.max_lag_ms)
+    sender.start()
+    peak = 0
+    for chunk in deltas:
+        sender.send_audio(1, chunk)
+        if text:
+            sender.send_json({"type": "text_delta", "turn_id": 1, "text": "word "})
+        peak = max(peak, sender.depth)
+        await asyncio.sleep(args.delta_ms / 1000)
+    while sender.depth:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep((args.send_ms + args.jitter_ms) / 1000 * 2)
+    sender.close()
+    stats = sender.stats()
+    return len(ws.seqs) + ws.texts, out_of_order(ws.seqs), peak, stats["max_lag_ms"], stats["coalesced"] + stats["text_coalesced"]
+
+
+async def outbound_sender_text(deltas, args):
+    return await outbound_sender(deltas, args, text=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--deltas', type=int, default=500)
+    parser.add_argument('--delta-ms', type=int, default=20, help='upstream delta cadence (and audio per delta)')
+    parser.add_argument('--send-ms', type=float, default=30.0, help='time the browser socket takes per message')
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--max-queue', type=int, default=256)
+    parser.add_argument('--max-lag-ms', type=int, default=2000)
+    parser.add_argument('--coalesce-ms', type=int, default=120)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    samples = 24000 * args.delta_ms // 1000
+    deltas = [pcm16_to_base64(rng.integers(-8000, 8000, samples, dtype='<i2').tobytes()) for _ in range(args.deltas)]
+
+    print(f"{args.deltas} deltas every {args.delta_ms} ms, socket send {args.send_ms}+/-{args.jitter_ms} ms")
+    print(f"{'path':21s} {'messages':>9s} {'reordered':>10s} {'peak pending':>13s} {'max lag ms':>11s} "
+          f"{'coalesced':>10s}")
+    for name, fn in (('task per delta', task_per_delta), ('OutboundSender', outbound_sender),
+                     ('OutboundSender + text', outbound_sender_text)):
+        random.seed(0)
+        messages, reordered, peak, max_lag, coalesced = asyncio.run(fn(deltas, args))
+        coalesced = '-' if coalesced is None else str(coalesced)
+        print(f"{name:21s} {messages:9d} {reordered:10d} {peak:13d} {max_lag:11.0f} {coalesced:>10s}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Load test: websocket-client thread per session vs the asyncio realtime client.
+
+Starts the local mock realtime server, opens N sessions with each client
+implementation (each in its own process), requests one response per session and
+reports threads, RSS and per-delta latency (mock send -> callback on the event loop).
+
+    python -m benchmarks.bench_realtime_client --sessions 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src_v1.codec import base64_to_pcm16
+from src_v1.backend import RealtimeOpenAIClient
+from src_v1.async_backend import AsyncRealtimeOpenAIClient
+
+
+def rss_mb(pid='self'):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def thread_count(pid='self'):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('Threads:'):
+                return int(line.split()[1])
+    return threading.active_count()
+
+
+async def run_sessions(mode, sessions, uri):
+    loop = asyncio.get_running_loop()
+    latencies = []
+    done = asyncio.Event()
+    finished = 0
+
+    async def handle_delta(delta):
+        sent_ns = int.from_bytes(base64_to_pcm16(delta)[:8], 'little', signed=True)
+        latencies.append((time.monotonic_ns() - sent_ns) / 1e6)
+
+    async def handle_done():
+        nonlocal finished
+        finished += 1
+        if finished == sessions:
+            done.set()
+
+    def schedule(factory):
+        # Same hop VADWebSocketManager._run_in_loop makes for each client flavour
+        if mode == 'async':
+            loop.create_task(factory())
+        else:
+            loop.call_soon_threadsafe(lambda: asyncio.create_task(factory()))
+
+    client_class = AsyncRealtimeOpenAIClient if mode == 'async' else RealtimeOpenAIClient
+    clients = []
+    for _ in range(sessions):
+        client = client_class(
+            api_key='bench', api_version='bench', deployment_name='bench',
+            audio_callback=lambda delta: schedule(lambda: handle_delta(delta)),
+            audio_done_callback=lambda: schedule(handle_done),
+            uri=uri,
+        )
+        clients.append(client)
+
+    start = time.perf_counter()
+    if mode == 'async':
+        await asyncio.gather(*(client.connect(timeout=30) for client in clients))
+    else:
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            await asyncio.gather(*(loop.run_in_executor(pool, client.connect, 30) for client in clients))
+    connect_s = time.perf_counter() - start
+
+    threads, rss = thread_count(), rss_mb()
+    for client in clients:
+        client.send_prompt_only_text('benchmark')
+    await asyncio.wait_for(done.wait(), timeout=120)
+
+    for client in clients:
+        client.close()
+    lat = np.array(latencies)
+    return {
+        'mode': mode,
+        'sessions': sessions,
+        'connect_s': round(connect_s, 2),
+        'threads': threads,
+        'rss_mb': round(rss, 1),
+        'deltas': len(lat),
+        'p50_ms': round(float(np.percentile(lat, 50)), 2),
+        'p99_ms': round(float(np.percentile(lat, 99)), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--mode', choices=['thread', 'async'], help=argparse.SUPPRESS)
+    parser.add_argument('--uri', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # Child process: one client implementation
+        print(json.dumps(asyncio.run(run_sessions(args.mode, args.sessions, args.uri))))
+        return
+
+    mock = subprocess.Popen(
+        [sys.executable, '-m', 'src_v1.mock_realtime', '--port', str(args.port),
+         '--timestamp-deltas', '--delta-count', '25', '--delta-ms', '20'],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        uri = mock.stdout.readline().strip().rsplit(' ', 1)[-1]
+        results = []
+        for mode in ('thread', 'async'):
+            out = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_realtime_client', '--mode', mode,
+                 '--sessions', str(args.sessions), '--uri', uri],
+                capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONUNBUFFERED='1')
+            ).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    columns = ['mode', 'sessions', 'connect_s', 'threads', 'rss_mb', 'deltas', 'p50_ms', 'p99_ms']
+    print(' '.join(f'{c:>10s}' for c in columns))
+    for row in results:
+        print(' '.join(f'{str(row[c]):>10s}' for c in columns))
+
+
+if __name__ == '__main__':
+    main()
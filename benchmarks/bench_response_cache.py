@@ -0,0 +1,144 @@
+"""
+Response cache (src_v1/response_cache.py): the store on its own, then typed
+prompts end to end.
+
+Store: put --answers answers of --answer-s seconds of PCM16, look each one up
+and read its audio in the 40 ms chunks playback uses, then reopen the file
+(index rebuilt by scanning it, as after a restart).
+
+End to end: the mock realtime server (answers after --think-ms) and the app
+with RESPONSE_CACHE_PATH set; one session sends --prompts distinct questions
+--repeat times each (written slightly differently each round, so hits go
+through normalization). Reports first audio (send_text -> first audio frame)
+for misses (upstream answer, recorded) and hits (replayed from the cache), and
+the hit rate from /health.
+
+    python -m benchmarks.bench_response_cache --answers 200 --prompts 5 --repeat 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import websockets
+
+from benchmarks.loadgen import http_get, percentiles, wait_ready
+from src_v1.response_cache import ResponseCache, cache_key
+
+PROMPTS = ["What time do you open?", "Where is the restroom?", "Do you have vegetarian food?",
+           "How much is parking?", "ห้องน้ำอยู่ที่ไหน", "Can I pay by card?", "Is there free wifi?"]
+VARIANTS = (lambda p: p, str.lower, lambda p: p.upper().rstrip('?'), lambda p: '  ' + p.replace(' ', '  ') + '!')
+
+
+def bench_store(args, directory):
+    path = os.path.join(directory, 'store.bin')
+    audio = os.urandom(int(args.answer_s * 48000) // 2 * 2)
+    chunk = 48000 * 40 // 1000
+    cache = ResponseCache(path, max_bytes=1 << 40, max_entries=args.answers)
+    keys = [cache_key(f"question number {i}") for i in range(args.answers)]
+
+    start = time.perf_counter()
+    for key in keys:
+        cache.put(key, "answer text", audio, 0.8)
+    put_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        cache.get(key)
+    get_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    read = 0
+    for key in keys:
+        entry = cache.get(key)
+        for offset in range(0, entry.audio_len, chunk):
+            read += len(cache.read_audio(entry, offset, offset + chunk))
+    read_s = time.perf_counter() - start
+    file_mb = cache.stats()['file_bytes'] / 1e6
+    cache.close()
+
+    start = time.perf_counter()
+    reopened = ResponseCache(path, max_bytes=1 << 40, max_entries=args.answers)
+    reopen_s = time.perf_counter() - start
+    assert reopened.stats()['entries'] == args.answers
+    reopened.close()
+
+    print(f"store: {args.answers} answers x {args.answer_s:.1f} s PCM16 ({file_mb:.1f} MB file)")
+    print(f"  put          {put_s / args.answers * 1e6:9.1f} us/answer")
+    print(f"  get          {get_s / args.answers * 1e6:9.1f} us/lookup")
+    print(f"  read audio   {read / read_s / 1e6:9.1f} MB/s in 40 ms chunks")
+    print(f"  reopen       {reopen_s * 1000:9.1f} ms (index rebuilt from the file)")
+
+
+async def bench_end_to_end(args, directory):
+    mock = subprocess.Popen(
+        [sys.executable, '-m', 'src_v1.mock_realtime', '--port', str(args.mock_port),
+         '--delta-count', '25', '--delta-ms', '40', '--think-ms', str(args.think_ms)],
+        stdout=subprocess.PIPE, text=True)
+    mock_uri = mock.stdout.readline().strip().rsplit(' ', 1)[-1]
+    env = dict(os.environ, REALTIME_URI=mock_uri, REALTIME_POOL_WARM_SIZE='1', PYTHONUNBUFFERED='1',
+               RESPONSE_CACHE_PATH=os.path.join(directory, 'answers.bin'))
+    for name in ('AZURE_OPENAI_API_KEY', 'AZURE_API_VERSION', 'AZURE_OPENAI_DEPLOYMENT'):
+        env.setdefault(name, 'bench')
+    app = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(args.port),
+         '--log-level', 'warning'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{args.port}"
+    first_audio = {False: [], True: []}
+    try:
+        await wait_ready(url, (mock, app))
+        async with websockets.connect(f"ws://127.0.0.1:{args.port}/ws/bench-cache") as ws:
+            json.loads(await ws.recv())
+            for round_ in range(args.repeat):
+                for prompt in PROMPTS[:args.prompts]:
+                    text = VARIANTS[round_ % len(VARIANTS)](prompt)
+                    sent = time.perf_counter()
+                    await ws.send(json.dumps({"type": "send_text", "text": text}))
+                    first = None
+                    while True:
+                        message = json.loads(await ws.recv())
+                        if message["type"] == "audio_chunk" and first is None:
+                            first = time.perf_counter() - sent
+                        elif message["type"] == "audio_response_done":
+                            first_audio[bool(message.get("cached"))].append(first * 1000)
+                            break
+        _, body = await http_get(f"{url}/health")
+        stats = json.loads(body)["response_cache"]
+    finally:
+        app.terminate()
+        mock.terminate()
+        app.wait()
+        mock.wait()
+
+    print(f"end to end: {args.prompts} prompts x {args.repeat} rounds, upstream think time {args.think_ms} ms")
+    print(f"  {'':6s} {'turns':>5s} {'first audio p50':>16s} {'p95':>8s}")
+    for cached, label in ((False, 'miss'), (True, 'hit')):
+        p50, p95, _ = percentiles(first_audio[cached])
+        print(f"  {label:6s} {len(first_audio[cached]):5d} {p50:13.1f} ms {p95:5.1f} ms")
+    print(f"  hit rate {stats['hit_rate']}, {stats['entries']} answers, {stats['bytes'] / 1e3:.0f} kB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--answers', type=int, default=200)
+    parser.add_argument('--answer-s', type=float, default=4.0, help='seconds of audio per stored answer')
+    parser.add_argument('--prompts', type=int, default=5, help=f'distinct questions (max {len(PROMPTS)})')
+    parser.add_argument('--repeat', type=int, default=4)
+    parser.add_argument('--think-ms', type=int, default=600)
+    parser.add_argument('--port', type=int, default=8040)
+    parser.add_argument('--mock-port', type=int, default=8790)
+    parser.add_argument('--store-only', action='store_true')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix='response-cache-') as directory:
+        bench_store(args, directory)
+        if not args.store_only:
+            asyncio.run(bench_end_to_end(args, directory))
+
+
+if __name__ == '__main__':
+    main()
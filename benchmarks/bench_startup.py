@@ -0,0 +1,112 @@
+"""
+Cold start of the server: `import main` time and time to the first /health.
+
+Each run is a fresh interpreter. Import time is measured inside it, along with
+which audio-stack modules the import pulled in (they should be none: scipy,
+webrtcvad and sounddevice load with the capture backend that needs them).
+Time to /health is from spawning uvicorn to the first 200 answer, with no warm
+upstream sessions (REALTIME_POOL_WARM_SIZE=0), so no realtime endpoint is needed.
+It is measured with CAPTURE_PRELOAD on (local VAD stack imported in the background
+after startup) and off.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --runs 5 --json --gate-ms 1500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.bench_realtime_client import rss_mb
+
+AUDIO_STACK = ('scipy.signal', 'webrtcvad', 'sounddevice')
+
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"import_ms": elapsed * 1000, "audio_modules": [m for m in {AUDIO_STACK!r} if m in sys.modules]}}))
+"""
+
+
+def server_env(preload):
+    env = dict(os.environ, REALTIME_POOL_WARM_SIZE='0', REALTIME_URI='ws://127.0.0.1:9/openai/realtime',
+               CAPTURE_PRELOAD='1' if preload else '0', PYTHONUNBUFFERED='1')
+    for name in ('AZURE_OPENAI_API_KEY', 'AZURE_API_VERSION', 'AZURE_OPENAI_DEPLOYMENT'):
+        env.setdefault(name, 'bench')
+    return env
+
+
+def import_run():
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], env=server_env(False),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def health_run(port, preload, timeout=60):
+    """(ms from spawn to the first /health 200, server RSS MB at that point)"""
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1',
+                               '--port', str(port), '--log-level', 'warning'],
+                              env=server_env(preload), stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000, rss_mb(server.pid)
+            except OSError:
+                pass
+            time.sleep(0.01)
+        raise TimeoutError(f"/health not ready after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    parser.add_argument('--gate-ms', type=float, help='exit 1 when the median time to /health exceeds this')
+    args = parser.parse_args()
+
+    imports = [import_run() for _ in range(args.runs)]
+    summary = {
+        'runs': args.runs,
+        'import_ms': round(statistics.median(run['import_ms'] for run in imports), 1),
+        'audio_modules_at_import': sorted({m for run in imports for m in run['audio_modules']}),
+    }
+    for preload in (False, True):
+        runs = [health_run(args.port, preload) for _ in range(args.runs)]
+        key = 'preload' if preload else 'no_preload'
+        summary[f'health_ms_{key}'] = round(statistics.median(ms for ms, _ in runs), 1)
+        summary[f'rss_mb_{key}'] = round(statistics.median(rss for _, rss in runs), 1)
+
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(f"median of {args.runs} cold starts")
+        print(f"import main        {summary['import_ms']:8.1f} ms   audio modules loaded: "
+              f"{', '.join(summary['audio_modules_at_import']) or 'none'}")
+        for key, label in (('no_preload', 'CAPTURE_PRELOAD=0'), ('preload', 'CAPTURE_PRELOAD=1')):
+            print(f"first /health      {summary[f'health_ms_{key}']:8.1f} ms   rss {summary[f'rss_mb_{key}']:6.1f} MB"
+                  f"   ({label})")
+
+    health = summary['health_ms_preload']
+    if args.gate_ms is not None and not health <= args.gate_ms:
+        print(f"FAIL: time to /health {health:.1f} ms > {args.gate_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+GET / of the web UI: the old handler (read index.html from disk per request)
+vs StaticAssetCache (in memory, precompressed, ETag / 304).
+
+Requests are driven straight through the app's ASGI interface in-process, so
+requests/sec is the server's cost per page load without network or client
+work (no decompression). Bytes per page load are the response body plus header
+lines, for a first visit (Accept-Encoding of a browser) and for a reload, where
+the browser revalidates with the ETag it got.
+
+    python -m benchmarks.bench_static --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, Response
+
+from src_v1.static_assets import ENCODINGS, StaticAssetCache
+
+STATIC_DIR = "web_vad/static"
+BROWSER_ACCEPT_ENCODING = "gzip, deflate, br, zstd"
+
+
+def build_app():
+    app = FastAPI()
+    cache = StaticAssetCache(STATIC_DIR)
+    cache.load("index.html")
+
+    @app.get("/disk")
+    async def get_index_disk():
+        # The handler before the cache
+        with open(f"{STATIC_DIR}/index.html", "r", encoding="utf-8") as f:
+            html_content = f.read()
+        return HTMLResponse(content=html_content)
+
+    @app.get("/cached")
+    async def get_index_cached(request: Request):
+        status, body, headers = cache.respond("index.html", request.headers.get("accept-encoding"),
+                                              request.headers.get("if-none-match"))
+        return Response(content=body, status_code=status, headers=headers)
+
+    return app
+
+
+async def get(app, path, headers):
+    """One GET through the ASGI app: (status, {header: value}, wire bytes)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    start = None
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal start, size
+        if message["type"] == "http.response.start":
+            start = message
+            size += len(f"HTTP/1.1 {message['status']}\r\n") + 2
+            size += sum(len(name) + len(value) + 4 for name, value in message["headers"])
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}, size
+
+
+async def page_load_bytes(app, path):
+    headers = {"Accept-Encoding": BROWSER_ACCEPT_ENCODING}
+    _, first_headers, first = await get(app, path, headers)
+    if "etag" in first_headers:
+        headers["If-None-Match"] = first_headers["etag"]
+    status, _, reload = await get(app, path, headers)
+    return first, reload, status
+
+
+async def throughput(app, path, requests, concurrency, revalidate):
+    headers = {"Accept-Encoding": BROWSER_ACCEPT_ENCODING}
+    if revalidate:
+        _, first_headers, _ = await get(app, path, headers)
+        if "etag" in first_headers:
+            headers["If-None-Match"] = first_headers["etag"]
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            status, _, _ = await get(app, path, headers)
+            if status not in (200, 304):
+                raise RuntimeError(f"GET {path}: {status}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+async def run(args):
+    app = build_app()
+    print(f"{args.requests} requests, {args.concurrency} concurrent, encodings: {', '.join(ENCODINGS)}")
+    print(f"{'handler':8s} {'first load B':>13s} {'reload B':>9s} {'reload':>7s} "
+          f"{'req/s first':>12s} {'req/s reload':>13s}")
+    for name, path in (("disk", "/disk"), ("cached", "/cached")):
+        first, reload, status = await page_load_bytes(app, path)
+        await throughput(app, path, 50, 5, False)  # warm-up
+        rps_first = await throughput(app, path, args.requests, args.concurrency, False)
+        rps_reload = await throughput(app, path, args.requests, args.concurrency, True)
+        print(f"{name:8s} {first:13d} {reload:9d} {status:7d} {rps_first:12.0f} {rps_reload:13.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
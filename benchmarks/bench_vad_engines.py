@@ -0,0 +1,147 @@
+"""
+Throughput and accuracy of the VAD engines on labeled 16 kHz audio.
+
+Decisions/sec for the per-frame is_speech() loop of every engine, and for
+BatchEnergyVAD scoring N sessions per tick as one 2-D array. Accuracy,
+precision and recall are per 30 ms frame against the labels; agreement is
+the share of frames where an engine matches webrtcvad.
+
+By default a synthetic corpus is used (voiced harmonic bursts in noise). Real
+recordings: a mono WAV plus a CSV of speech segments, one "start_s,end_s" per line.
+
+    python -m benchmarks.bench_vad_engines --seconds 60 --sessions 1,64,512
+    python -m benchmarks.bench_vad_engines --wav call.wav --labels call.csv
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy import signal
+from scipy.io import wavfile
+
+from src_v1.vad_engine import VAD_SAMPLE_RATE, BatchEnergyVAD, create_vad_engine
+
+FRAME_MS = 30
+FRAME = VAD_SAMPLE_RATE * FRAME_MS // 1000
+
+
+def synthetic_corpus(seconds, snr_db=15, seed=0):
+    """Alternating 0.3-2.5 s speech-like bursts and pauses; returns (pcm int16, sample labels)."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * VAD_SAMPLE_RATE)
+    labels = np.zeros(n, dtype=bool)
+    audio = np.zeros(n)
+    pos = int(rng.uniform(0.5, 1.5) * VAD_SAMPLE_RATE)
+    while pos < n:
+        length = min(int(rng.uniform(0.3, 2.5) * VAD_SAMPLE_RATE), n - pos)
+        t = np.arange(length) / VAD_SAMPLE_RATE
+        f0 = rng.uniform(100, 220) * (1 + 0.1 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+        phase = 2 * np.pi * np.cumsum(f0) / VAD_SAMPLE_RATE
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 15))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 6) * t) ** 2  # syllable rate
+        audio[pos:pos + length] = voiced * envelope * np.hanning(length) ** 0.1
+        labels[pos:pos + length] = True
+        pos += length + int(rng.uniform(0.3, 2.0) * VAD_SAMPLE_RATE)
+
+    b, a = signal.butter(2, [300, 3400], btype='band', fs=VAD_SAMPLE_RATE)
+    audio = signal.lfilter(b, a, audio)
+    speech_rms = np.sqrt(np.mean(audio[labels] ** 2)) if labels.any() else 1.0
+    noise = rng.standard_normal(n) * speech_rms / 10 ** (snr_db / 20)
+    audio = audio + noise
+    audio = 0.3 * audio / np.max(np.abs(audio))
+    return (audio * 32767).astype(np.int16), labels
+
+
+def load_corpus(wav_path, labels_path):
+    fs, data = wavfile.read(wav_path)
+    if data.ndim > 1:
+        data = data[:, 0]
+    if data.dtype != np.int16:
+        data = (np.clip(data.astype(np.float64) / np.max(np.abs(data)), -1, 1) * 32767).astype(np.int16)
+    if fs != VAD_SAMPLE_RATE:
+        data = np.clip(signal.resample_poly(data.astype(np.float64), VAD_SAMPLE_RATE, fs), -32768, 32767).astype(np.int16)
+    labels = np.zeros(len(data), dtype=bool)
+    with open(labels_path) as f:
+        for line in f:
+            parts = line.strip().split(',')
+            if len(parts) < 2 or not parts[0].replace('.', '', 1).isdigit():
+                continue  # blank line or header
+            start, end = (int(float(x) * VAD_SAMPLE_RATE) for x in parts[:2])
+            labels[start:end] = True
+    return data, labels
+
+
+def frame_labels(labels):
+    usable = len(labels) - len(labels) % FRAME
+    return labels[:usable].reshape(-1, FRAME).mean(axis=1) >= 0.5
+
+
+def run_engine(name, frames, **options):
+    engine = create_vad_engine(name, frame_duration_ms=FRAME_MS, **options)
+    frame_bytes = [frame.tobytes() for frame in frames]
+    start = time.perf_counter()
+    decisions = np.array([engine.is_speech(frame, VAD_SAMPLE_RATE) for frame in frame_bytes])
+    return decisions, time.perf_counter() - start
+
+
+def run_batch(frames, sessions, **options):
+    """Score `sessions` streams per tick (each session gets the corpus at a different offset)."""
+    batch = BatchEnergyVAD(max_sessions=sessions, frame_duration_ms=FRAME_MS, **options)
+    slots = np.array([batch.allocate() for _ in range(sessions)])
+    offsets = np.arange(sessions) * 97 % len(frames)
+    ticks = len(frames)
+    start = time.perf_counter()
+    for tick in range(ticks):
+        batch.process(frames[(offsets + tick) % len(frames)], slots)
+    elapsed = time.perf_counter() - start
+    return ticks * sessions / elapsed
+
+
+def scores(decisions, truth):
+    tp = np.sum(decisions & truth)
+    precision = tp / max(np.sum(decisions), 1)
+    recall = tp / max(np.sum(truth), 1)
+    return np.mean(decisions == truth), precision, recall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=60.0, help='length of the synthetic corpus')
+    parser.add_argument('--snr-db', type=float, default=15.0, help='noise level of the synthetic corpus')
+    parser.add_argument('--wav', help='mono WAV file (resampled to 16 kHz)')
+    parser.add_argument('--labels', help='CSV of speech segments "start_s,end_s" for --wav')
+    parser.add_argument('--sessions', default='1,64,512', help='batch sizes for BatchEnergyVAD')
+    parser.add_argument('--min-speech-ms', type=int, default=0)
+    parser.add_argument('--hangover-ms', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.wav:
+        if not args.labels:
+            parser.error('--wav needs --labels')
+        pcm, labels = load_corpus(args.wav, args.labels)
+        source = args.wav
+    else:
+        pcm, labels = synthetic_corpus(args.seconds, args.snr_db)
+        source = f"synthetic, SNR {args.snr_db:.0f} dB"
+
+    truth = frame_labels(labels)
+    frames = pcm[:len(truth) * FRAME].reshape(-1, FRAME)
+    smoothing = dict(min_speech_ms=args.min_speech_ms, hangover_ms=args.hangover_ms)
+    print(f"{len(frames)} frames of {FRAME_MS} ms ({len(frames) * FRAME_MS / 1000:.0f}s, {source}), "
+          f"{truth.mean() * 100:.0f}% speech")
+
+    print(f"\n{'engine':10s} {'decisions/s':>12s} {'accuracy':>9s} {'precision':>10s} {'recall':>7s} {'vs webrtc':>10s}")
+    results = {name: run_engine(name, frames, **smoothing) for name in ('webrtc', 'energy')}
+    for name, (decisions, elapsed) in results.items():
+        accuracy, precision, recall = scores(decisions, truth)
+        agreement = np.mean(decisions == results['webrtc'][0])
+        print(f"{name:10s} {len(frames) / elapsed:12.0f} {accuracy:9.3f} {precision:10.3f} {recall:7.3f} {agreement:10.3f}")
+
+    print(f"\n{'batched energy':16s} {'decisions/s':>12s}")
+    for sessions in (int(x) for x in args.sessions.split(',')):
+        print(f"{sessions:5d} sessions {run_batch(frames, sessions, **smoothing):18.0f}")
+
+
+if __name__ == '__main__':
+    main()
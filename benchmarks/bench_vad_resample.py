@@ -0,0 +1,70 @@
+"""
+CPU per session-second of the 24 kHz -> 16 kHz VAD front end.
+
+Compares the old per-frame path (int16 -> float32 -> resample_poly -> int16 for every
+30 ms frame) with VADFrameResampler processing whole blocks with kept filter state.
+webrtcvad itself is included in both so the numbers are the full VAD cost.
+
+    python -m benchmarks.bench_vad_resample --seconds 60 --block-ms 100
+"""
+
+import argparse
+import time
+
+import numpy as np
+import webrtcvad
+from scipy import signal
+
+from src_v1.resample import VADFrameResampler
+
+FS = 24000
+FRAME = 720
+
+
+def legacy(pcm, block_bytes):
+    vad = webrtcvad.Vad(2)
+    decisions = 0
+    for start in range(0, len(pcm), block_bytes):
+        block = pcm[start:start + block_bytes]
+        for i in range(0, len(block), FRAME * 2):
+            frame = block[i:i + FRAME * 2]
+            if len(frame) == FRAME * 2:
+                frame_np = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32767.0
+                frame_16k = signal.resample_poly(frame_np, 16000, FS)
+                decisions += vad.is_speech((frame_16k * 32767).astype(np.int16).tobytes(), 16000)
+    return decisions
+
+
+def streaming(pcm, block_bytes):
+    vad = webrtcvad.Vad(2)
+    frames = VADFrameResampler(FS, 30)
+    decisions = 0
+    for start in range(0, len(pcm), block_bytes):
+        for _, frame_16k in frames.process(pcm[start:start + block_bytes]):
+            decisions += vad.is_speech(frame_16k, 16000)
+    return decisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--block-ms', type=int, default=100, help='callback / browser chunk size')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    t = np.arange(int(FS * args.seconds)) / FS
+    audio = 0.3 * np.sin(2 * np.pi * 200 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0) + 0.01 * rng.standard_normal(len(t))
+    pcm = (audio * 32767).astype('<i2').tobytes()
+    block_bytes = FS * args.block_ms // 1000 * 2
+
+    print(f"{args.seconds:.0f}s of audio in {args.block_ms} ms blocks")
+    print(f"{'path':28s} {'cpu ms':>10s} {'us / session-s':>15s} {'speech frames':>14s}")
+    for name, fn in (('per-frame resample_poly', legacy), ('streaming VADFrameResampler', streaming)):
+        start = time.process_time()
+        decisions = fn(pcm, block_bytes)
+        cpu = time.process_time() - start
+        print(f"{name:28s} {cpu * 1000:10.1f} {cpu / args.seconds * 1e6:15.1f} {decisions:14d}")
+
+
+if __name__ == '__main__':
+    main()
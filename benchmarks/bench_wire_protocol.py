@@ -0,0 +1,70 @@
+"""
+CPU and bytes per streamed second of audio: JSON+base64 audio_chunk vs binary frames.
+
+Server side starts from the base64 delta the realtime API delivers; client side
+is what the browser has to do to get PCM16 back (emulated in Python).
+
+    python -m benchmarks.bench_wire_protocol --seconds 60 --delta-ms 40
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src_v1.codec import base64_to_pcm16, pcm16_to_base64
+from src_v1.wire import FRAME_AUDIO_OUT, pack_frame, unpack_frame
+
+FS = 24000
+
+
+def json_server(deltas):
+    return [json.dumps({"type": "audio_chunk", "audio": delta}) for delta in deltas]
+
+
+def json_client(frames):
+    return [base64_to_pcm16(json.loads(frame)["audio"]) for frame in frames]
+
+
+def binary_server(deltas):
+    return [pack_frame(FRAME_AUDIO_OUT, 1, seq, base64_to_pcm16(delta)) for seq, delta in enumerate(deltas)]
+
+
+def binary_client(frames):
+    return [unpack_frame(frame)[4] for frame in frames]
+
+
+def cpu(fn, arg, repeat=5):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = fn(arg)
+        best = min(best, time.process_time() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--delta-ms', type=int, default=40)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    samples = FS * args.delta_ms // 1000
+    count = int(args.seconds * 1000 / args.delta_ms)
+    deltas = [pcm16_to_base64(rng.integers(-8000, 8000, samples, dtype='<i2').tobytes()) for _ in range(count)]
+
+    print(f"{count} deltas of {args.delta_ms} ms ({args.seconds:.0f}s of audio)")
+    print(f"{'protocol':10s} {'KB/s':>10s} {'server us/s':>12s} {'client us/s':>12s}")
+    for name, server, client in (('json', json_server, json_client), ('binary', binary_server, binary_client)):
+        server_cpu, frames = cpu(server, deltas)
+        client_cpu, _ = cpu(client, frames)
+        size = sum(len(frame.encode('utf-8') if isinstance(frame, str) else frame) for frame in frames)
+        print(f"{name:10s} {size / args.seconds / 1024:10.1f} "
+              f"{server_cpu / args.seconds * 1e6:12.1f} {client_cpu / args.seconds * 1e6:12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,541 @@
+"""
+Load generator: N concurrent browser-like sessions against /ws/{client_id}.
+
+Starts the mock realtime server and the FastAPI app (pointed at the mock with
+REALTIME_URI) unless --url is given. Every session connects with
+?protocol=binary, sends start_recording (source browser) and streams a WAV
+fixture as 100 ms microphone frames at real-time pace, then waits for the
+answer. Fixtures are trimmed after their last speech sample and padded with
+just enough silence for the server VAD to end the utterance on the last frame,
+so turn latency is measured from that frame:
+
+    first audio  - last frame sent -> first assistant audio frame
+    turn done    - last frame sent -> audio_response_done
+    after speech - last frame with speech sent -> first assistant audio frame
+                   (what the user waits; compares endpointing rules)
+
+Reports p50/p95/p99 of both, plus server CPU, peak RSS and peak thread count
+(when the server runs locally, summed over workers) and the event loop lag of
+the worker at --url (from /health). --gate-p95-ms turns it
+into a regression gate (exit code 1 when turn p95 is above the limit).
+
+With --barge-in-ms N every session interrupts each answer N ms after its first
+audio frame by streaming the fixture again, and reports barge-in latency (the
+frame on which the server detected speech sent -> playback_flush received: the
+last frame sent before the flush) and late frames (audio of the interrupted
+turn that arrived after the flush; should be 0).
+
+With --endpointing speculative|aggressive the local server sends each utterance
+at the tentative silence already (two-stage endpointing) and the summary adds
+the speculation hit rate and the answer start gained per hit; --pause-ms puts a
+pause into the synthetic utterance that is longer than the tentative silence
+but shorter than the final one, so every turn also exercises a rollback.
+
+With --input-mode server_vad the local VAD is bypassed: the server forwards every
+frame and the realtime API's (here: the mock's) server_vad ends the turn after
+SERVER_VAD_SILENCE_MS, possibly before the padding was sent, so "first audio" can
+be negative; "after speech" and the server CPU compare it with batch / stream.
+
+With --codec mulaw|adpcm|g711_ulaw the sessions negotiate that audio codec
+(?codec=): microphone frames are encoded with it (g711_ulaw at 8 kHz) and the
+summary adds the assistant audio bytes received per turn.
+
+With --check-reconnect the run ends with a regression check of a client that
+connects again while its first socket is still open (a browser reload): the
+first socket must be closed with 4409, the second must work, and once it is
+closed the worker must be back to its connection and leased-session counts
+from before (nothing leaked). Exit code 1 when it fails.
+
+With --workers N the app runs as `main.py --workers N` (one process per port)
+and every session asks /route/{client_id} which worker to connect to, as the
+browser does; --route does the same against an external --url.
+
+    python -m benchmarks.loadgen --sessions 50 --turns 3
+    python -m benchmarks.loadgen --sessions 400 --workers 4
+    python -m benchmarks.loadgen --endpointing speculative --pause-ms 500
+    python -m benchmarks.loadgen --codec adpcm --input-mode stream
+    python -m benchmarks.loadgen --sessions 50 --input-mode server_vad
+    python -m benchmarks.loadgen --wav fixtures/*.wav --think-ms 300 --gate-p95-ms 900
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+import websockets
+from scipy import signal
+
+from benchmarks.bench_realtime_client import rss_mb, thread_count
+from src_v1.audio_codecs import CODECS, PCM16, get_codec
+from src_v1.wire import FRAME_AUDIO_IN, FRAME_AUDIO_OUT, HEADER_SIZE, pack_frame
+
+FS = 24000
+CHUNK_MS = 100
+SILENCE_THRESHOLD_S = 1.0  # server VAD setting in main.py
+
+
+def make_fixture(path, speech_s=1.5, seed=0, pause_s=0.0):
+    """Synthetic utterance: voiced harmonic speech-like burst between short silences (split by pause_s)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(speech_s * FS)) / FS
+    f0 = 140 * (1 + 0.1 * np.sin(2 * np.pi * 3 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / FS
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t) ** 2)
+    voiced = 0.3 * voiced / np.max(np.abs(voiced))
+    half = len(voiced) // 2
+    audio = np.concatenate([np.zeros(FS // 4), voiced[:half], np.zeros(int(pause_s * FS)), voiced[half:],
+                            np.zeros(FS // 2)])
+    audio += 0.002 * rng.standard_normal(len(audio))
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(FS)
+        wf.writeframes((audio * 32767).astype('<i2').tobytes())
+
+
+def load_fixture(path, codec=PCM16):
+    """
+    (frames, frames up to the end of speech): CHUNK_MS microphone frames in the codec
+    (PCM16 24 kHz by default), trimmed after the last speech and padded so end-of-utterance
+    hits the last frame.
+    """
+    fs = codec.sample_rate
+    with wave.open(path, 'rb') as wf:
+        channels, width, rate = wf.getnchannels(), wf.getsampwidth(), wf.getframerate()
+        data = wf.readframes(wf.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit WAV fixtures are supported")
+    samples = np.frombuffer(data, dtype='<i2').reshape(-1, channels)[:, 0].astype(np.float64)
+    if rate != fs:
+        samples = signal.resample_poly(samples, fs, rate)
+    loud = np.flatnonzero(np.abs(samples) > 32767 * 0.01)  # -40 dBFS
+    end = loud[-1] + 1 if len(loud) else len(samples)
+    pad = int((SILENCE_THRESHOLD_S + 0.1) * fs)
+    pcm = np.concatenate([samples[:end], np.zeros(pad)])
+    chunk = fs * CHUNK_MS // 1000
+    pcm = np.clip(np.pad(pcm, (0, -len(pcm) % chunk)), -32768, 32767).astype('<i2')
+    # Encoded up front, like the browser's capture (not part of the measured path)
+    frames = [codec.to_wire(codec.to_upstream(pcm[i:i + chunk].tobytes())) for i in range(0, len(pcm), chunk)]
+    return frames, -(-end // chunk)
+
+
+async def http_get(url):
+    """(status line, body) of a plain HTTP/1.0 GET - enough for /health and /route."""
+    host_port, _, path = url.split('://', 1)[1].partition('/')
+    host, port = host_port.rsplit(':', 1)
+    reader, writer = await asyncio.open_connection(host, int(port))
+    writer.write(f"GET /{path} HTTP/1.0\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return head.split(b'\r\n', 1)[0], body
+
+
+async def resolve_ws_url(url, client_id, route):
+    if route:
+        _, body = await http_get(f"{url.replace('ws://', 'http://', 1)}/route/{client_id}")
+        ws_url = json.loads(body).get('ws_url')
+        if ws_url:
+            return ws_url
+    return f"{url}/ws/{client_id}"
+
+
+async def stream_fixture(ws, fixture, seq, sent_times=None):
+    """
+    Send the fixture as real-time paced frames; returns (next seq, time the last frame was sent,
+    time the last frame with speech was sent).
+    """
+    frames, speech_frames = fixture
+    speech_end = None
+    start = time.perf_counter()
+    for i, payload in enumerate(frames):
+        # Real-time pacing against the session clock, not sleep drift
+        delay = start + i * CHUNK_MS / 1000 - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await ws.send(pack_frame(FRAME_AUDIO_IN, 0, seq, payload))
+        seq += 1
+        if i == speech_frames - 1:
+            speech_end = time.perf_counter()
+        if sent_times is not None:
+            sent_times.append(time.perf_counter())
+    return seq, time.perf_counter(), speech_end
+
+
+async def interrupt(ws, fixture, seq, delay_ms, input_mode, sent_times, streaming):
+    await asyncio.sleep(delay_ms / 1000)
+    await streaming  # with server_vad the first utterance may still be sending its padding
+    await ws.send(json.dumps({"type": "start_recording", "source": "browser", "input_mode": input_mode}))
+    return await stream_fixture(ws, fixture, seq, sent_times)
+
+
+async def run_session(url, client_id, fixture, turns, input_mode, results, errors, route=False,
+                      barge_in_after_ms=None, codec='pcm16'):
+    try:
+        ws_url = await resolve_ws_url(url, client_id, route)
+        async with websockets.connect(f"{ws_url}?protocol=binary&codec={codec}", max_size=None,
+                                      compression=None, open_timeout=30) as ws:
+            status = json.loads(await ws.recv())
+            if status.get('type') != 'connection_status':
+                raise RuntimeError(f"unexpected first message: {status}")
+            seq = 0
+            for n in range(turns):
+                await ws.send(json.dumps({"type": "start_recording", "source": "browser", "input_mode": input_mode}))
+                # Read while sending: with server_vad the answer may start before the padding is sent
+                streaming = asyncio.create_task(stream_fixture(ws, fixture, seq))
+
+                first_audio = None
+                audio_bytes = 0
+                barge = None        # task streaming the interrupting utterance
+                old_turn = None     # turn id of the interrupted answer
+                flushed_at = None
+                barge_in_ms = float('nan')
+                interrupt_sent = []  # send times of the interrupting frames
+                late_frames = 0
+                while True:
+                    message = await asyncio.wait_for(ws.recv(), timeout=60)
+                    if isinstance(message, bytes):
+                        if message[0] == FRAME_AUDIO_OUT:
+                            turn_id = int.from_bytes(message[2:4], 'little')
+                            if flushed_at is not None and turn_id == old_turn:
+                                late_frames += 1
+                                continue
+                            first_audio = first_audio or time.perf_counter()
+                            audio_bytes += len(message) - HEADER_SIZE
+                            if barge_in_after_ms is not None and barge is None:
+                                old_turn = turn_id
+                                barge = asyncio.create_task(interrupt(
+                                    ws, fixture, seq + 100000, barge_in_after_ms, input_mode, interrupt_sent, streaming))
+                        continue
+                    data = json.loads(message)
+                    if data.get('type') == 'error':
+                        raise RuntimeError(data.get('message'))
+                    if data.get('type') == 'playback_flush' and barge is not None:
+                        flushed_at = time.perf_counter()
+                        if interrupt_sent:
+                            barge_in_ms = (flushed_at - interrupt_sent[-1]) * 1000
+                        first_audio, audio_bytes = None, 0
+                    if data.get('type') == 'audio_response_done':
+                        if barge is not None and (data.get('turn_id') & 0xFFFF) == old_turn:
+                            continue  # answer that was interrupted
+                        break
+                done = time.perf_counter()
+                seq, last_sent, speech_end = await streaming
+                result = {}
+                if barge is not None:
+                    _, last_sent, speech_end = await barge
+                    result['barge_in_ms'] = barge_in_ms
+                    result['late_frames'] = late_frames
+                result.update({
+                    'first_audio_ms': (first_audio - last_sent) * 1000 if first_audio else float('nan'),
+                    'after_speech_ms': (first_audio - speech_end) * 1000 if first_audio else float('nan'),
+                    'turn_ms': (done - last_sent) * 1000,
+                    'server_latency_ms': data.get('latency_ms'),
+                    'audio_bytes': audio_bytes,
+                })
+                if n == turns - 1 and data.get('speculation'):
+                    result['speculation'] = data['speculation']  # per-session totals
+                results.append(result)
+    except Exception as e:
+        errors.append(f"{client_id}: {type(e).__name__}: {e}")
+
+
+async def worker_counts(http_url):
+    """(active connections, leased upstream sessions) from /health"""
+    _, body = await http_get(f"{http_url}/health")
+    health = json.loads(body)
+    return health['active_connections'], health['pool']['leased']
+
+
+async def check_reconnect(url, http_url, codec='pcm16'):
+    """Problems found when one client id connects twice to the same worker (empty list = passed)"""
+    problems = []
+    before = await worker_counts(http_url)
+    ws_url = f"{url}/ws/reconnect-{os.getpid()}?protocol=binary&codec={codec}"
+    async with websockets.connect(ws_url, open_timeout=30) as first:
+        await asyncio.wait_for(first.recv(), timeout=30)  # connection_status
+        async with websockets.connect(ws_url, open_timeout=30) as second:
+            status = json.loads(await asyncio.wait_for(second.recv(), timeout=30))
+            if status.get('type') != 'connection_status':
+                problems.append(f"second socket: unexpected first message {status}")
+            try:
+                while True:
+                    await asyncio.wait_for(first.recv(), timeout=5)
+            except websockets.ConnectionClosed:
+                if first.close_code != 4409:
+                    problems.append(f"first socket closed with {first.close_code}, expected 4409")
+            except asyncio.TimeoutError:
+                problems.append("first socket still open after the second connected")
+            # The replaced socket's handler has seen its close by now; it must not have torn down the new session
+            await asyncio.sleep(0.5)
+            if await worker_counts(http_url) != (before[0] + 1, before[1] + 1):
+                problems.append(f"while connected: {await worker_counts(http_url)}, expected one more than {before}")
+    deadline = time.monotonic() + 5
+    while (after := await worker_counts(http_url)) != before and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if after != before:
+        problems.append(f"(connections, leased) {after} after both closed, {before} before")
+    return problems
+
+
+def child_pids(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+class ProcessSampler:
+    """CPU seconds, peak RSS and peak thread count of local processes (summed), from /proc."""
+    def __init__(self, pids):
+        self.pids = pids
+        self.peak_rss = 0.0
+        self.peak_threads = 0
+        self.cpu_used = 0.0
+        self._cpu0 = self.cpu_seconds()
+
+    def cpu_seconds(self):
+        total = 0.0
+        for pid in self.pids:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        return total
+
+    def sample(self):
+        self.peak_rss = max(self.peak_rss, sum(rss_mb(pid) for pid in self.pids))
+        self.peak_threads = max(self.peak_threads, sum(thread_count(pid) for pid in self.pids))
+
+    async def run(self, interval=0.25):
+        while True:
+            self.sample()
+            await asyncio.sleep(interval)
+
+    def stop(self):
+        self.sample()
+        self.cpu_used = self.cpu_seconds() - self._cpu0
+
+
+def percentiles(values):
+    values = np.array([v for v in values if v == v])
+    if not len(values):
+        return [float('nan')] * 3
+    return [float(np.percentile(values, p)) for p in (50, 95, 99)]
+
+
+async def drive(args, fixtures, server_pids):
+    results, errors = [], []
+    sampler = ProcessSampler(server_pids) if server_pids else None
+    sampler_task = asyncio.create_task(sampler.run()) if sampler else None
+    start = time.perf_counter()
+    sessions = []
+    for n in range(args.sessions):
+        sessions.append(asyncio.create_task(run_session(
+            args.url, f"load-{os.getpid()}-{n}", fixtures[n % len(fixtures)], args.turns,
+            args.input_mode, results, errors, args.route, args.barge_in_ms, args.codec)))
+        if args.ramp_ms:
+            await asyncio.sleep(args.ramp_ms / 1000)
+    await asyncio.gather(*sessions)
+    elapsed = time.perf_counter() - start
+    if sampler_task:
+        sampler_task.cancel()
+        sampler.stop()
+    return results, errors, elapsed, sampler
+
+
+def start_local_stack(args):
+    """Mock realtime server + uvicorn serving main:app against it; returns (processes, app process)."""
+    mock = subprocess.Popen(
+        [sys.executable, '-m', 'src_v1.mock_realtime', '--port', str(args.mock_port),
+         '--delta-count', str(args.delta_count), '--delta-ms', str(args.delta_ms),
+         '--think-ms', str(args.think_ms), '--think-jitter-ms', str(args.think_jitter_ms)],
+        stdout=subprocess.PIPE, text=True
+    )
+    mock_uri = mock.stdout.readline().strip().rsplit(' ', 1)[-1]
+    env = dict(os.environ, REALTIME_URI=mock_uri, REALTIME_POOL_WARM_SIZE=str(min(args.sessions, 20)),
+               ENDPOINTING=args.endpointing, PYTHONUNBUFFERED='1')
+    for name in ('AZURE_OPENAI_API_KEY', 'AZURE_API_VERSION', 'AZURE_OPENAI_DEPLOYMENT'):
+        env.setdefault(name, 'loadgen')
+    if args.workers > 1:
+        # Warm sessions are per worker
+        env['REALTIME_POOL_WARM_SIZE'] = str(max(1, min(args.sessions, 20) // args.workers))
+        command = [sys.executable, 'main.py', '--workers', str(args.workers), '--host', '127.0.0.1',
+                   '--public-host', '127.0.0.1']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1']
+    app = subprocess.Popen(
+        command + ['--port', str(args.port), '--log-level', 'warning'],
+        env=env, stdout=subprocess.DEVNULL if not args.server_logs else None, stderr=subprocess.STDOUT
+    )
+    return [mock, app], app
+
+
+async def wait_ready(url, processes=(), timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for process in processes:
+            if process.poll() is not None:
+                raise RuntimeError(f"{' '.join(process.args[:4])} exited with code {process.returncode}")
+        try:
+            status, _ = await http_get(f"{url}/health")
+            if b' 200 ' in status:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"server at {url} not ready after {timeout}s")
+
+
+async def wait_workers_ready(url, workers, processes):
+    """Every worker port answers /health and the supervisor's children are known."""
+    host, port = url.rsplit(':', 1)
+    await asyncio.gather(*(wait_ready(f"{host}:{int(port) + i}", processes) for i in range(workers)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--turns', type=int, default=2, help='utterances per session')
+    parser.add_argument('--ramp-ms', type=int, default=20, help='delay between session starts')
+    parser.add_argument('--input-mode', choices=['batch', 'stream', 'server_vad'], default='batch')
+    parser.add_argument('--wav', nargs='*', help='WAV fixtures (16-bit); a synthetic one is used when omitted')
+    parser.add_argument('--url', help='target an already running server (ws://host:port); no process stats')
+    parser.add_argument('--port', type=int, default=8010)
+    parser.add_argument('--workers', type=int, default=1, help='local server worker processes (ports from --port)')
+    parser.add_argument('--route', action='store_true', help='look up /route/{client_id} before connecting')
+    parser.add_argument('--mock-port', type=int, default=8766)
+    parser.add_argument('--think-ms', type=int, default=200)
+    parser.add_argument('--think-jitter-ms', type=int, default=50)
+    parser.add_argument('--delta-count', type=int, default=25)
+    parser.add_argument('--delta-ms', type=int, default=40)
+    parser.add_argument('--barge-in-ms', type=int, help='interrupt each answer this long after its first audio')
+    parser.add_argument('--endpointing', choices=['single', 'speculative', 'aggressive'], default='single',
+                        help='ENDPOINTING of the local server')
+    parser.add_argument('--pause-ms', type=int, default=0, help='pause in the middle of the synthetic utterance')
+    parser.add_argument('--codec', choices=list(CODECS), default='pcm16', help='audio codec of both directions')
+    parser.add_argument('--server-logs', action='store_true')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    parser.add_argument('--gate-p95-ms', type=float, help='exit 1 when turn-done p95 exceeds this')
+    parser.add_argument('--check-reconnect', action='store_true',
+                        help='check that a client id connecting twice replaces its first socket without leaks')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.wav
+        if not paths:
+            paths = [os.path.join(tmp, 'utterance.wav')]
+            make_fixture(paths[0], pause_s=args.pause_ms / 1000)
+        fixtures = [load_fixture(path, get_codec(args.codec)) for path in paths]
+
+    processes, server_pids = [], None
+    if not args.url:
+        processes, app = start_local_stack(args)
+        args.url = f"ws://127.0.0.1:{args.port}"
+        args.route = args.route or args.workers > 1
+    try:
+        http_url = args.url.replace('ws://', 'http://').replace('wss://', 'https://')
+        if processes and args.workers > 1:
+            asyncio.run(wait_workers_ready(http_url, args.workers, processes))
+            server_pids = child_pids(app.pid)
+        elif processes:
+            asyncio.run(wait_ready(http_url, processes))
+            server_pids = [app.pid]
+        else:
+            asyncio.run(wait_ready(http_url))
+        results, errors, elapsed, sampler = asyncio.run(drive(args, fixtures, server_pids))
+        # Event loop lag of the (first) worker over the run
+        _, body = asyncio.run(http_get(f"{http_url}/health"))
+        loop_lag = json.loads(body).get('event_loop', {})
+        reconnect_problems = asyncio.run(check_reconnect(args.url, http_url, args.codec)) if args.check_reconnect else []
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+    first = percentiles(r['first_audio_ms'] for r in results)
+    turn = percentiles(r['turn_ms'] for r in results)
+    after_speech = percentiles(r['after_speech_ms'] for r in results)
+    summary = {
+        'sessions': args.sessions,
+        'turns': len(results),
+        'errors': len(errors),
+        'input_mode': args.input_mode,
+        'codec': args.codec,
+        'workers': args.workers,
+        'elapsed_s': round(elapsed, 1),
+        'first_audio_ms': dict(zip(('p50', 'p95', 'p99'), (round(v, 1) for v in first))),
+        'turn_done_ms': dict(zip(('p50', 'p95', 'p99'), (round(v, 1) for v in turn))),
+        'after_speech_ms': dict(zip(('p50', 'p95', 'p99'), (round(v, 1) for v in after_speech))),
+        'audio_kb_per_turn': round(np.mean([r['audio_bytes'] for r in results]) / 1024, 1) if results else None,
+    }
+    if args.barge_in_ms is not None:
+        barge = percentiles(r.get('barge_in_ms', float('nan')) for r in results)
+        summary['barge_in_ms'] = dict(zip(('p50', 'p95', 'p99'), (round(v, 1) for v in barge)))
+        summary['late_frames'] = sum(r.get('late_frames', 0) for r in results)
+    speculation = [r['speculation'] for r in results if 'speculation' in r]
+    if speculation:
+        hits, misses = sum(s['hits'] for s in speculation), sum(s['misses'] for s in speculation)
+        saved_ms = sum(s['saved_ms_total'] for s in speculation)
+        summary['speculation'] = {
+            'attempts': sum(s['attempts'] for s in speculation),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+            'saved_ms_avg': round(saved_ms / hits, 1) if hits else None,
+        }
+    if loop_lag.get('samples'):
+        summary['server_loop_lag_ms'] = {key: loop_lag[key] for key in ('p50_ms', 'p99_ms', 'max_ms')}
+    if sampler:
+        summary.update({
+            'server_cpu_s': round(sampler.cpu_used, 2),
+            'server_cpu_pct': round(sampler.cpu_used / elapsed * 100, 1),
+            'server_peak_rss_mb': round(sampler.peak_rss, 1),
+            'server_peak_threads': sampler.peak_threads,
+        })
+
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(f"{args.sessions} sessions x {args.turns} turns "
+              f"({args.input_mode}, {args.codec}, {args.workers} workers), "
+              f"{len(results)} completed, {len(errors)} errors in {elapsed:.1f}s")
+        print(f"{'':14s} {'p50':>8s} {'p95':>8s} {'p99':>8s}")
+        print(f"{'first audio':14s} " + ' '.join(f"{v:8.1f}" for v in first))
+        print(f"{'turn done':14s} " + ' '.join(f"{v:8.1f}" for v in turn))
+        print(f"{'after speech':14s} " + ' '.join(f"{v:8.1f}" for v in after_speech))
+        print(f"assistant audio: {summary['audio_kb_per_turn']} KB per turn")
+        if args.barge_in_ms is not None:
+            print(f"{'barge-in':14s} " + ' '.join(f"{v:8.1f}" for v in barge) +
+                  f"   late frames {summary['late_frames']}")
+        if speculation:
+            spec = summary['speculation']
+            print(f"speculation: {spec['attempts']} attempts, {spec['hits']} hits, {spec['misses']} misses, "
+                  f"hit rate {spec['hit_rate']}, {spec['saved_ms_avg']} ms saved per hit")
+        if 'server_loop_lag_ms' in summary:
+            lag = summary['server_loop_lag_ms']
+            print(f"server event loop lag: p50 {lag['p50_ms']} ms, p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms")
+        if sampler:
+            print(f"server: cpu {summary['server_cpu_s']} s ({summary['server_cpu_pct']}%), "
+                  f"peak rss {summary['server_peak_rss_mb']} MB, peak threads {summary['server_peak_threads']}")
+    if args.check_reconnect:
+        print("reconnect check: " + ("ok" if not reconnect_problems else "FAILED"))
+    for error in errors[:5]:
+        print(f"error: {error}", file=sys.stderr)
+    for problem in reconnect_problems:
+        print(f"reconnect: {problem}", file=sys.stderr)
+    if reconnect_problems:
+        sys.exit(1)
+
+    if args.gate_p95_ms is not None and (errors or not turn[1] <= args.gate_p95_ms):
+        print(f"FAIL: turn p95 {turn[1]:.1f} ms > {args.gate_p95_ms} ms or errors", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
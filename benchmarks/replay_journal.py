@@ -0,0 +1,275 @@
+"""
+Replay recorded sessions (JOURNAL_DIR, src_v1/journal.py) through the server
+pipeline against the mock realtime server, to profile real traffic shapes
+offline.
+
+Every journal becomes one browser session with the journal's protocol, codec
+and ?replay flag, and sends what the browser sent, at the offsets it was
+received. Server-microphone audio (MIC_AUDIO, 24 kHz PCM16) is sent as browser
+stream audio instead (start_recording source=browser input_mode=stream),
+encoded with the session's codec, as the replay has no microphone. Several
+journals are replayed concurrently.
+
+    --speed 1    recorded timing (default); 2 = twice as fast
+    --speed 0    as fast as possible (idle time cut)
+
+Either way input the browser sent after its n-th answer ended waits for the
+replay's n-th answer (a late answer would otherwise be barged in on), and the
+rest of the schedule moves by the wait, so every replay takes the same turns.
+
+The app runs with the settings recorded in the first journal's meta and
+JOURNAL_DIR unset. The mock answers after --think-ms (default: median
+response.created -> first audio delta in the journals) with the journals'
+median delta count and size, so upstream time is the recorded one but the
+answers' content is not. --profile PATH runs the app under cProfile
+(`python -m pstats PATH` to read it). With --url the replay drives an
+already running server instead.
+
+Reports per journal the answers, end-of-speech -> first audio (latency_ms of
+audio_response_done) p50 / p95, bytes to the browser and duration, recorded
+vs replayed, and the server CPU time of the replay.
+
+    python -m benchmarks.replay_journal journals/kiosk-1-1760000000-host-123.sjournal
+    python -m benchmarks.replay_journal journals/*.sjournal --speed 0 --profile replay.prof
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.parse
+
+import websockets
+
+from benchmarks.loadgen import ProcessSampler, percentiles, wait_ready
+from src_v1 import journal as sj
+from src_v1.audio_codecs import get_codec
+from src_v1.wire import FRAME_AUDIO_IN, pack_frame
+
+_BYTES_PER_MS = {'g711_ulaw': 8}  # upstream audio of a session by codec; 48 (PCM16 24 kHz) otherwise
+
+
+class Recording:
+    """What one journal says the session sent, got from upstream, and wrote to the browser"""
+    def __init__(self, path):
+        self.path = path
+        self.meta, records = sj.read_journal(path)
+        codec = get_codec(self.meta.get('codec'))
+        self.inputs = []  # (t, answers finished before it, message)
+        self.latencies = []  # latency_ms of every audio_response_done
+        self.answers = 0
+        self.bytes_out = 0
+        self.duration = records[-1][1] if records else 0.0
+        self.think_s = []  # response.created -> first audio delta
+        self.deltas = []  # audio deltas per response
+        self.delta_bytes = []
+        seq = 0
+        created = None
+        count = 0
+        for kind, t, payload in records:
+            if kind in (sj.INBOUND_BINARY, sj.INBOUND_TEXT):
+                message = payload if kind == sj.INBOUND_BINARY else payload.decode('utf-8')
+                if kind == sj.INBOUND_TEXT and self._server_mic_start(message):
+                    message = json.dumps({"type": "start_recording", "source": "browser", "input_mode": "stream"})
+                self.inputs.append((t, self.answers, message))
+            elif kind == sj.MIC_AUDIO:
+                if codec.upstream_format != 'pcm16':
+                    raise ValueError(f"{path}: server microphone audio in a {codec.name} session cannot be replayed")
+                # The server decodes browser audio with the negotiated codec
+                payload = codec.to_wire(payload)
+                if self.meta.get('protocol') == 'binary':
+                    payload = pack_frame(FRAME_AUDIO_IN, 0, seq & 0xFFFF, payload)
+                    seq += 1
+                self.inputs.append((t, self.answers, payload))
+            elif kind == sj.OUTBOUND_AUDIO:
+                self.bytes_out += sj.decode_outbound_audio(payload)[1]
+            elif kind == sj.OUTBOUND_TEXT:
+                self.bytes_out += len(payload)
+                message = json.loads(payload)
+                if message.get('type') == 'audio_response_done':
+                    self.answers += 1
+                    if message.get('latency_ms') is not None:
+                        self.latencies.append(message['latency_ms'])
+            elif kind == sj.UPSTREAM_AUDIO:
+                if created is not None:
+                    self.think_s.append(t - created)
+                    created = None
+                count += 1
+                self.delta_bytes.append(sj.decode_u32(payload))
+            elif kind == sj.UPSTREAM_IN:
+                event_type = json.loads(payload).get('type')
+                if event_type == 'response.created':
+                    created, count = t, 0
+                elif event_type == 'response.done' and count:
+                    self.deltas.append(count)
+                    count = 0
+
+    @staticmethod
+    def _server_mic_start(message):
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return False
+        return data.get('type') == 'start_recording' and data.get('source') != 'browser'
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def query(self):
+        params = {}
+        if self.meta.get('protocol') == 'binary':
+            params['protocol'] = 'binary'
+        if self.meta.get('codec', 'pcm16') != 'pcm16':
+            params['codec'] = self.meta['codec']
+        if self.meta.get('replay'):
+            params['replay'] = '1'
+        return '?' + urllib.parse.urlencode(params) if params else ''
+
+
+async def replay(url, index, recording, speed, drain_s):
+    """Replayed (latencies, answers, bytes received, duration, error)"""
+    client_id = urllib.parse.quote(f"replay-{index}-{recording.meta.get('client_id', 'session')}", safe='')
+    latencies, received, answers = [], [0], [0]
+    answered = asyncio.Event()
+    ws_url = url.replace('http', 'ws', 1) + f"/ws/{client_id}{recording.query()}"
+    error = None
+    start = time.perf_counter()
+    try:
+        async with websockets.connect(ws_url, max_size=None, compression=None, open_timeout=30) as ws:
+            async def receive():
+                async for message in ws:
+                    received[0] += len(message) if isinstance(message, bytes) else len(message.encode("utf-8"))
+                    if isinstance(message, bytes):
+                        continue
+                    data = json.loads(message)
+                    if data.get('type') == 'audio_response_done':
+                        answers[0] += 1
+                        answered.set()
+                        if data.get('latency_ms') is not None:
+                            latencies.append(data['latency_ms'])
+                    elif data.get('type') == 'error':
+                        print(f"⚠️ {recording.name}: {data.get('message')}")
+
+            async def wait_for_answers(n, timeout):
+                deadline = time.perf_counter() + timeout
+                while answers[0] < n and time.perf_counter() < deadline:
+                    answered.clear()
+                    try:
+                        await asyncio.wait_for(answered.wait(), deadline - time.perf_counter())
+                    except asyncio.TimeoutError:
+                        break
+
+            receiver = asyncio.create_task(receive())
+            start = time.perf_counter()
+            for t, answers_before, message in recording.inputs:
+                if speed > 0:
+                    delay = start + t / speed - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                if answers[0] < answers_before:
+                    waited = time.perf_counter()
+                    await wait_for_answers(answers_before, 60)
+                    start += time.perf_counter() - waited
+                await ws.send(message)
+            await wait_for_answers(recording.answers, drain_s)
+            receiver.cancel()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return latencies, answers[0], received[0], time.perf_counter() - start, error
+
+
+def start_local_stack(args, recordings):
+    """Mock realtime server shaped like the recorded upstream + the app with the recorded settings"""
+    bytes_per_ms = _BYTES_PER_MS.get(recordings[0].meta.get('codec'), 48)
+    think = [s for r in recordings for s in r.think_s]
+    deltas = [n for r in recordings for n in r.deltas]
+    delta_bytes = [n for r in recordings for n in r.delta_bytes]
+    think_ms = args.think_ms if args.think_ms is not None else round(statistics.median(think) * 1000) if think else 0
+    delta_count = args.delta_count or (round(statistics.median(deltas)) if deltas else 20)
+    delta_ms = args.delta_ms or (max(1, round(statistics.median(delta_bytes) / bytes_per_ms)) if delta_bytes else 40)
+    mock = subprocess.Popen(
+        [sys.executable, '-m', 'src_v1.mock_realtime', '--port', str(args.mock_port), '--delta-count',
+         str(delta_count), '--delta-ms', str(delta_ms), '--think-ms', str(think_ms)],
+        stdout=subprocess.PIPE, text=True)
+    mock_uri = mock.stdout.readline().strip().rsplit(' ', 1)[-1]
+    configs = {json.dumps(r.meta.get('config', {}), sort_keys=True) for r in recordings}
+    if len(configs) > 1:
+        print(f"⚠️ journals were recorded with {len(configs)} different settings; using {recordings[0].name}'s")
+    env = dict(os.environ, **recordings[0].meta.get('config', {}), REALTIME_URI=mock_uri, PYTHONUNBUFFERED='1',
+               REALTIME_POOL_WARM_SIZE=str(min(len(recordings), 20)))
+    env.pop('JOURNAL_DIR', None)
+    for name in ('AZURE_OPENAI_API_KEY', 'AZURE_API_VERSION', 'AZURE_OPENAI_DEPLOYMENT'):
+        env.setdefault(name, 'replay')
+    command = [sys.executable, '-m', 'uvicorn']
+    if args.profile:
+        command = [sys.executable, '-m', 'cProfile', '-o', args.profile, '-m', 'uvicorn']
+    app = subprocess.Popen(
+        command + ['main:app', '--host', '127.0.0.1', '--port', str(args.port), '--log-level', 'warning'],
+        env=env, stdout=None if args.server_logs else subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    print(f"mock upstream: think {think_ms} ms, {delta_count} deltas x {delta_ms} ms")
+    return mock, app
+
+
+async def run(args):
+    recordings = [Recording(path) for path in args.journals]
+    mock = app = sampler = None
+    url = args.url
+    if url is None:
+        mock, app = start_local_stack(args, recordings)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        if app is not None:
+            await wait_ready(url, (mock, app))
+            sampler = ProcessSampler([app.pid])
+        results = await asyncio.gather(*(replay(url, i, recording, args.speed, args.drain_s)
+                                         for i, recording in enumerate(recordings)))
+        if sampler is not None:
+            sampler.stop()
+    finally:
+        for process in (app, mock):
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    speed = f"{args.speed:g}x" if args.speed > 0 else "as fast as possible"
+    print(f"{len(recordings)} journals replayed ({speed}); first audio = end of speech -> first audio delta")
+    print(f"{'journal':32s} {'':9s} {'answers':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'kB out':>8s} {'seconds':>8s}")
+    for recording, (latencies, answers, received, duration, error) in zip(recordings, results):
+        rows = (('recorded', recording.latencies, recording.answers, recording.bytes_out, recording.duration),
+                ('replayed', latencies, answers, received, duration))
+        for i, (label, values, count, size, seconds) in enumerate(rows):
+            p50, p95, _ = percentiles(values)
+            name = recording.name[-32:] if i == 0 else ''
+            print(f"{name:32s} {label:9s} {count:7d} {p50:8.0f} {p95:8.0f} {size / 1e3:8.1f} {seconds:8.1f}")
+        if error:
+            print(f"{'':32s} error: {error}")
+    if sampler is not None:
+        print(f"server CPU {sampler.cpu_used:.2f} s, peak RSS {sampler.peak_rss:.0f} MB")
+    if args.profile:
+        print(f"profile written to {args.profile} (python -m pstats {args.profile})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('journals', nargs='+', help='.sjournal files written with JOURNAL_DIR set')
+    parser.add_argument('--speed', type=float, default=1.0, help='timing factor; 0 = as fast as possible')
+    parser.add_argument('--url', help='replay against a running server instead of a local app + mock')
+    parser.add_argument('--think-ms', type=int, help='mock think time (default: from the journals)')
+    parser.add_argument('--delta-count', type=int, help='mock deltas per answer (default: from the journals)')
+    parser.add_argument('--delta-ms', type=int, help='mock audio per delta (default: from the journals)')
+    parser.add_argument('--drain-s', type=float, default=10.0, help='wait this long for outstanding answers')
+    parser.add_argument('--profile', help='run the app under cProfile, writing stats to this file')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--mock-port', type=int, default=8795)
+    parser.add_argument('--server-logs', action='store_true')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
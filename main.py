@@ -5,17 +5,38 @@ FastAPI backend for VAD-enabled Speech-to-Speech system
 import os
 from dotenv import load_dotenv
 import asyncio
+import functools
 import json
 import base64
+import random
+import re
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from src_v1.backend import RealtimeOpenAIClient
-from src_v1.audio import AudioRecorder
-from src_v1.text_format import format_text
+from src_v1.async_backend import AsyncRealtimeOpenAIClient
+from src_v1.session_pool import RealtimeSessionPool
+from src_v1.session_registry import create_session_registry, rendezvous_node
+from src_v1.audio_codecs import PCM16, get_codec
+from src_v1.capture_backends import is_loaded, load_capture_backend, loaded_backends
+from src_v1.codec import base64_to_pcm16, pcm16_to_base64
+from src_v1.conversation_window import ConversationWindow
+from src_v1.offload import Offloader
+from src_v1.response_cache import PendingAnswer, ResponseCache, cache_key
+from src_v1.static_assets import StaticAssetCache
+from src_v1.turn_store import TurnAudioStore, build_wav
+from src_v1.journal import SessionJournal, drain as drain_journals
+from src_v1.endpointing import ENDPOINTING_MODES, SpeculationStats, SpeculativeTurn
+from src_v1.metrics import LoopLagMonitor, MetricsRegistry, TurnTimeline
+from src_v1.outbound import SLOW_CONSUMER_POLICIES, OutboundSender
+from src_v1.wire import FRAME_AUDIO_IN, PROTOCOL_BINARY, PROTOCOL_JSON, unpack_frame
+from src_v1.stream_vad import ServerVADSession, StreamingVADSession
+from src_v1.text_format import IncrementalFormatter, format_text
+from src_v1.vad_engine import VAD_ENGINES, EnergyVADBatcher
 
+import socket
 import threading
 import time
 from typing import cast
@@ -40,150 +61,1036 @@ AZURE_API_KEY = cast(str, os.getenv('AZURE_OPENAI_API_KEY'))
 AZURE_API_VERSION = cast(str, os.getenv('AZURE_API_VERSION'))
 AZURE_OPENAI_DEPLOYMENT = cast(str, os.getenv('AZURE_OPENAI_DEPLOYMENT'))
 
-# Ensure required env vars are set
-assert AZURE_API_KEY is not None, 'AZURE_OPENAI_API_KEY is not set'
-assert AZURE_API_VERSION is not None, 'AZURE_API_VERSION is not set'
-assert AZURE_OPENAI_DEPLOYMENT is not None, 'AZURE_OPENAI_DEPLOYMENT is not set'
+# Upload mode for browser-streamed audio: "batch" sends the whole utterance after VAD,
+# "stream" appends speech to input_audio_buffer while the user is still talking,
+# "server_vad" skips the local VAD: all audio is appended and the realtime API's
+# server_vad turn detection ends turns and creates the responses
+DEFAULT_INPUT_MODE = os.getenv('REALTIME_INPUT_MODE', 'batch')
+INPUT_MODES = ("batch", "stream", "server_vad")
+SERVER_VAD_SILENCE_MS = int(os.getenv('SERVER_VAD_SILENCE_MS', '500'))
+SERVER_VAD_THRESHOLD = float(os.getenv('SERVER_VAD_THRESHOLD', '0.5'))
+SERVER_VAD_PREFIX_MS = int(os.getenv('SERVER_VAD_PREFIX_MS', '300'))
 
-# Global client for WebSocket sessions
-clients = {}
+# Upstream client implementation: "async" runs on the server's event loop,
+# "thread" is the websocket-client version with one thread per session
+REALTIME_CLIENT = os.getenv('REALTIME_CLIENT', 'async')
+
+# Upstream realtime endpoint (without query string); e.g. ws://127.0.0.1:8765/openai/realtime
+# for the local mock (python -m src_v1.mock_realtime). Unset: the Azure resource in backend.py
+REALTIME_URI = os.getenv('REALTIME_URI')
+
+# VAD backend for browser and server-mic recording: "webrtc" or "energy" (src_v1/vad_engine.py)
+VAD_ENGINE = os.getenv('VAD_ENGINE', 'webrtc')
+# Audio kept before each detected speech onset so the first syllable is not clipped
+VAD_PRE_ROLL_MS = int(os.getenv('VAD_PRE_ROLL_MS', '300'))
+
+# Full duplex: keep listening while the answer plays; speech then cancels the response,
+# truncates it at the played offset and flushes the browser's playback queue
+BARGE_IN = os.getenv('BARGE_IN', '1') not in ('0', 'false', 'no')
+
+# Endpointing of browser-streamed audio (src_v1/endpointing.py): "single" sends the utterance
+# after the final 1 s of silence; "speculative" already sends it after SPECULATIVE_SILENCE_MS and
+# releases the answer once the final threshold confirms the turn ("aggressive": plays it at once)
+ENDPOINTING = os.getenv('ENDPOINTING', 'single')
+SPECULATIVE_SILENCE_MS = int(os.getenv('SPECULATIVE_SILENCE_MS', '300'))
+
+# Pre-connected upstream sessions
+POOL_WARM_SIZE = int(os.getenv('REALTIME_POOL_WARM_SIZE', '2'))
+POOL_MAX_SIZE = int(os.getenv('REALTIME_POOL_MAX_SIZE', '100'))
+POOL_IDLE_TIMEOUT = float(os.getenv('REALTIME_POOL_IDLE_TIMEOUT', '300'))
+
+# Per-connection outbound queue (src_v1/outbound.py)
+OUTBOUND_QUEUE_SIZE = int(os.getenv('OUTBOUND_QUEUE_SIZE', '256'))  # messages
+OUTBOUND_COALESCE_MS = int(os.getenv('OUTBOUND_COALESCE_MS', '120'))  # max audio per merged frame
+OUTBOUND_MAX_LAG_MS = int(os.getenv('OUTBOUND_MAX_LAG_MS', '2000'))
+SLOW_CONSUMER_POLICY = os.getenv('SLOW_CONSUMER_POLICY', 'coalesce')  # coalesce | drop_replay | disconnect
+
+# CPU-bound audio / text work off the event loop (src_v1/offload.py): thread pool for NumPy,
+# wave and base64 work, optional process pool for pure-Python formatting. Jobs below
+# OFFLOAD_MIN_BYTES run inline; OFFLOAD_THREADS=0 runs everything on the loop
+OFFLOAD_THREADS = int(os.getenv('OFFLOAD_THREADS', '2'))
+OFFLOAD_PROCESSES = int(os.getenv('OFFLOAD_PROCESSES', '0'))
+OFFLOAD_MIN_BYTES = int(os.getenv('OFFLOAD_MIN_BYTES', '32768'))
+LOOP_LAG_INTERVAL_MS = int(os.getenv('LOOP_LAG_INTERVAL_MS', '50'))  # event loop lag probe period
+
+# Web UI served from memory with gzip/brotli variants and ETags (src_v1/static_assets.py).
+# STATIC_RELOAD=1 re-reads index.html when it changes on disk (development)
+STATIC_RELOAD = os.getenv('STATIC_RELOAD', '0') in ('1', 'true', 'yes')
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', '0'))  # seconds; 0 = revalidate every load (304)
+
+# Worker identity and routing. Each worker process owns the sessions whose WebSocket it
+# holds; SESSION_REGISTRY shares ownership and counts between workers
+# ("local" in-process, or sqlite:///path/registry.db for all workers of a host).
+WORKER_ID = os.getenv('WORKER_ID') or f"{socket.gethostname()}-{os.getpid()}"
+NODE_URL = os.getenv('NODE_URL', '').rstrip('/')  # public http(s) base URL of this worker
+# Public base URLs of all workers / hosts; client ids are spread over them by rendezvous hashing
+CLUSTER_NODES = [node.strip().rstrip('/') for node in os.getenv('CLUSTER_NODES', '').split(',') if node.strip()]
+SESSION_REGISTRY = os.getenv('SESSION_REGISTRY', 'local')
+REGISTRY_HEARTBEAT_S = float(os.getenv('REGISTRY_HEARTBEAT_S', '2'))
+
+# The local VAD stack (scipy, webrtcvad) is imported on first use (src_v1/capture_backends.py);
+# CAPTURE_PRELOAD=1 imports it in the background right after startup so the first turn does not wait
+CAPTURE_PRELOAD = os.getenv('CAPTURE_PRELOAD', '1') not in ('0', 'false', 'no')
+
+# Answers to repeated prompts replayed from disk (src_v1/response_cache.py); empty path = off.
+# Typed prompts are looked up before any upstream call. RESPONSE_CACHE_AUDIO_KEY=1 also keys
+# spoken turns by their input transcription: a hit replaces the upstream answer if it has not started
+RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', '')
+RESPONSE_CACHE_MAX_MB = float(os.getenv('RESPONSE_CACHE_MAX_MB', '64'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '256'))
+RESPONSE_CACHE_TTL_S = float(os.getenv('RESPONSE_CACHE_TTL_S', '86400'))
+RESPONSE_CACHE_AUDIO_KEY = os.getenv('RESPONSE_CACHE_AUDIO_KEY', '0') in ('1', 'true', 'yes')
+RESPONSE_CACHE_TRANSCRIPTION_MODEL = os.getenv('RESPONSE_CACHE_TRANSCRIPTION_MODEL', 'whisper-1')
+RESPONSE_CACHE_CHUNK_MS = 40  # cached audio goes out in chunks of this size, paced like playback
+RESPONSE_CACHE_LEAD_MS = 300  # ... up to this far ahead of real time
+
+# Upstream conversation kept to a sliding window (src_v1/conversation_window.py): after each
+# response the oldest turns beyond any of these limits are deleted (0 = no limit, all 0 = off).
+# CONTEXT_SUMMARY=1 keeps their text as one item at the start of the conversation
+CONTEXT_MAX_TURNS = int(os.getenv('CONTEXT_MAX_TURNS', '0'))
+CONTEXT_MAX_AUDIO_S = float(os.getenv('CONTEXT_MAX_AUDIO_S', '0'))
+CONTEXT_MAX_TOKENS = int(os.getenv('CONTEXT_MAX_TOKENS', '0'))
+CONTEXT_SUMMARY = os.getenv('CONTEXT_SUMMARY', '0') in ('1', 'true', 'yes')
+CONTEXT_SUMMARY_CHARS = int(os.getenv('CONTEXT_SUMMARY_CHARS', '1000'))
+
+# Per-session event journal (src_v1/journal.py) for replaying real sessions offline with
+# benchmarks/replay_journal.py; empty dir = off. JOURNAL_SAMPLE is the fraction of sessions recorded
+JOURNAL_DIR = os.getenv('JOURNAL_DIR', '')
+JOURNAL_SAMPLE = float(os.getenv('JOURNAL_SAMPLE', '1.0'))
+JOURNAL_MAX_MB = float(os.getenv('JOURNAL_MAX_MB', '64'))  # per session; recording stops there
+# Settings that change how a session behaves, copied into each journal for the replay
+JOURNAL_CONFIG = ('REALTIME_INPUT_MODE', 'VAD_ENGINE', 'VAD_PRE_ROLL_MS', 'BARGE_IN', 'ENDPOINTING',
+                  'SPECULATIVE_SILENCE_MS', 'SERVER_VAD_SILENCE_MS', 'SERVER_VAD_THRESHOLD', 'SERVER_VAD_PREFIX_MS',
+                  'OUTBOUND_QUEUE_SIZE', 'OUTBOUND_COALESCE_MS', 'OUTBOUND_MAX_LAG_MS', 'SLOW_CONSUMER_POLICY',
+                  'CONTEXT_MAX_TURNS', 'CONTEXT_MAX_AUDIO_S', 'CONTEXT_MAX_TOKENS', 'CONTEXT_SUMMARY',
+                  'CONTEXT_SUMMARY_CHARS')
+
+def validate_config():
+    """Problems with the environment, checked by the startup hook (importing main never fails on config)"""
+    problems = [f'{name} is not set' for name, value in (
+        ('AZURE_OPENAI_API_KEY', AZURE_API_KEY),
+        ('AZURE_API_VERSION', AZURE_API_VERSION),
+        ('AZURE_OPENAI_DEPLOYMENT', AZURE_OPENAI_DEPLOYMENT),
+    ) if value is None]
+    for name, value, choices in (
+        ('REALTIME_INPUT_MODE', DEFAULT_INPUT_MODE, INPUT_MODES),
+        ('REALTIME_CLIENT', REALTIME_CLIENT, ('async', 'thread')),
+        ('VAD_ENGINE', VAD_ENGINE, tuple(VAD_ENGINES)),
+        ('ENDPOINTING', ENDPOINTING, ENDPOINTING_MODES),
+        ('SLOW_CONSUMER_POLICY', SLOW_CONSUMER_POLICY, SLOW_CONSUMER_POLICIES),
+    ):
+        if value not in choices:
+            problems.append(f'{name} must be one of {choices}, got {value!r}')
+    if not 0 <= SERVER_VAD_THRESHOLD <= 1:
+        problems.append(f'SERVER_VAD_THRESHOLD must be between 0 and 1, got {SERVER_VAD_THRESHOLD}')
+    if POOL_WARM_SIZE > POOL_MAX_SIZE:
+        problems.append(f'REALTIME_POOL_WARM_SIZE ({POOL_WARM_SIZE}) exceeds REALTIME_POOL_MAX_SIZE ({POOL_MAX_SIZE})')
+    if not SPECULATIVE_SILENCE_MS < 1000:
+        problems.append(f'SPECULATIVE_SILENCE_MS must be below the final 1000 ms, got {SPECULATIVE_SILENCE_MS}')
+    if OFFLOAD_THREADS < 0 or OFFLOAD_PROCESSES < 0:
+        problems.append('OFFLOAD_THREADS and OFFLOAD_PROCESSES must not be negative')
+    if min(CONTEXT_MAX_TURNS, CONTEXT_MAX_AUDIO_S, CONTEXT_MAX_TOKENS) < 0 or CONTEXT_SUMMARY_CHARS <= 0:
+        problems.append('CONTEXT_MAX_* must not be negative and CONTEXT_SUMMARY_CHARS must be positive')
+    if RESPONSE_CACHE_PATH and (RESPONSE_CACHE_MAX_MB <= 0 or RESPONSE_CACHE_MAX_ENTRIES <= 0
+                                or RESPONSE_CACHE_TTL_S <= 0):
+        problems.append('RESPONSE_CACHE_MAX_MB, RESPONSE_CACHE_MAX_ENTRIES and RESPONSE_CACHE_TTL_S must be positive')
+    if JOURNAL_DIR and (not 0 < JOURNAL_SAMPLE <= 1 or JOURNAL_MAX_MB <= 0):
+        problems.append('JOURNAL_SAMPLE must be in (0, 1] and JOURNAL_MAX_MB positive')
+    return problems
+
+async def preload_capture_backend():
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, load_capture_backend, "stream", VAD_ENGINE)
+    except ImportError as e:
+        print(f"⚠️ Local VAD unavailable ({e}); input_mode server_vad still works")
+
+registry = create_session_registry(SESSION_REGISTRY, ttl=max(15.0, REGISTRY_HEARTBEAT_S * 5))
+
+# Prometheus-style metrics served on /metrics
+metrics = MetricsRegistry()
+TURN_STAGE_SECONDS = metrics.histogram(
+    'voice_turn_stage_seconds', 'Time from the previous recorded stage of a turn to this stage', ['stage', 'mode'])
+TURN_FIRST_AUDIO_SECONDS = metrics.histogram(
+    'voice_turn_first_audio_seconds', 'End of speech to first response.audio.delta', ['mode'])
+TURN_SECONDS = metrics.histogram(
+    'voice_turn_seconds', 'End of speech to last audio byte flushed to the browser', ['mode'])
+TURNS_TOTAL = metrics.counter('voice_turns_total', 'Completed assistant turns', ['mode'])
+WS_BYTES_TOTAL = metrics.counter('voice_ws_bytes_total', 'Bytes on browser WebSockets', ['direction'])
+ACTIVE_SESSIONS = metrics.gauge('voice_active_sessions', 'Connected browser sessions')
+UPSTREAM_CONNECTS_TOTAL = metrics.counter('voice_upstream_connects_total', 'Upstream realtime connections opened')
+UPSTREAM_RECONNECTS_TOTAL = metrics.counter(
+    'voice_upstream_reconnects_total', 'Dead upstream connections dropped by the pool and replaced')
+UPSTREAM_CONNECT_ERRORS_TOTAL = metrics.counter('voice_upstream_connect_errors_total', 'Failed upstream connects')
+BARGE_IN_SECONDS = metrics.histogram(
+    'voice_barge_in_seconds', 'Speech onset during playback to playback_flush written to the browser', ['source'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.5))
+BARGE_INS_TOTAL = metrics.counter('voice_barge_ins_total', 'Assistant turns interrupted by the user', ['source'])
+SPECULATIONS_TOTAL = metrics.counter(
+    'voice_speculations_total', 'Speculative submits at a tentative end of speech', ['outcome'])
+SPECULATION_SAVED_SECONDS = metrics.histogram(
+    'voice_speculation_saved_seconds', 'Answer start gained by confirmed speculative submits')
+OFFLOAD_SECONDS = metrics.histogram(
+    'voice_offload_seconds', 'CPU-bound jobs by pool (inline = ran on the event loop)', ['job', 'pool'],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+LOOP_LAG_SECONDS = metrics.histogram(
+    'voice_event_loop_lag_seconds', 'How late the event loop ran a timer (blocked loop)',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+RESPONSE_CACHE_LOOKUPS_TOTAL = metrics.counter(
+    'voice_response_cache_lookups_total', 'Response cache lookups by prompt source', ['source', 'result'])
+RESPONSE_CACHE_SAVED_SECONDS = metrics.histogram(
+    'voice_response_cache_saved_seconds', 'First audio of a cache hit earlier than when the answer was generated')
+RESPONSE_CACHE_ENTRIES = metrics.gauge('voice_response_cache_entries', 'Answers in the response cache')
+RESPONSE_CACHE_BYTES = metrics.gauge('voice_response_cache_bytes', 'Audio and transcript bytes in the response cache')
+
+offload = Offloader(threads=OFFLOAD_THREADS, processes=OFFLOAD_PROCESSES, min_bytes=OFFLOAD_MIN_BYTES,
+                    on_job=lambda job, pool, seconds: OFFLOAD_SECONDS.observe(seconds, job=job, pool=pool))
+loop_lag = LoopLagMonitor(interval=LOOP_LAG_INTERVAL_MS / 1000, histogram=LOOP_LAG_SECONDS)
+static_assets = StaticAssetCache("web_vad/static", reload=STATIC_RELOAD, max_age=STATIC_MAX_AGE)
+
+async def create_realtime_client():
+    """Connect and pre-configure one upstream session (callbacks are bound on lease)"""
+    client_class = AsyncRealtimeOpenAIClient if REALTIME_CLIENT == 'async' else RealtimeOpenAIClient
+    client = client_class(
+        api_key=AZURE_API_KEY,
+        api_version=AZURE_API_VERSION,
+        deployment_name=AZURE_OPENAI_DEPLOYMENT,
+        retain_audio=False,  # deltas are streamed to the browser, nothing to accumulate
+        uri=REALTIME_URI
+    )
+    if isinstance(client, AsyncRealtimeOpenAIClient):
+        await client.connect()
+    else:
+        await asyncio.get_running_loop().run_in_executor(None, client.connect)
+    # Local VAD decides end of turn; saves a session.update round trip on the first streamed turn
+    client.disable_turn_detection()
+    return client
+
+session_pool = RealtimeSessionPool(
+    create_realtime_client,
+    warm_size=POOL_WARM_SIZE,
+    max_size=POOL_MAX_SIZE,
+    idle_timeout=POOL_IDLE_TIMEOUT
+)
+UPSTREAM_CONNECTS_TOTAL.set_function(lambda: session_pool.counters['created'])
+UPSTREAM_RECONNECTS_TOTAL.set_function(lambda: session_pool.counters['evicted_unhealthy'])
+UPSTREAM_CONNECT_ERRORS_TOTAL.set_function(lambda: session_pool.counters['connect_errors'])
 
 class VADWebSocketManager:
+    """Sessions of this worker process; other workers have their own manager and pool."""
     def __init__(self):
+        self.clients = {}  # client_id -> leased upstream realtime client
         self.active_connections = {}
         self.audio_recorders = {}
+        self.stream_sessions = {}  # client_id -> StreamingVADSession / ServerVADSession (browser microphone)
+        self.input_modes = {}  # client_id -> "batch" | "stream"
+        self.timelines = {}  # client_id -> TurnTimeline of the turn being captured / answered
         self.loop = None
-        self.accumulated_pcm_base64 = {}  # client_id -> str
+        self.replay_clients = set()  # sessions that opted in to /turns/{client_id}/{turn_id}.wav
+        self.turn_audio = TurnAudioStore(max_turns_per_client=3, sample_rate=24000)
+        self.turn_ids = {}  # client_id -> id of the response currently streaming
+        self.turn_start_bytes = {}  # client_id -> sender.audio_bytes_sent when the current turn began
+        self.protocols = {}  # client_id -> PROTOCOL_JSON | PROTOCOL_BINARY (audio framing)
+        self.codecs = {}  # client_id -> AudioCodec of the browser leg (src_v1/audio_codecs.py)
+        self.senders = {}  # client_id -> OutboundSender (ordered outbound queue, coalesces when congested)
+        self.heartbeat_task = None  # registry heartbeat of this worker
+        self.preload_task = None  # background import of the local VAD stack (CAPTURE_PRELOAD)
+        self.speculations = {}  # client_id -> SpeculativeTurn awaiting the final silence threshold
+        self.speculation_stats = {}  # client_id -> SpeculationStats
+        self.formatters = {}  # client_id -> (turn_id, IncrementalFormatter) of the answer text being streamed
+        self.response_cache = None  # ResponseCache, opened at startup when RESPONSE_CACHE_PATH is set
+        self.cache_fills = {}  # client_id -> PendingAnswer: upstream answer being recorded for the cache
+        self.cached_playbacks = {}  # client_id -> (turn_id, task) of a cached answer being played
+        self.journals = {}  # client_id -> SessionJournal of a recorded session (JOURNAL_DIR)
+        self.vad_batcher = None  # EnergyVADBatcher of the stream sessions, created with the first (VAD_ENGINE=energy)
     
+    def worker_stats(self):
+        """Heartbeat payload for the session registry"""
+        return {
+            "pid": os.getpid(),
+            "active_connections": len(self.active_connections),
+            "pool": session_pool.stats()
+        }
+
     def set_loop(self, loop):
         """Set the event loop for async operations"""
         self.loop = loop
     
-    async def connect(self, websocket: WebSocket, client_id: str):
+    async def connect(self, websocket: WebSocket, client_id: str, replay: bool = False, protocol: str = PROTOCOL_JSON,
+                      codec=PCM16):
+        """Accept the browser socket; False when another live worker already owns client_id"""
         await websocket.accept()
+        owner = await self.loop.run_in_executor(None, registry.claim, client_id, WORKER_ID)
+        if owner != WORKER_ID:
+            await websocket.send_text(json.dumps({
+                "type": "error",
+                "message": f"Session {client_id} is connected to worker {owner}"
+            }))
+            await websocket.close(code=4409)
+            return False
+        previous = self.active_connections.get(client_id)
+        if previous is not None:
+            # Same client again on this worker (e.g. a reload before the old socket died): the new socket
+            # takes over, the old session is torn down (the registry claim stays) and its socket closed
+            print(f"🔁 {client_id} reconnected, closing its previous socket")
+            self.disconnect(client_id, release_claim=False)
+            self.loop.create_task(self._close_replaced(previous, client_id))
         self.active_connections[client_id] = websocket
-        
-        # Create RealtimeOpenAIClient for this session
-        client = RealtimeOpenAIClient(
-            api_key=AZURE_API_KEY,
-            api_version=AZURE_API_VERSION,
-            deployment_name=AZURE_OPENAI_DEPLOYMENT,
-            text_callback=lambda text: self._schedule_text_response(client_id, text),
-            audio_callback=lambda audio: self._schedule_audio_response(client_id, audio),
-            audio_done_callback=lambda: self._schedule_audio_done(client_id)
+        self.turn_ids[client_id] = 1
+        self.turn_start_bytes[client_id] = 0
+        self.protocols[client_id] = protocol
+        self.codecs[client_id] = codec
+        journal = None
+        if JOURNAL_DIR and random.random() < JOURNAL_SAMPLE:
+            journal = self.open_journal(client_id, replay, protocol, codec)
+        sender = OutboundSender(
+            websocket,
+            protocol,
+            codec=codec,
+            max_queue=OUTBOUND_QUEUE_SIZE,
+            coalesce_ms=OUTBOUND_COALESCE_MS,
+            max_lag_ms=OUTBOUND_MAX_LAG_MS,
+            policy=SLOW_CONSUMER_POLICY,
+            offload=offload,
+            on_slow=lambda policy: self._on_slow_consumer(client_id, policy),
+            on_bytes=lambda size: WS_BYTES_TOTAL.inc(size, direction="out"),
+            on_frame=journal.outbound if journal is not None else None
         )
+        sender.start()
+        self.senders[client_id] = sender
+        if replay:
+            self.replay_clients.add(client_id)
+            self.turn_audio.set_sample_rate(client_id, codec.sample_rate)
         
         try:
-            client.connect()
-            clients[client_id] = client
-            await websocket.send_json({
+            # Lease a pre-connected RealtimeOpenAIClient for this session
+            client = await session_pool.lease()
+            if self.active_connections.get(client_id) is not websocket:
+                # Replaced by a newer socket of the same client while waiting for the lease
+                session_pool.release(client)
+                return False
+            self.clients[client_id] = client
+            client.text_callback = lambda text: self._deliver(
+                client_id, lambda: self._schedule_text_response(client_id, text))
+            client.text_delta_callback = lambda delta: self._deliver(
+                client_id, lambda: self._call_in_loop(lambda: self.handle_text_delta(client_id, delta)))
+            client.audio_callback = lambda audio: self._deliver(
+                client_id, lambda: self._schedule_audio_response(client_id, audio), is_audio=True)
+            client.audio_done_callback = lambda: self._deliver(
+                client_id, lambda: self._schedule_audio_done(client_id))
+            client.sent_callback = lambda event_type: self._on_upstream_sent(client_id, event_type)
+            client.input_event_callback = lambda event_type, event: self._on_input_event(client_id, event_type, event)
+            client.input_transcript_callback = lambda item_id, transcript: self._call_in_loop(
+                lambda: self.handle_input_transcript(client_id, transcript))
+            if journal is not None:
+                client.journal_callback = journal.upstream_in
+            # g711_ulaw: the realtime session itself speaks mu-law (pooled sessions may come back switched)
+            client.set_audio_format(codec.upstream_format)
+            if CONTEXT_MAX_TURNS or CONTEXT_MAX_AUDIO_S or CONTEXT_MAX_TOKENS:
+                client.set_context_window(ConversationWindow(
+                    max_turns=CONTEXT_MAX_TURNS, max_audio_s=CONTEXT_MAX_AUDIO_S, max_tokens=CONTEXT_MAX_TOKENS,
+                    summarize=CONTEXT_SUMMARY, summary_chars=CONTEXT_SUMMARY_CHARS))
+            if self.response_cache is not None and RESPONSE_CACHE_AUDIO_KEY:
+                client.enable_input_transcription(RESPONSE_CACHE_TRANSCRIPTION_MODEL)
+            sender.send_json({
                 "type": "connection_status",
                 "status": "connected",
-                "message": "Connected to Azure OpenAI"
+                "message": "Connected to Azure OpenAI",
+                "audio_protocol": protocol,
+                "codec": codec.name,
+                "sample_rate": codec.sample_rate,
+                "worker_id": WORKER_ID,
+                "barge_in": BARGE_IN
             })
         except Exception as e:
-            await websocket.send_json({
+            # No upstream session: release the claim, the sender and any lease, then tell the browser
+            print(f"❌ Connection failed for {client_id}: {e}")
+            self.disconnect(client_id, websocket)
+            try:
+                await websocket.send_text(json.dumps({
+                    "type": "error",
+                    "message": f"Connection failed: {str(e)}"
+                }))
+                # 1013: try again later
+                await websocket.close(code=1013)
+            except Exception:
+                pass  # browser already gone
+            return False
+        return True
+
+    async def _close_replaced(self, websocket: WebSocket, client_id: str):
+        """Close a socket whose client connected again; its handler then finds the session gone"""
+        try:
+            await websocket.send_text(json.dumps({
                 "type": "error",
-                "message": f"Connection failed: {str(e)}"
-            })
-    
+                "message": f"Session {client_id} was opened again on another connection"
+            }))
+            await websocket.close(code=4409)
+        except Exception:
+            pass  # already closed
+
+    def open_journal(self, client_id: str, replay: bool, protocol: str, codec):
+        """Start recording the session; the file name keeps client id, start time and worker apart"""
+        safe_id, worker = (re.sub(r'[^A-Za-z0-9_.-]', '_', value)[:64] for value in (client_id, WORKER_ID))
+        path = os.path.join(JOURNAL_DIR, f"{safe_id}-{int(time.time())}-{worker}.sjournal")
+        meta = {
+            "client_id": client_id,
+            "worker_id": WORKER_ID,
+            "protocol": protocol,
+            "codec": codec.name,
+            "replay": replay,
+            "config": {name: os.getenv(name) for name in JOURNAL_CONFIG if os.getenv(name) is not None},
+        }
+        journal = SessionJournal(path, meta, max_bytes=int(JOURNAL_MAX_MB * (1 << 20)))
+        self.journals[client_id] = journal
+        print(f"📼 journal {client_id}: {path}")
+        return journal
+
+    def energy_vad(self):
+        """The worker's EnergyVADBatcher: one BatchEnergyVAD slot per local-VAD stream session"""
+        if self.vad_batcher is None:
+            # At most one stream session per leased upstream session
+            self.vad_batcher = EnergyVADBatcher(max_sessions=POOL_MAX_SIZE)
+        return self.vad_batcher
+
+    def journal_stage(self, client_id: str, name: str):
+        """A decision of the session (stage, speculation, barge-in) in its journal, if recorded"""
+        journal = self.journals.get(client_id)
+        if journal is not None:
+            journal.stage(name)
+
+    def _run_in_loop(self, coro_factory):
+        """
+        Run a handler coroutine on the main event loop.
+        Callbacks from the async client already run on the loop; the thread client needs a hop.
+        """
+        if not self.loop:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self.loop.create_task(coro_factory())
+        else:
+            self.loop.call_soon_threadsafe(lambda: asyncio.create_task(coro_factory()))
+
+    def _call_in_loop(self, fn):
+        """Run a plain function on the main event loop (no task per call)"""
+        if not self.loop:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            fn()
+        else:
+            self.loop.call_soon_threadsafe(fn)
+
+    def _deliver(self, client_id: str, fn, is_audio: bool = False):
+        """Upstream output of a turn; held back while the turn is an unconfirmed speculation"""
+        if ENDPOINTING == "single":
+            fn()
+            return
+
+        def deliver():
+            speculation = self.speculations.get(client_id)
+            if speculation is None:
+                fn()
+            else:
+                speculation.deliver(fn, is_audio)
+        self._call_in_loop(deliver)
+
+    def speculate(self, client_id: str):
+        """Tentative end of speech: the utterance is submitted as a speculative turn"""
+        speculation = SpeculativeTurn(hold=ENDPOINTING == "speculative")
+        self.speculations[client_id] = speculation
+        self.speculation_stats.setdefault(client_id, SpeculationStats()).attempts += 1
+        self.journal_stage(client_id, "speculate")
+        return speculation
+
+    def confirm_speculation(self, client_id: str):
+        """Final silence threshold reached: release the speculative answer. False if there is none"""
+        speculation = self.speculations.get(client_id)
+        if speculation is None or speculation.discarded:
+            return False
+        del self.speculations[client_id]
+        saved = speculation.saved_s(time.monotonic())
+        self.speculation_stats[client_id].hit(saved)
+        SPECULATIONS_TOTAL.inc(outcome="hit")
+        SPECULATION_SAVED_SECONDS.observe(saved)
+        self.journal_stage(client_id, "speculation_confirmed")
+        speculation.release()
+        return True
+
+    def rollback_speculation(self, client_id: str):
+        """
+        The user spoke again before the final threshold: cancel the speculative response,
+        delete its items upstream and drop its output. False if nothing was pending.
+        """
+        speculation = self.speculations.get(client_id)
+        if speculation is None or speculation.discarded:
+            return False
+        # Stays registered as discarded so output already in flight is dropped too
+        speculation.discard()
+        self.journal_stage(client_id, "speculation_rollback")
+        if speculation.released_audio:
+            # Aggressive mode: part of the answer is already playing in the browser
+            self.barge_in(client_id, time.monotonic(), reason="speculation_rollback")
+        self.formatters.pop(client_id, None)
+        self.cache_fills.pop(client_id, None)
+        client = self.clients.get(client_id)
+        if client is not None:
+            client.rollback_response()
+        timeline = self.timelines.get(client_id)
+        if timeline is not None:
+            timeline.clear(TurnTimeline.PAYLOAD_ENCODED, TurnTimeline.UPSTREAM_SENT,
+                           TurnTimeline.FIRST_AUDIO_DELTA, TurnTimeline.TRANSCRIPT_DONE)
+        self.speculation_stats[client_id].miss()
+        SPECULATIONS_TOTAL.inc(outcome="miss")
+        return True
+
     def _schedule_text_response(self, client_id: str, text: str):
         """Schedule text response to be sent in the main event loop"""
-        if self.loop:
-            self.loop.call_soon_threadsafe(
-                lambda: asyncio.create_task(self.handle_text_response(client_id, text))
-            )
-    
+        self.mark_stage(client_id, TurnTimeline.TRANSCRIPT_DONE)
+        fill = self.cache_fills.get(client_id)
+        if fill is not None and (fill.turn_id == self.turn_ids.get(client_id, 1) or fill.done):
+            # A finished fill is only replaced at the next submission: the transcript may follow audio_done
+            fill.transcript = text
+            self._store_if_complete(client_id, fill)
+        # Inline (not a task) so it runs before audio_done advances the turn id
+        self._call_in_loop(lambda: self.handle_text_response(client_id, text))
+
+    def mark_stage(self, client_id: str, stage: str, mode: str = None):
+        """
+        Timestamp a stage of the client's current turn. speech_start and end_of_speech open
+        a timeline; later stages are ignored when no turn is in flight (e.g. typed prompts).
+        """
+        timeline = self.timelines.get(client_id)
+        if timeline is None:
+            if stage not in (TurnTimeline.SPEECH_START, TurnTimeline.END_OF_SPEECH):
+                return
+            timeline = TurnTimeline(self.turn_ids.get(client_id, 1), mode or self.input_modes.get(client_id))
+            self.timelines[client_id] = timeline
+        if mode:
+            timeline.mode = mode
+        if not timeline.has(stage):
+            self.journal_stage(client_id, stage)
+        timeline.mark(stage)
+
+    def mark_end_of_speech(self, client_id: str, mode: str):
+        """End-of-speech decision: the reference point for the turn's latency"""
+        self.mark_stage(client_id, TurnTimeline.END_OF_SPEECH, mode)
+
+    def _on_upstream_sent(self, client_id: str, event_type: str):
+        journal = self.journals.get(client_id)
+        if journal is not None:
+            journal.upstream_out(event_type)
+        # response.create is the last event of a turn submission
+        if event_type == "response.create":
+            self.mark_stage(client_id, TurnTimeline.UPSTREAM_SENT)
+            self.start_cache_fill(client_id)
+
+    def _on_input_event(self, client_id: str, event_type: str, event: dict):
+        received_at = time.monotonic()
+        self._call_in_loop(lambda: self.handle_input_event(client_id, event_type, event, received_at))
+
+    def handle_input_event(self, client_id: str, event_type: str, event: dict, received_at: float):
+        """Turn detection of the realtime API (input_mode server_vad), relayed to the browser as vad_event"""
+        session = self.stream_sessions.get(client_id)
+        sender = self.senders.get(client_id)
+        if not isinstance(session, ServerVADSession) or sender is None:
+            return
+        if event_type == 'input_audio_buffer.speech_started':
+            if BARGE_IN:
+                self.barge_in(client_id, received_at, source="server_vad")
+            self.mark_stage(client_id, TurnTimeline.SPEECH_START, "server_vad")
+            sender.send_json({"type": "vad_event", "event": "speech_started", "audio_ms": event.get('audio_start_ms')})
+        elif event_type == 'input_audio_buffer.speech_stopped':
+            self.mark_end_of_speech(client_id, "server_vad")
+            print(f"🔇 server_vad: หยุดพูด - AI กำลังตอบ ({event.get('audio_end_ms')} ms)")
+            sender.send_json({"type": "vad_event", "event": "speech_stopped", "audio_ms": event.get('audio_end_ms')})
+            if not BARGE_IN:
+                # Half duplex: stop forwarding until the next start_recording
+                self.stream_sessions.pop(client_id).stop()
+            sender.send_json({
+                "type": "recording_status",
+                "status": "listening" if BARGE_IN else "stopped",
+                "message": "Audio sent to AI"
+            })
+        elif event_type == 'input_audio_buffer.committed':
+            # The service committed the turn and creates the response itself
+            self.mark_stage(client_id, TurnTimeline.UPSTREAM_SENT)
+            self.start_cache_fill(client_id)
+            sender.send_json({"type": "vad_event", "event": "committed", "item_id": event.get('item_id')})
+
     def _schedule_audio_response(self, client_id: str, audio_chunk: str):
         """Schedule audio response to be sent in the main event loop"""
-        if self.loop:
-            self.loop.call_soon_threadsafe(
-                lambda: asyncio.create_task(self.handle_audio_response(client_id, audio_chunk))
-            )
-        # Accumulate PCM base64 for this client
-        if client_id not in self.accumulated_pcm_base64:
-            self.accumulated_pcm_base64[client_id] = ''
-        self.accumulated_pcm_base64[client_id] += audio_chunk
+        self.mark_stage(client_id, TurnTimeline.FIRST_AUDIO_DELTA)
+        turn_id = self.turn_ids.get(client_id, 1)
+        self._call_in_loop(lambda: self.handle_audio_response(client_id, audio_chunk, turn_id))
+        fill = self.cache_fills.get(client_id)
+        if fill is not None and fill.turn_id == turn_id:
+            fill.add_audio(base64_to_pcm16(audio_chunk))
+        # Deltas are streamed to the browser as they arrive; keep decoded PCM only for replay
+        if client_id in self.replay_clients:
+            codec = self.codecs.get(client_id, PCM16)
+            self.turn_audio.append(client_id, turn_id, codec.upstream_to_pcm16(base64_to_pcm16(audio_chunk)))
     
     def _schedule_audio_done(self, client_id: str):
-        if self.loop:
-            self.loop.call_soon_threadsafe(
-                lambda: asyncio.create_task(self.handle_audio_done(client_id))
-            )
+        # Turn id advances here, in upstream event order, so later deltas belong to the next turn
+        turn_id = self.turn_ids.get(client_id, 1)
+        self.turn_ids[client_id] = turn_id + 1
+        # Detach the timeline so speech for the next turn starts a new one
+        timeline = self.timelines.pop(client_id, None)
+        if timeline is not None:
+            timeline.mark(TurnTimeline.AUDIO_DONE)
+        self._call_in_loop(lambda: self.handle_audio_done(client_id, turn_id, timeline))
+        fill = self.cache_fills.get(client_id)
+        if fill is not None and fill.turn_id == turn_id:
+            # Kept until the next turn: the input transcription may still be on its way
+            fill.done = True
+            self._store_if_complete(client_id, fill)
+
+    # --- response cache ---
+
+    def start_cache_fill(self, client_id: str):
+        """A turn was submitted upstream: record its answer for the response cache"""
+        if self.response_cache is None:
+            return
+        turn_id = self.turn_ids.get(client_id, 1)
+        fill = self.cache_fills.get(client_id)
+        if fill is not None and fill.turn_id == turn_id and not fill.done:
+            return  # typed prompt: created with its key by send_text_prompt
+        if RESPONSE_CACHE_AUDIO_KEY:
+            # Spoken turn: keyed once the input transcription arrives
+            self.cache_fills[client_id] = PendingAnswer(turn_id)
+        else:
+            self.cache_fills.pop(client_id, None)
+
+    def _store_if_complete(self, client_id: str, fill: PendingAnswer):
+        if fill.storable and self.cache_fills.get(client_id) is fill:
+            del self.cache_fills[client_id]
+            self._run_in_loop(lambda: self._store_answer(fill))
+
+    async def _store_answer(self, fill: PendingAnswer):
+        audio = b''.join(fill.chunks)
+        try:
+            await offload.thread(self.response_cache.put, fill.key, fill.transcript, audio, fill.first_audio_s,
+                                 name='response_cache_put')
+        except (OSError, ValueError) as e:
+            print(f"⚠️ response cache: store failed: {e}")
 
-    def disconnect(self, client_id: str):
+    def lookup_cached(self, client_id: str, text: str, modalities: list = None, source: str = "text"):
+        """(key, entry) of a prompt in the response cache; entry is None on a miss, key None when uncacheable"""
+        client = self.clients.get(client_id)
+        if self.response_cache is None or client is None or 'audio' not in (modalities or ('audio',)):
+            return None, None  # text-only replies have no audio to store
+        key = cache_key(text, client.audio_format, modalities)
+        if key is None:
+            return None, None
+        entry = self.response_cache.get(key)
+        RESPONSE_CACHE_LOOKUPS_TOTAL.inc(source=source, result="hit" if entry is not None else "miss")
+        return key, entry
+
+    def handle_input_transcript(self, client_id: str, transcript: str):
+        """
+        Transcription of the user's audio (RESPONSE_CACHE_AUDIO_KEY): keys the answer being
+        recorded, or on a hit replaces the upstream answer if none of its audio has arrived yet
+        """
+        fill = self.cache_fills.get(client_id)
+        if fill is None or fill.key is not None:
+            return
+        key, entry = self.lookup_cached(client_id, transcript, source="transcript")
+        if key is None:
+            return
+        client = self.clients[client_id]
+        if (entry is not None and not fill.done and not fill.chunks and client.response_active
+                and client_id not in self.speculations):
+            print(f"💾 response cache hit (transcript) {client_id}: {transcript!r}")
+            client.cancel_response()
+            del self.cache_fills[client_id]
+            self.play_cached(client_id, entry, waited_s=time.monotonic() - fill.started)
+            return
+        fill.key = key
+        self._store_if_complete(client_id, fill)
+
+    def play_cached(self, client_id: str, entry, waited_s: float = 0.0):
+        """
+        Answer from the response cache as a turn of its own: text at once, audio paced like
+        playback. Nothing is sent upstream, so the realtime conversation does not see this turn.
+        """
+        turn_id = self.turn_ids.get(client_id, 1)
+        self.turn_ids[client_id] = turn_id + 1
+        self.formatters.pop(client_id, None)
+        timeline = self.timelines.pop(client_id, None)
+        previous = self.cached_playbacks.get(client_id)
+        task = asyncio.ensure_future(self._play_cached(
+            client_id, entry, turn_id, timeline, waited_s, previous[1] if previous else None))
+        self.cached_playbacks[client_id] = (turn_id, task)
+        return turn_id
+
+    async def _play_cached(self, client_id: str, entry, turn_id: int, timeline: TurnTimeline, waited_s: float,
+                           previous: asyncio.Task = None):
+        if previous is not None and not previous.done():
+            # Back-to-back hits play one after the other, not interleaved
+            await asyncio.wait([previous])
+        sender = self.senders.get(client_id)
+        if sender is None:
+            return
+        codec = self.codecs.get(client_id, PCM16)
+        if len(entry.transcript) >= offload.min_bytes:
+            sender.send_json(asyncio.ensure_future(self._format_text_response(turn_id, entry.transcript)))
+        else:
+            sender.send_json({"type": "text_response", "turn_id": turn_id, "text": format_text(entry.transcript)})
+        loop = asyncio.get_running_loop()
+        chunk_bytes = codec.upstream_bytes_per_s * RESPONSE_CACHE_CHUNK_MS // 1000 // 2 * 2
+        started = loop.time()
+        queued_s = 0.0
+        try:
+            for offset in range(0, entry.audio_len, chunk_bytes):
+                data = self.response_cache.read_audio(entry, offset, offset + chunk_bytes)
+                if offset == 0:
+                    if timeline is not None:
+                        timeline.mark(TurnTimeline.FIRST_AUDIO_DELTA)
+                    RESPONSE_CACHE_SAVED_SECONDS.observe(
+                        max(0.0, entry.first_audio_s - waited_s - (loop.time() - started)))
+                self.handle_audio_response(client_id, pcm16_to_base64(data), turn_id)
+                if client_id in self.replay_clients:
+                    self.turn_audio.append(client_id, turn_id, codec.upstream_to_pcm16(data))
+                queued_s += len(data) / codec.upstream_bytes_per_s
+                delay = queued_s - RESPONSE_CACHE_LEAD_MS / 1000 - (loop.time() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        except KeyError:
+            print(f"⚠️ response cache: answer evicted while playing, turn {turn_id} cut short")
+        if timeline is not None:
+            timeline.mark(TurnTimeline.AUDIO_DONE)
+        self.handle_audio_done(client_id, turn_id, timeline, cached=True)
+
+    def barge_in(self, client_id: str, detected_at: float, source: str = "browser", reason: str = "barge_in"):
+        """
+        User speech while the assistant is still answering or its audio is still playing:
+        cancel the response upstream, truncate it at the estimated played offset, drop the
+        turn's queued audio and tell the browser to flush its player. Returns True if it
+        interrupted anything. Also used to undo an aggressive speculative answer.
+        """
+        client = self.clients.get(client_id)
+        sender = self.senders.get(client_id)
+        if client is None or sender is None:
+            return False
+        generating = client.response_active
+        cached = self.cached_playbacks.pop(client_id, None)
+        replaying = cached is not None and not cached[1].done()
+        if not generating and not replaying and not sender.playing:
+            return False
+        playing_turn, played_ms, _ = sender.playback_position()
+        turn_id = self.turn_ids.get(client_id, 1)
+        if cached is not None:
+            cached[1].cancel()
+        if generating:
+            # Audio of the turn being generated may not have reached the browser yet
+            played_ms = played_ms if playing_turn == turn_id else 0.0
+            # The cancelled response sends no response.audio.done: close the turn here
+            self.turn_ids[client_id] = turn_id + 1
+            self.timelines.pop(client_id, None)
+            self.cache_fills.pop(client_id, None)
+        else:
+            turn_id = cached[0] if replaying else playing_turn
+        if cached is not None and turn_id == cached[0]:
+            played_ms = played_ms if playing_turn == turn_id else 0.0
+            # A cached answer never reached the realtime conversation: nothing to cancel or truncate
+            client.cancel_response()
+        else:
+            client.cancel_response(audio_end_ms=played_ms)
+        dropped_ms = sender.flush_audio(turn_id)
+        self.turn_start_bytes[client_id] = sender.audio_bytes_sent
+        print(f"✋ {reason} {client_id}: turn {turn_id} cut at {played_ms:.0f} ms, dropped {dropped_ms:.0f} ms queued")
+        self.journal_stage(client_id, reason)
+        on_sent = None
+        if reason == "barge_in":
+            BARGE_INS_TOTAL.inc(source=source)
+            on_sent = lambda: BARGE_IN_SECONDS.observe(time.monotonic() - detected_at, source=source)
+        sender.send_json({
+            "type": "playback_flush",
+            "reason": reason,
+            "turn_id": turn_id,
+            "played_ms": round(played_ms),
+            "dropped_ms": round(dropped_ms)
+        }, on_sent=on_sent)
+        return True
+
+    def _on_slow_consumer(self, client_id: str, policy: str):
+        """Browser is not reading fast enough; the sender already coalesces harder"""
+        print(f"🐢 Slow consumer {client_id}: policy={policy}")
+        if policy == "drop_replay":
+            self.replay_clients.discard(client_id)
+            self.turn_audio.drop_client(client_id)
+        elif policy == "disconnect":
+            websocket = self.active_connections.get(client_id)
+            self.disconnect(client_id)
+            if websocket is not None:
+                # 1013: try again later
+                self._run_in_loop(lambda: websocket.close(code=1013))
+
+    def disconnect(self, client_id: str, websocket: WebSocket = None, release_claim: bool = True):
+        """
+        Tear down the session of client_id. With `websocket`, only if that socket still owns it
+        (the handler of a replaced socket must not end the session that took over)
+        """
+        if websocket is not None and self.active_connections.get(client_id) is not websocket:
+            return
         if client_id in self.active_connections:
             del self.active_connections[client_id]
-        if client_id in clients:
-            clients[client_id].close()
-            del clients[client_id]
+        if client_id in self.clients:
+            # Unused sessions go back to the pool, used ones are closed and replaced
+            session_pool.release(self.clients.pop(client_id))
         if client_id in self.audio_recorders:
             del self.audio_recorders[client_id]
-    
-    async def handle_text_response(self, client_id: str, text: str):
-        if client_id in self.active_connections:
-            formatted = format_text(text)
-            await self.active_connections[client_id].send_json({
-                "type": "text_response",
-                "text": formatted
-            })
-    
-    async def handle_audio_response(self, client_id: str, audio_chunk: str):
-        if client_id in self.active_connections:
-            await self.active_connections[client_id].send_json({
-                "type": "audio_chunk",
-                "audio": audio_chunk
-            })
-    
-    async def handle_audio_done(self, client_id: str):
-        if client_id in self.active_connections:
-            # เมื่อจบ audio ให้แปลง PCM base64 ที่สะสมเป็น WAV base64 แล้วส่งกลับ client
-            pcm_base64 = self.accumulated_pcm_base64.get(client_id, '')
-            if pcm_base64:
-                wav_base64 = AudioRecorder.pcm_base64_to_wav_base64(pcm_base64, sample_rate=24000)
-                await self.active_connections[client_id].send_json({
-                    "type": "audio_chunk",
-                    "audio": wav_base64
-                })
-            # reset buffer
-            self.accumulated_pcm_base64[client_id] = ''
-            await self.active_connections[client_id].send_json({
-                "type": "audio_response_done"
-            })
-    
+        session = self.stream_sessions.pop(client_id, None)
+        if session is not None:
+            session.stop()  # frees its energy VAD slot
+        self.input_modes.pop(client_id, None)
+        self.timelines.pop(client_id, None)
+        self.replay_clients.discard(client_id)
+        self.turn_audio.drop_client(client_id)
+        self.turn_ids.pop(client_id, None)
+        self.turn_start_bytes.pop(client_id, None)
+        self.protocols.pop(client_id, None)
+        self.codecs.pop(client_id, None)
+        self.speculations.pop(client_id, None)
+        self.speculation_stats.pop(client_id, None)
+        self.formatters.pop(client_id, None)
+        self.cache_fills.pop(client_id, None)
+        cached = self.cached_playbacks.pop(client_id, None)
+        if cached is not None:
+            cached[1].cancel()
+        sender = self.senders.pop(client_id, None)
+        if sender is not None:
+            sender.close()
+        journal = self.journals.pop(client_id, None)
+        if journal is not None:
+            journal.close()
+        if self.loop and release_claim:
+            self.loop.run_in_executor(None, registry.release, client_id, WORKER_ID)
+
+    def handle_text_delta(self, client_id: str, delta: str):
+        """Forward the part of the answer text that is formatted for good (see IncrementalFormatter)"""
+        sender = self.senders.get(client_id)
+        if sender is None:
+            return
+        turn_id = self.turn_ids.get(client_id, 1)
+        entry = self.formatters.get(client_id)
+        if entry is None or entry[0] != turn_id:
+            # First delta of this turn (an interrupted turn's formatter is dropped)
+            entry = self.formatters[client_id] = (turn_id, IncrementalFormatter())
+        html = entry[1].feed(delta)
+        if html:
+            sender.send_json({"type": "text_delta", "turn_id": turn_id, "text": html})
+
+    def handle_text_response(self, client_id: str, text: str):
+        sender = self.senders.get(client_id)
+        if sender is None:
+            return
+        turn_id = self.turn_ids.get(client_id, 1)
+        entry = self.formatters.pop(client_id, None)
+        if entry is not None and entry[0] == turn_id:
+            formatter = entry[1]
+            rest = formatter.finish()
+            if rest:
+                sender.send_json({"type": "text_delta", "turn_id": turn_id, "text": rest})
+            if formatter.text == text:
+                # Same as format_text(text): the deltas added up to the final text
+                sender.send_json({"type": "text_response", "turn_id": turn_id, "text": formatter.html})
+                return
+        if len(text) >= offload.min_bytes:
+            # Long answer: format it in the pool, the sender keeps its place in the queue
+            sender.send_json(asyncio.ensure_future(self._format_text_response(turn_id, text)))
+            return
+        sender.send_json({
+            "type": "text_response",
+            "turn_id": turn_id,
+            "text": format_text(text)
+        })
+
+    async def _format_text_response(self, turn_id: int, text: str):
+        formatted = await offload.process(format_text, text, name='format_text')
+        return {"type": "text_response", "turn_id": turn_id, "text": formatted}
+
+    def handle_audio_response(self, client_id: str, audio_chunk: str, turn_id: int = 0):
+        if client_id in self.senders:
+            # Framed (JSON or binary) and possibly coalesced by the sender task
+            self.senders[client_id].send_audio(turn_id, audio_chunk)
+
+    def handle_audio_done(self, client_id: str, turn_id: int, timeline: TurnTimeline = None, cached: bool = False):
+        sender = self.senders.get(client_id)
+        if sender is None:
+            return
+        # The audio was already streamed chunk by chunk - no WAV re-send here.
+        # Sessions with replay enabled can fetch it lazily as a WAV by turn id.
+        done = {"type": "audio_response_done", "turn_id": turn_id}
+        if cached:
+            done["cached"] = True
+        if self.turn_audio.has_turn(client_id, turn_id):
+            # Absolute with NODE_URL: the replay lives in this worker's memory only
+            done["replay_url"] = f"{NODE_URL}/turns/{client_id}/{turn_id}.wav"
+        latency = timeline.elapsed(TurnTimeline.END_OF_SPEECH, TurnTimeline.FIRST_AUDIO_DELTA) if timeline else None
+        if latency is not None:
+            print(f"⏱️ [{timeline.mode}] end-of-speech -> first audio: {latency * 1000:.0f} ms")
+            done.update({"input_mode": timeline.mode, "latency_ms": round(latency * 1000, 1)})
+
+        def finish():
+            # Evaluated by the sender after this turn's audio went out, so the byte count is complete
+            sent = sender.audio_bytes_sent
+            done["bytes_sent"] = sent - self.turn_start_bytes.get(client_id, 0)
+            self.turn_start_bytes[client_id] = sent
+            done["retained_bytes"] = self.turn_audio.retained_bytes(client_id)
+            done["outbound"] = {"depth": sender.depth, "last_lag_ms": round(sender.last_lag_ms, 1)}
+            if timeline is not None:
+                done["timeline_ms"] = timeline.offsets_ms()
+            if client_id in self.speculation_stats:
+                done["speculation"] = self.speculation_stats[client_id].as_dict()
+            return done
+        sender.send_json(finish, on_sent=lambda: self._finish_turn(timeline))
+
+    def _finish_turn(self, timeline: TurnTimeline):
+        """Last byte of the turn reached the browser socket: record the timeline in /metrics"""
+        if timeline is None:
+            return
+        timeline.mark(TurnTimeline.LAST_BYTE_FLUSHED)
+        mode = timeline.mode or "unknown"
+        for stage, seconds in timeline.intervals():
+            TURN_STAGE_SECONDS.observe(seconds, stage=stage, mode=mode)
+        first_audio = timeline.elapsed(TurnTimeline.END_OF_SPEECH, TurnTimeline.FIRST_AUDIO_DELTA)
+        if first_audio is not None:
+            # Negative with aggressive endpointing (audio before the end of speech was confirmed)
+            TURN_FIRST_AUDIO_SECONDS.observe(max(0.0, first_audio), mode=mode)
+        total = timeline.elapsed(TurnTimeline.END_OF_SPEECH, TurnTimeline.LAST_BYTE_FLUSHED)
+        if total is not None:
+            TURN_SECONDS.observe(total, mode=mode)
+        TURNS_TOTAL.inc(mode=mode)
+
     async def send_message(self, client_id: str, message_type: str, data: dict):
-        if client_id in self.active_connections:
-            await self.active_connections[client_id].send_json({
+        if client_id in self.senders:
+            self.senders[client_id].send_json({
                 "type": message_type,
                 **data
             })
 
 manager = VADWebSocketManager()
+ACTIVE_SESSIONS.set_function(lambda: len(manager.active_connections))
+RESPONSE_CACHE_ENTRIES.set_function(
+    lambda: manager.response_cache.stats()['entries'] if manager.response_cache is not None else 0)
+RESPONSE_CACHE_BYTES.set_function(
+    lambda: manager.response_cache.stats()['bytes'] if manager.response_cache is not None else 0)
+
+async def registry_heartbeat():
+    """Publish this worker and its stats; sessions of workers that stop heartbeating expire"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, registry.heartbeat, WORKER_ID, NODE_URL, manager.worker_stats())
+        except Exception as e:
+            print(f"Registry heartbeat failed: {e}")
+        await asyncio.sleep(REGISTRY_HEARTBEAT_S)
 
 @app.on_event("startup")
 async def startup_event():
-    """Set the event loop for the manager"""
+    """Validate the config, set this worker's event loop for the manager and join the session registry"""
+    problems = validate_config()
+    if problems:
+        raise RuntimeError("Invalid configuration:\n  " + "\n  ".join(problems))
     manager.set_loop(asyncio.get_running_loop())
+    static_assets.load("index.html")
+    if RESPONSE_CACHE_PATH:
+        manager.response_cache = ResponseCache(
+            RESPONSE_CACHE_PATH, max_bytes=int(RESPONSE_CACHE_MAX_MB * (1 << 20)),
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_s=RESPONSE_CACHE_TTL_S)
+        print(f"💾 response cache {RESPONSE_CACHE_PATH}: {manager.response_cache.stats()['entries']} answers")
+    if JOURNAL_DIR:
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        print(f"📼 recording {JOURNAL_SAMPLE:.0%} of sessions to {JOURNAL_DIR}")
+    registry.heartbeat(WORKER_ID, NODE_URL, manager.worker_stats())
+    manager.heartbeat_task = asyncio.create_task(registry_heartbeat())
+    loop_lag.start()
+    await session_pool.start()
+    if CAPTURE_PRELOAD:
+        manager.preload_task = asyncio.create_task(preload_capture_backend())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if manager.heartbeat_task is not None:
+        manager.heartbeat_task.cancel()
+    registry.remove_worker(WORKER_ID)
+    registry.close()
+    await session_pool.stop()
+    loop_lag.stop()
+    offload.shutdown()
+    if manager.response_cache is not None:
+        manager.response_cache.close()
+    for journal in list(manager.journals.values()):
+        journal.close()
+    drain_journals()
 
 @app.get("/")
-async def get_index():
-    """Serve the main HTML page"""
-    with open("web_vad/static/index.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    return HTMLResponse(content=html_content)
+async def get_index(request: Request):
+    """Serve the main HTML page (from memory, compressed variant per Accept-Encoding, 304 on a matching ETag)"""
+    status, body, headers = static_assets.respond("index.html", request.headers.get("accept-encoding"),
+                                                  request.headers.get("if-none-match"))
+    return Response(content=body, status_code=status, headers=headers)
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    await manager.connect(websocket, client_id)
+    replay = websocket.query_params.get("replay") in ("1", "true")
+    # Binary audio framing is opt-in (?protocol=binary); JSON stays the default
+    protocol = PROTOCOL_BINARY if websocket.query_params.get("protocol") == PROTOCOL_BINARY else PROTOCOL_JSON
+    try:
+        # Audio codec of both directions (?codec=pcm16|mulaw|adpcm|g711_ulaw)
+        codec = get_codec(websocket.query_params.get("codec"))
+    except ValueError as e:
+        await websocket.accept()
+        await websocket.send_text(json.dumps({"type": "error", "message": str(e)}))
+        await websocket.close(code=1003)
+        return
+    if not await manager.connect(websocket, client_id, replay=replay, protocol=protocol, codec=codec):
+        return
+    journal = manager.journals.get(client_id)
     try:
         while True:
-            data = await websocket.receive_json()
-            await handle_websocket_message(client_id, data)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if manager.active_connections.get(client_id) is not websocket:
+                return  # replaced by a newer connection of the same client (closed with 4409)
+            if journal is not None:
+                journal.inbound(message["bytes"] if message.get("bytes") is not None else message.get("text") or "")
+            if message.get("bytes") is not None:
+                WS_BYTES_TOTAL.inc(len(message["bytes"]), direction="in")
+                await handle_binary_frame(client_id, message["bytes"])
+            elif message.get("text") is not None:
+                WS_BYTES_TOTAL.inc(len(message["text"].encode('utf-8')), direction="in")
+                await handle_websocket_message(client_id, json.loads(message["text"]))
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
+        manager.disconnect(client_id, websocket)
     except Exception as e:
         print(f"WebSocket error: {e}")
-        manager.disconnect(client_id)
+        manager.disconnect(client_id, websocket)
+
+async def handle_binary_frame(client_id: str, data: bytes):
+    """
+    Microphone audio as a binary frame: header + audio with ?protocol=binary,
+    raw audio otherwise (in the connection's codec, PCM16 24kHz mono by default)
+    """
+    if manager.protocols.get(client_id) != PROTOCOL_BINARY:
+        await handle_audio_append(client_id, data)
+        return
+    try:
+        frame_type, _, _, _, payload = unpack_frame(data)
+    except ValueError as e:
+        await manager.send_message(client_id, "error", {"message": str(e)})
+        return
+    if frame_type == FRAME_AUDIO_IN:
+        await handle_audio_append(client_id, payload)
 
 async def handle_websocket_message(client_id: str, data: dict):
     """Handle incoming WebSocket messages"""
@@ -191,31 +1098,79 @@ async def handle_websocket_message(client_id: str, data: dict):
     
     if message_type == "start_recording":
         # Start VAD recording
-        await start_vad_recording(client_id)
+        if data.get("source") == "browser":
+            await start_stream_recording(client_id, data.get("input_mode"))
+        else:
+            await start_vad_recording(client_id)
     
     elif message_type == "stop_recording":
         # Stop VAD recording
         await stop_vad_recording(client_id)
 
+    elif message_type == "audio_append":
+        # Same as a binary frame, for clients that can only send text
+        await handle_audio_append(client_id, base64_to_pcm16(data.get("audio", "")))
+
+    elif message_type == "send_text":
+        # Typed prompt; "modalities": ["text"] asks for a text-only reply
+        await send_text_prompt(client_id, data.get("text", ""), data.get("modalities"))
+
+async def send_text_prompt(client_id: str, text: str, modalities: list = None):
+    client = manager.clients.get(client_id)
+    if client is None:
+        await manager.send_message(client_id, "error", {"message": "Client not connected"})
+        return
+    if not text.strip():
+        return
+    # A spoken turn still waiting for confirmation is replaced by the typed one
+    manager.rollback_speculation(client_id)
+    manager.speculations.pop(client_id, None)
+    key, entry = manager.lookup_cached(client_id, text, modalities)
+    if entry is not None:
+        print(f"💾 response cache hit {client_id}: {text!r}")
+        manager.play_cached(client_id, entry)
+        return
+    if key is not None:
+        manager.cache_fills[client_id] = PendingAnswer(manager.turn_ids.get(client_id, 1), key)
+    client.response_done_event.clear()
+    await asyncio.get_running_loop().run_in_executor(None, client.send_prompt_only_text, text, modalities)
+
 async def start_vad_recording(client_id: str):
     """Start VAD recording for a client"""
-    if client_id not in clients:
+    if client_id not in manager.clients:
         await manager.send_message(client_id, "error", {"message": "Client not connected"})
         return
     
     try:
+        if manager.codecs[client_id].upstream_format != PCM16.upstream_format:
+            # The server microphone records PCM16; the session was switched to another input format
+            await manager.send_message(client_id, "error", {"message": "Server microphone needs codec pcm16"})
+            return
+        # sounddevice / PortAudio load with the first server-mic recording, off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, load_capture_backend, "server_mic", VAD_ENGINE)
+        from src_v1.audio import AudioRecorder
         # Create audio recorder for this client
-        recorder = AudioRecorder(fs=24000)
+        recorder = AudioRecorder(fs=24000, pre_roll_ms=VAD_PRE_ROLL_MS, vad_engine=VAD_ENGINE)
         manager.audio_recorders[client_id] = recorder
         
+        def on_speech_start():
+            # Audio thread -> event loop; the timestamp is taken where the speech was detected
+            detected_at = time.monotonic()
+            manager._call_in_loop(lambda: manager.barge_in(client_id, detected_at, "server_mic"))
+
+        journal = manager.journals.get(client_id)
+
         # Start recording in a separate thread
         def record_audio():
             try:
                 recorder.record_with_vad_auto_send(
-                    client=clients[client_id],
+                    client=manager.clients[client_id],
                     prompt="",
                     max_duration=30,
-                    silence_threshold=1.0
+                    silence_threshold=1.0,
+                    stage_callback=lambda stage: manager.mark_stage(client_id, stage, "server_mic"),
+                    barge_in_callback=on_speech_start if BARGE_IN else None,
+                    frame_callback=journal.mic_audio if journal is not None else None
                 )
             except Exception as e:
                 print(f"Recording error: {e}")
@@ -231,8 +1186,173 @@ async def start_vad_recording(client_id: str):
     except Exception as e:
         await manager.send_message(client_id, "error", {"message": f"Failed to start recording: {str(e)}"})
 
+def new_stream_session(sample_rate: int = 24000):
+    # The energy engine scores every session's frames of a tick together (handle_audio_append)
+    vad_options = {"batch": manager.energy_vad().batch} if VAD_ENGINE == "energy" else {}
+    return StreamingVADSession(
+        fs=sample_rate,
+        max_duration=30,
+        silence_threshold=1.0,
+        pre_roll_ms=VAD_PRE_ROLL_MS,
+        vad_engine=VAD_ENGINE,
+        tentative_silence=SPECULATIVE_SILENCE_MS / 1000 if ENDPOINTING != "single" else None,
+        **vad_options
+    )
+
+async def start_stream_recording(client_id: str, input_mode=None):
+    """Start VAD on audio streamed from the browser microphone"""
+    if client_id not in manager.clients:
+        await manager.send_message(client_id, "error", {"message": "Client not connected"})
+        return
+
+    input_mode = input_mode or manager.input_modes.get(client_id, DEFAULT_INPUT_MODE)
+    if input_mode not in INPUT_MODES:
+        await manager.send_message(client_id, "error", {"message": f"Unknown input_mode: {input_mode}"})
+        return
+    if input_mode != "server_vad" and not is_loaded("stream", VAD_ENGINE):
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, load_capture_backend, "stream", VAD_ENGINE)
+        except (ImportError, OSError) as e:
+            await manager.send_message(client_id, "error", {"message": f"Local VAD unavailable: {e}"})
+            return
+    manager.input_modes[client_id] = input_mode
+
+    previous = manager.stream_sessions.pop(client_id, None)
+    if previous is not None:
+        previous.stop()
+    client = manager.clients[client_id]
+    if input_mode == "server_vad":
+        client.enable_server_vad(SERVER_VAD_SILENCE_MS, SERVER_VAD_THRESHOLD, SERVER_VAD_PREFIX_MS)
+        manager.stream_sessions[client_id] = ServerVADSession(manager.codecs[client_id].sample_rate)
+    else:
+        if client.server_vad:
+            client.disable_turn_detection()
+        manager.stream_sessions[client_id] = new_stream_session(manager.codecs[client_id].sample_rate)
+    await manager.send_message(client_id, "recording_status", {
+        "status": "started",
+        "message": "Recording started with server_vad" if input_mode == "server_vad" else "Recording started with VAD",
+        "input_mode": input_mode
+    })
+
+async def submit_utterance(client_id: str, client, session, streaming: bool):
+    """Send the captured utterance upstream and request the answer"""
+    client.response_done_event.clear()
+    mode = "stream" if streaming else "batch"
+    if streaming:
+        # Speech was already encoded and appended while the user talked
+        manager.mark_stage(client_id, TurnTimeline.PAYLOAD_ENCODED, mode)
+        client.commit_input_audio()
+        return
+
+    def encode_utterance(codec, pcm):
+        return pcm16_to_base64(codec.to_upstream(pcm))
+
+    pcm = session.audio_buffer
+    audio_base64 = await offload.thread(encode_utterance, manager.codecs[client_id], pcm, size=len(pcm),
+                                        name='encode_utterance')
+    manager.mark_stage(client_id, TurnTimeline.PAYLOAD_ENCODED, mode)
+    # send_prompt writes a large frame on a blocking socket - keep it off the event loop
+    await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(client.send_prompt, prompt="", audio_base64=audio_base64))
+
+async def handle_audio_append(client_id: str, payload: bytes):
+    """Run streaming VAD on a microphone chunk and send the utterance once speech ends"""
+    session = manager.stream_sessions.get(client_id)
+    if session is None or not session.is_recording:
+        return
+
+    received_at = time.monotonic()
+    client = manager.clients.get(client_id)
+    if isinstance(session, ServerVADSession):
+        # No local VAD: the realtime API detects the turns (handle_input_event)
+        try:
+            audio = manager.codecs[client_id].wire_to_upstream(payload)
+        except ValueError as e:
+            await manager.send_message(client_id, "error", {"message": str(e)})
+            return
+        if client is not None:
+            session.forwarded_bytes += len(audio)
+            client.append_input_audio(pcm16_to_base64(audio))
+        return
+
+    try:
+        pcm_bytes = manager.codecs[client_id].from_wire(payload)
+    except ValueError as e:
+        await manager.send_message(client_id, "error", {"message": str(e)})
+        return
+    if VAD_ENGINE == "energy":
+        events = await session.feed_batched(pcm_bytes, manager.energy_vad())
+        if manager.stream_sessions.get(client_id) is not session:
+            return  # stopped or replaced while the batch was scored
+    else:
+        events = session.feed(pcm_bytes)
+    streaming = manager.input_modes.get(client_id) == "stream"
+    if StreamingVADSession.SPEECH_START in events:
+        if BARGE_IN:
+            # Before marking: an interrupted turn's timeline is closed first
+            manager.barge_in(client_id, received_at)
+        manager.mark_stage(client_id, TurnTimeline.SPEECH_START)
+
+    tentative = StreamingVADSession.TENTATIVE_END in events
+    if StreamingVADSession.SPEECH_RESUMED in events:
+        if tentative and events.index(StreamingVADSession.TENTATIVE_END) < \
+                events.index(StreamingVADSession.SPEECH_RESUMED):
+            tentative = False  # pause ended within the same chunk
+        elif manager.rollback_speculation(client_id) and streaming:
+            # The committed audio was deleted upstream: append the whole utterance again
+            session.rewind()
+
+    if streaming and client is not None:
+        # Forward speech while the user is still talking (small frames - sent inline, in order)
+        chunk = session.take_unsent()
+        if chunk:
+            client.append_input_audio(pcm16_to_base64(manager.codecs[client_id].to_upstream(chunk)))
+
+    if tentative and client is not None:
+        # Two-stage endpointing: submit now, confirm or roll back at the final threshold
+        print(f"🔉 เงียบชั่วคราว - ส่งล่วงหน้า ({session.duration:.1f}s)")
+        manager.speculate(client_id)
+        await submit_utterance(client_id, client, session, streaming)
+
+    if StreamingVADSession.END_OF_UTTERANCE in events:
+        del manager.stream_sessions[client_id]
+        session.stop()
+        if BARGE_IN:
+            # Full duplex: keep listening while the answer plays (next turn or barge-in)
+            manager.stream_sessions[client_id] = new_stream_session(session.fs)
+        print(f"🔇 หยุดฟัง - ส่งเสียงไปยัง AI... ({session.duration:.1f}s)")
+        if client is not None:
+            manager.mark_end_of_speech(client_id, "stream" if streaming else "batch")
+            if not manager.confirm_speculation(client_id):
+                await submit_utterance(client_id, client, session, streaming)
+        await manager.send_message(client_id, "recording_status", {
+            "status": "listening" if BARGE_IN else "stopped",
+            "message": "Audio sent to AI"
+        })
+    elif StreamingVADSession.TIMEOUT in events:
+        del manager.stream_sessions[client_id]
+        session.stop()
+        # A pending speculative answer already covers the utterance
+        if not manager.confirm_speculation(client_id) and streaming and client is not None:
+            client.clear_input_audio()
+        print(f"⏰ หมดเวลา ({session.max_duration}s)")
+        await manager.send_message(client_id, "recording_status", {
+            "status": "stopped",
+            "message": "Recording timed out"
+        })
+
 async def stop_vad_recording(client_id: str):
     """Stop VAD recording for a client"""
+    if client_id in manager.stream_sessions:
+        manager.stream_sessions.pop(client_id).stop()
+        manager.rollback_speculation(client_id)
+        if manager.input_modes.get(client_id) in ("stream", "server_vad") and client_id in manager.clients:
+            manager.clients[client_id].clear_input_audio()
+        await manager.send_message(client_id, "recording_status", {
+            "status": "stopped",
+            "message": "Recording stopped"
+        })
+
     if client_id in manager.audio_recorders:
         recorder = manager.audio_recorders[client_id]
         recorder.is_recording = False
@@ -243,11 +1363,133 @@ async def stop_vad_recording(client_id: str):
             "message": "Recording stopped"
         })
 
+@app.get("/turns/{client_id}/{turn_id}.wav")
+async def get_turn_audio(client_id: str, turn_id: int):
+    """Replay of an assistant turn, built on request (sessions connected with ?replay=1)"""
+    turn = manager.turn_audio.snapshot(client_id, turn_id)
+    if turn is None:
+        return JSONResponse(status_code=404, content={"error": "turn not found"})
+    chunks, sample_rate = turn
+    wav = await offload.thread(build_wav, chunks, sample_rate, size=sum(len(chunk) for chunk in chunks),
+                               name='replay_wav')
+    return Response(content=wav, media_type="audio/wav")
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "active_connections": len(manager.active_connections)}
+    """This worker, plus every live worker in the session registry"""
+    workers = await asyncio.get_running_loop().run_in_executor(None, registry.workers)
+    return {
+        "status": "healthy",
+        "worker_id": WORKER_ID,
+        "active_connections": len(manager.active_connections),
+        "pool": session_pool.stats(),
+        "event_loop": loop_lag.stats(),
+        "offload": offload.stats(),
+        "capture_backends": loaded_backends(),
+        "static": static_assets.stats(),
+        "response_cache": manager.response_cache.stats() if manager.response_cache is not None else None,
+        "journals": [journal.stats() for journal in manager.journals.values()],
+        "vad_batch": manager.vad_batcher.stats() if manager.vad_batcher is not None else None,
+        "cluster": {
+            "workers": len(workers),
+            "active_connections": sum(w["stats"].get("active_connections", 0) for w in workers),
+            "registered_sessions": sum(w["sessions"] for w in workers),
+            "nodes": workers
+        }
+    }
+
+@app.get("/route/{client_id}")
+async def route_client(client_id: str):
+    """
+    Where client_id should connect: the worker that already owns it, else its
+    rendezvous-hash node in CLUSTER_NODES. node is null when any worker will do.
+    """
+    owner = await asyncio.get_running_loop().run_in_executor(None, registry.owner, client_id)
+    node = owner[1] if owner and owner[1] else rendezvous_node(client_id, CLUSTER_NODES)
+    return {
+        "client_id": client_id,
+        "owner": owner[0] if owner else None,
+        "node": node,
+        "ws_url": node.replace("http", "ws", 1) + f"/ws/{client_id}" if node else None
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text format: per-turn stage histograms, bytes, sessions, upstream connects"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/sessions/stats")
+async def sessions_stats():
+    """Per-session outbound queue depth, send lag and coalescing, upstream context size"""
+    stats = {client_id: sender.stats() for client_id, sender in manager.senders.items()}
+    for client_id, speculation in manager.speculation_stats.items():
+        if client_id in stats:
+            stats[client_id]["speculation"] = speculation.as_dict()
+    for client_id, client in manager.clients.items():
+        if client_id in stats and client.window is not None:
+            stats[client_id]["context"] = client.window.stats()
+    return stats
+
+@app.get("/pool/stats")
+async def pool_stats():
+    """Upstream session pool metrics (hit/miss, wait time, evictions)"""
+    return session_pool.stats()
+
+def run_workers(args):
+    """
+    One uvicorn process per worker on consecutive ports (port, port + 1, ...). Each worker
+    gets its own NODE_URL, all of them share CLUSTER_NODES and a SQLite session registry,
+    so /route/{client_id} sends a browser to the same worker every time.
+    """
+    import signal
+    import subprocess
+    import sys
+    import tempfile
+
+    ports = [args.port + i for i in range(args.workers)]
+    nodes = [f"http://{args.public_host}:{port}" for port in ports]
+    registry_spec = os.getenv('SESSION_REGISTRY')
+    if not registry_spec or registry_spec == 'local':
+        registry_spec = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='s2s-registry-'), 'registry.db')
+    processes = []
+    for i, (port, node) in enumerate(zip(ports, nodes)):
+        env = dict(os.environ, WORKER_ID=f"{socket.gethostname()}-w{i}", NODE_URL=node,
+                   CLUSTER_NODES=','.join(nodes), SESSION_REGISTRY=registry_spec)
+        if RESPONSE_CACHE_PATH:
+            # One cache file per worker: the index lives in each process's memory
+            env['RESPONSE_CACHE_PATH'] = f"{RESPONSE_CACHE_PATH}.w{i}"
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--host', args.host, '--port', str(port),
+             '--log-level', args.log_level],
+            env=env
+        ))
+    print(f"🚀 {args.workers} workers: {', '.join(nodes)} (registry {registry_spec})")
+    # SIGTERM (e.g. from a process manager) stops the workers too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    parser = argparse.ArgumentParser(description="Speech-to-Speech server")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help='worker processes on consecutive ports')
+    parser.add_argument('--public-host', default=os.getenv('PUBLIC_HOST', 'localhost'),
+                        help='host name browsers use to reach the workers (NODE_URL / CLUSTER_NODES)')
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+    if args.workers > 1:
+        run_workers(args)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
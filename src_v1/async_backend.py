@@ -0,0 +1,136 @@
+import json
+import asyncio
+import websockets
+
+from src_v1.backend import RealtimeOpenAIClient
+
+
+class AsyncRealtimeOpenAIClient(RealtimeOpenAIClient):
+    """
+    asyncio variant of RealtimeOpenAIClient.
+    Runs the realtime WebSocket on the caller's event loop (no background thread):
+    callbacks fire on the loop and `response_done_event` is set on the loop as well.
+    The send_* methods stay synchronous and thread-safe; events are queued and
+    written in order by a single writer task.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop = None
+        self._reader_task = None
+        self._writer_task = None
+        self._outbox = None
+
+    async def connect(self, timeout: int = 5):
+        """
+        Establish WebSocket connection to Azure OpenAI Realtime API.
+        Raises ConnectionError if connection fails.
+        """
+        if self._ws:
+            print("WebSocket already initialized. Closing existing connection.")
+            await self.aclose()
+
+        headers = [tuple(part.strip() for part in header.split(':', 1)) for header in self.headers]
+        # No permessage-deflate: base64 audio barely compresses and zlib per delta costs more than it saves
+        try:
+            self._ws = await asyncio.wait_for(
+                websockets.connect(self.uri, extra_headers=headers, max_size=None, compression=None),
+                timeout
+            )
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+            print(f"Failed to connect to WebSocket server: {e}")
+            raise ConnectionError("WebSocket connection failed.") from e
+
+        self._loop = asyncio.get_running_loop()
+        self._outbox = asyncio.Queue()
+        self._is_connected = True
+        self._turn_detection_disabled = False
+        self.server_vad = False
+        self.input_transcription = None
+        self._reader_task = asyncio.create_task(self._reader())
+        self._writer_task = asyncio.create_task(self._writer())
+        print("WebSocket connection established.")
+
+    async def _reader(self):
+        ws = self._ws
+        try:
+            async for message in ws:
+                self._on_message(ws, message)
+        except websockets.ConnectionClosed as e:
+            self._on_close(ws, e.code, e.reason)
+            return
+        except Exception as e:
+            self._on_error(ws, e)
+            return
+        self._on_close(ws, ws.close_code, ws.close_reason)
+
+    async def _writer(self):
+        ws = self._ws
+        try:
+            while True:
+                message, event_type = await self._outbox.get()
+                await ws.send(message)
+                if self.sent_callback:
+                    self.sent_callback(event_type)
+        except websockets.ConnectionClosed:
+            self._is_connected = False
+
+    def _send_event(self, event: dict) -> bool:
+        if not self._is_connected or self._ws is None:
+            print("Not connected to WebSocket. Please call connect() first.")
+            return False
+        # Serialize on the calling thread (large audio payloads stay off the loop when sent from a worker)
+        message = json.dumps(event)
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        item = (message, event.get('type'))
+        if on_loop:
+            self._outbox.put_nowait(item)
+        else:
+            self._loop.call_soon_threadsafe(self._outbox.put_nowait, item)
+        return True
+
+    async def ping(self, timeout: float = 5) -> bool:
+        """Round-trip a WebSocket ping; False if the connection is gone or unresponsive."""
+        if not self._is_connected or self._ws is None:
+            return False
+        try:
+            pong = await self._ws.ping()
+            await asyncio.wait_for(pong, timeout)
+            return True
+        except Exception:
+            return False
+
+    async def aclose(self):
+        """Close the WebSocket connection and stop the reader/writer tasks."""
+        ws = self._ws
+        if ws is None:
+            return
+        self._ws = None
+        self._is_connected = False
+        for task in (self._writer_task, self._reader_task):
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+        await ws.close()
+        print("WebSocket connection closed by client.")
+
+    def close(self):
+        """
+        Close the WebSocket connection.
+        Safe to call from synchronous code; the close handshake runs on the client's loop.
+        """
+        if self._ws is None or self._loop is None:
+            return
+        if self._loop.is_closed():
+            self._ws = None
+            self._is_connected = False
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._loop.create_task(self.aclose())
+        else:
+            asyncio.run_coroutine_threadsafe(self.aclose(), self._loop)
@@ -1,23 +1,29 @@
 
 import sounddevice as sd
 import base64
-import struct
 import numpy as np
-import webrtcvad
 import time
 import threading
 from scipy import signal
-import io, wave
+
+from src_v1.capture import CaptureBuffer
+from src_v1.codec import float32_to_pcm16, float32_to_base64, pcm16_to_base64, pcm16_to_wav
+from src_v1.resample import VADFrameResampler
+from src_v1.vad_engine import create_vad_engine
 
 class AudioRecorder:
-    def __init__(self, fs=24000, channels=1):  # กลับไปใช้ 24kHz
+    def __init__(self, fs=24000, channels=1, pre_roll_ms=0, vad_engine='webrtc', **vad_options):  # กลับไปใช้ 24kHz
         self.fs = fs
         self.channels = channels
         self.audio_data = None
-        self.vad = webrtcvad.Vad(2)
         self.frame_duration_ms = 30
+        self.pre_roll_ms = pre_roll_ms  # audio kept before each speech onset (CaptureBuffer)
+        # vad_engine: 'webrtc' or 'energy' (see src_v1/vad_engine.py)
+        self.vad = create_vad_engine(vad_engine, frame_duration_ms=self.frame_duration_ms, **vad_options)
         self.frame_size = int(fs * self.frame_duration_ms / 1000)
         self.is_recording = False
+        # 24kHz -> 16kHz for the VAD engine, filter designed once and state kept across callback blocks
+        self.vad_frames = VADFrameResampler(fs, self.frame_duration_ms)
 
     def resample_audio(self, audio_data, original_fs, target_fs):
         """
@@ -30,18 +36,33 @@ class AudioRecorder:
         resampled = signal.resample_poly(audio_data, target_fs, original_fs)
         return resampled
 
-    def record_with_vad_auto_send(self, client, prompt="", max_duration=30, silence_threshold=1.0):
+    def record_with_vad_auto_send(self, client, prompt="", max_duration=30, silence_threshold=1.0,
+                                  stage_callback=None, barge_in_callback=None, frame_callback=None):
         """
         อัดเสียงด้วย VAD และส่งไปยัง server อัตโนมัติเมื่อหยุดพูด
+        stage_callback(stage) is called with 'speech_start', 'end_of_speech' and 'payload_encoded'
+        (TurnTimeline stage names) as the turn progresses.
+        With barge_in_callback the microphone stays open after each send (full duplex):
+        barge_in_callback() is called at every speech onset, before 'speech_start', so the
+        owner can interrupt an answer that is still playing; each utterance is sent as its
+        own turn until is_recording is cleared or nothing is said for max_duration.
+        frame_callback(pcm16_bytes) gets every captured block as it arrives (session journal).
         """
+        def mark(stage):
+            if stage_callback:
+                stage_callback(stage)
+
         print(f"🎤 เริ่มฟังเสียง (พูดได้เลย - จะส่งอัตโนมัติเมื่อหยุดพูด {silence_threshold}s)...")
         
-        audio_buffer = b''
+        audio_buffer = CaptureBuffer(max_duration, self.fs, self.pre_roll_ms)
         last_speech_time = time.time()
+        listen_start = time.time()
         self.is_recording = True
+        self.vad_frames.reset()
+        self.vad.reset()
         
         def audio_callback(indata, frames, time_info, status):
-            nonlocal audio_buffer, last_speech_time
+            nonlocal last_speech_time, audio_buffer, listen_start
             
             if not self.is_recording:
                 return False
@@ -51,57 +72,64 @@ class AudioRecorder:
             
             # Convert to 16-bit PCM bytes
             audio_bytes = (indata * 32767).astype(np.int16).tobytes()
+            if frame_callback:
+                frame_callback(audio_bytes)
             
-            # Process each frame
-            for i in range(0, len(audio_bytes), self.frame_size * 2):
-                frame = audio_bytes[i:i + self.frame_size * 2]
-                if len(frame) == self.frame_size * 2:
-                    try:
-                        # Resample frame to 16kHz for VAD
-                        frame_np = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32767.0
-                        frame_16k = self.resample_audio(frame_np, self.fs, 16000)
-                        frame_16k_bytes = (frame_16k * 32767).astype(np.int16).tobytes()
-                        
-                        # Use 16kHz for VAD detection
-                        is_speech = self.vad.is_speech(frame_16k_bytes, 16000)
-                        
-                        if is_speech:
-                            audio_buffer += frame  # Store original 24kHz audio
-                            last_speech_time = time.time()
-                            print("🔊 กำลังฟัง...", end="\r")
-                        elif time.time() - last_speech_time > silence_threshold and len(audio_buffer) > 0:
-                            print(f"\n🔇 หยุดฟัง - ส่งเสียงไปยัง AI...")
+            # Resample the whole block to 16kHz for VAD, then process each frame
+            for frame, frame_16k_bytes in self.vad_frames.process(audio_bytes):
+                try:
+                    # Use 16kHz for VAD detection
+                    is_speech = self.vad.is_speech(frame_16k_bytes, 16000)
+                    
+                    if is_speech and not audio_buffer:
+                        if barge_in_callback:
+                            barge_in_callback()
+                        mark('speech_start')
+                    audio_buffer.push(frame, is_speech)  # Store original 24kHz audio
+                    if is_speech:
+                        last_speech_time = time.time()
+                        print("🔊 กำลังฟัง...", end="\r")
+                    elif time.time() - last_speech_time > silence_threshold and audio_buffer:
+                        print(f"\n🔇 หยุดฟัง - ส่งเสียงไปยัง AI...")
+                        mark('end_of_speech')
+                        captured = audio_buffer
+                        if barge_in_callback:
+                            # Keep listening during the answer with a fresh buffer for the next turn
+                            audio_buffer = CaptureBuffer(max_duration, self.fs, self.pre_roll_ms)
+                            listen_start = time.time()
+                        else:
                             self.is_recording = False
-                            
-                            # Send audio to server in a separate thread
-                            def send_audio():
-                                try:
-                                    # Convert audio buffer to base64 (24kHz)
-                                    audio_np = np.frombuffer(audio_buffer, dtype=np.int16).astype(np.float32) / 32767.0
-                                    audio_content = self.base64_encode_audio(audio_np)
-                                    
-                                    # Send to server
-                                    client.response_done_event.clear()
-                                    client.send_prompt(
-                                        prompt=prompt,
-                                        audio_base64=audio_content,
-                                    )
-                                    
-                                    # Wait for response
-                                    while not client.response_done_event.is_set():
-                                        time.sleep(0.05)
-                                        
-                                    print("✅ ได้รับการตอบกลับแล้ว")
+                        
+                        # Send audio to server in a separate thread
+                        def send_audio():
+                            try:
+                                # captured is already PCM16 (24kHz) - encode directly, no float round-trip
+                                audio_content = pcm16_to_base64(captured.pcm())
+                                mark('payload_encoded')
+                                
+                                # Send to server
+                                client.response_done_event.clear()
+                                client.send_prompt(
+                                    prompt=prompt,
+                                    audio_base64=audio_content,
+                                )
+                                
+                                # Wait for response
+                                while not client.response_done_event.is_set():
+                                    time.sleep(0.05)
                                     
-                                except Exception as e:
-                                    print(f"❌ เกิดข้อผิดพลาด: {e}")
-                            
-                            # Run in separate thread to avoid blocking
-                            threading.Thread(target=send_audio, daemon=True).start()
+                                print("✅ ได้รับการตอบกลับแล้ว")
+                                
+                            except Exception as e:
+                                print(f"❌ เกิดข้อผิดพลาด: {e}")
+                        
+                        # Run in separate thread to avoid blocking
+                        threading.Thread(target=send_audio, daemon=True).start()
+                        if not barge_in_callback:
                             return False
-                            
-                    except Exception as e:
-                        continue
+                        
+                except Exception as e:
+                    continue
         
         try:
             with sd.InputStream(
@@ -111,8 +139,7 @@ class AudioRecorder:
                 dtype=np.float32,
                 blocksize=self.frame_size
             ):
-                start_time = time.time()
-                while self.is_recording and (time.time() - start_time) < max_duration:
+                while self.is_recording and (time.time() - listen_start) < max_duration:
                     time.sleep(0.1)
                     
                 if self.is_recording:
@@ -129,11 +156,13 @@ class AudioRecorder:
         """
         print(f"🎤 เริ่มฟังเสียง (หยุดอัตโนมัติเมื่อเงียบ {silence_threshold}s)...")
         
-        audio_buffer = b''
+        audio_buffer = CaptureBuffer(max_duration, self.fs, self.pre_roll_ms)
         last_speech_time = time.time()
+        self.vad_frames.reset()
+        self.vad.reset()
         
         def audio_callback(indata, frames, time_info, status):
-            nonlocal audio_buffer, last_speech_time
+            nonlocal last_speech_time
             
             if status:
                 print(f"Audio status: {status}")
@@ -141,28 +170,21 @@ class AudioRecorder:
             # Convert to 16-bit PCM bytes
             audio_bytes = (indata * 32767).astype(np.int16).tobytes()
             
-            # Process each frame
-            for i in range(0, len(audio_bytes), self.frame_size * 2):
-                frame = audio_bytes[i:i + self.frame_size * 2]
-                if len(frame) == self.frame_size * 2:
-                    try:
-                        # Resample frame to 16kHz for VAD
-                        frame_np = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32767.0
-                        frame_16k = self.resample_audio(frame_np, self.fs, 16000)
-                        frame_16k_bytes = (frame_16k * 32767).astype(np.int16).tobytes()
-                        
-                        # Use 16kHz for VAD detection
-                        is_speech = self.vad.is_speech(frame_16k_bytes, 16000)
-                        
-                        if is_speech:
-                            audio_buffer += frame  # Store original 24kHz audio
-                            last_speech_time = time.time()
-                            print("🔊 กำลังฟัง...", end="\r")
-                        elif time.time() - last_speech_time > silence_threshold:
-                            print(f"\n🔇 หยุดฟัง (เงียบ {silence_threshold}s)")
-                            return False
-                    except Exception as e:
-                        continue
+            # Resample the whole block to 16kHz for VAD, then process each frame
+            for frame, frame_16k_bytes in self.vad_frames.process(audio_bytes):
+                try:
+                    # Use 16kHz for VAD detection
+                    is_speech = self.vad.is_speech(frame_16k_bytes, 16000)
+                    
+                    audio_buffer.push(frame, is_speech)  # Store original 24kHz audio
+                    if is_speech:
+                        last_speech_time = time.time()
+                        print("🔊 กำลังฟัง...", end="\r")
+                    elif time.time() - last_speech_time > silence_threshold:
+                        print(f"\n🔇 หยุดฟัง (เงียบ {silence_threshold}s)")
+                        return False
+                except Exception as e:
+                    continue
         
         try:
             with sd.InputStream(
@@ -182,7 +204,7 @@ class AudioRecorder:
             
         if audio_buffer:
             # Convert back to numpy array
-            audio_np = np.frombuffer(audio_buffer, dtype=np.int16).astype(np.float32) / 32767.0
+            audio_np = audio_buffer.view().astype(np.float32) / 32767.0
             self.audio_data = audio_np
             print(f"✅ อัดเสียงเสร็จแล้ว (ความยาว: {len(audio_np)/self.fs:.1f} วินาที)")
         else:
@@ -204,26 +226,15 @@ class AudioRecorder:
 
     @staticmethod
     def float_to_16bit_pcm(float32_array):
-        clipped = [max(-1.0, min(1.0, x)) for x in float32_array]
-        pcm16 = b''.join(struct.pack('<h', int(x * 32767)) for x in clipped)
-        return pcm16
+        return float32_to_pcm16(float32_array)
 
     @staticmethod
     def base64_encode_audio(float32_array):
-        pcm_bytes = AudioRecorder.float_to_16bit_pcm(float32_array)
-        encoded = base64.b64encode(pcm_bytes).decode('ascii')
-        return encoded
+        return float32_to_base64(float32_array)
 
     @staticmethod
     def pcm_base64_to_wav_base64(pcm_base64, sample_rate=24000):
-        pcm_bytes = base64.b64decode(pcm_base64)
-        with io.BytesIO() as wav_io:
-            with wave.open(wav_io, 'wb') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)  # 16-bit PCM
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(pcm_bytes)
-            wav_bytes = wav_io.getvalue()
+        wav_bytes = pcm16_to_wav(base64.b64decode(pcm_base64), sample_rate)
         return base64.b64encode(wav_bytes).decode('ascii')
 
     def get_base64_audio(self):
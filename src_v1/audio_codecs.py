@@ -0,0 +1,230 @@
+"""
+Audio codecs for the browser leg, negotiated per connection with ``?codec=``.
+
+    pcm16      24 kHz PCM16 (default)                      384 kbit/s
+    mulaw      24 kHz G.711 mu-law                         192 kbit/s
+    adpcm      24 kHz IMA-ADPCM in independent blocks     ~106 kbit/s
+    g711_ulaw  8 kHz mu-law end to end                      64 kbit/s
+
+The first three transcode on the server: the realtime session stays PCM16 and
+assistant audio is encoded per outgoing frame, microphone audio decoded per
+incoming frame. g711_ulaw switches the realtime session itself to g711_ulaw
+input/output (session.update), so assistant deltas go to the browser unchanged
+and captured speech goes upstream as mu-law: no transcode on the audio path,
+at telephone quality.
+
+Encoders and decoders are vectorized with NumPy: mu-law through lookup tables,
+IMA-ADPCM one sample step at a time across all blocks of a frame (each block
+starts from its own header, so blocks do not depend on each other).
+
+ADPCM block (little-endian): int16 first sample, uint8 step index, uint8 flags
+(bit 0: the last nibble is padding), then 4-bit codes for the following samples,
+low nibble first. Full blocks hold ADPCM_BLOCK_SAMPLES samples; the last block
+of a frame may be shorter.
+"""
+
+import numpy as np
+
+# --- G.711 mu-law ---
+
+_MULAW_BIAS = 0x84
+_MULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+
+
+def _build_mulaw_tables():
+    # Same rounding as the classic g711.c linear2ulaw / ulaw2linear (and audioop)
+    samples = np.arange(-32768, 32768, dtype=np.int32)
+    value = samples >> 2
+    mask = np.where(value < 0, 0x7F, 0xFF)
+    value = np.minimum(np.abs(value), 8159) + (_MULAW_BIAS >> 2)
+    segment = np.searchsorted(_MULAW_SEGMENT_ENDS, value)
+    encoded = np.where(segment >= 8, 0x7F,
+                       (np.minimum(segment, 7) << 4) | ((value >> (np.minimum(segment, 7) + 1)) & 0x0F))
+    # Indexed by the sample's bit pattern as uint16
+    encode = np.empty(65536, dtype=np.uint8)
+    encode[samples.astype(np.uint16)] = encoded ^ mask
+
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    magnitude = (((codes & 0x0F) << 3) + _MULAW_BIAS) << ((codes >> 4) & 0x07)
+    decode = np.where(codes & 0x80, _MULAW_BIAS - magnitude, magnitude - _MULAW_BIAS).astype('<i2')
+    return encode, decode
+
+
+_MULAW_ENCODE, _MULAW_DECODE = _build_mulaw_tables()
+
+
+def mulaw_encode(pcm_bytes) -> bytes:
+    """PCM16 -> one mu-law byte per sample."""
+    return _MULAW_ENCODE[np.frombuffer(pcm_bytes, dtype='<u2')].tobytes()
+
+
+def mulaw_decode(data) -> bytes:
+    """mu-law -> PCM16."""
+    return _MULAW_DECODE[np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+
+# --- IMA-ADPCM ---
+
+ADPCM_BLOCK_SAMPLES = 65  # 4-byte header + 32 bytes of codes per 65 samples (~2.7 ms at 24 kHz)
+_ADPCM_HEADER = 4
+
+_ADPCM_INDEX = np.array([-1, -1, -1, -1, 2, 4, 6, 8] * 2, dtype=np.int32)
+_ADPCM_STEPS = np.array([
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442, 11487,
+    12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767
+], dtype=np.int32)
+
+
+def _build_adpcm_tables():
+    # Flat tables indexed by step_index * 16 + code, so each sample step is a few gathers
+    index = np.repeat(np.arange(89), 16)
+    code = np.tile(np.arange(16), 89)
+    step = _ADPCM_STEPS[index]
+    delta = (step >> 3) + np.where(code & 4, step, 0) + np.where(code & 2, step >> 1, 0) \
+        + np.where(code & 1, step >> 2, 0)
+    delta = np.where(code & 8, -delta, delta).astype(np.int32)
+    next_row = (np.clip(index + _ADPCM_INDEX[code], 0, 88) * 16).astype(np.intp)
+    return delta, next_row
+
+
+_ADPCM_DELTA, _ADPCM_NEXT = _build_adpcm_tables()
+_ADPCM_ROW_STEP = np.repeat(_ADPCM_STEPS, 16)  # step size by row offset (step_index * 16)
+
+
+def adpcm_encode(pcm_bytes, block_samples=ADPCM_BLOCK_SAMPLES) -> bytes:
+    """PCM16 -> IMA-ADPCM blocks (see the module docstring for the layout)."""
+    samples = np.frombuffer(pcm_bytes, dtype='<i2').astype(np.int32)
+    count = len(samples)
+    if count == 0:
+        return b''
+    nblocks = -(-count // block_samples)
+    # The tail of the last block repeats its last sample; those codes are cut off below
+    blocks = np.pad(samples, (0, nblocks * block_samples - count), mode='edge').reshape(nblocks, block_samples)
+
+    predicted = blocks[:, 0].copy()
+    # Start each block at a step size that fits its opening slope (blocks are independent)
+    slope = np.abs(np.diff(blocks[:, :5], axis=1)).max(axis=1) if block_samples > 1 else np.zeros(nblocks)
+    index = np.clip(np.searchsorted(_ADPCM_STEPS, slope // 2), 0, 88)
+    header = np.empty((nblocks, _ADPCM_HEADER), dtype=np.uint8)
+    header[:, :2] = predicted.astype('<i2').view(np.uint8).reshape(nblocks, 2)
+    header[:, 2] = index
+    header[:, 3] = 0
+
+    codes = np.empty((nblocks, block_samples // 2 * 2), dtype=np.uint8)
+    codes[:, -1] = 0
+    row = index.astype(np.intp) * 16
+    for k in range(1, block_samples):
+        diff = blocks[:, k] - predicted
+        code = np.minimum((np.abs(diff) << 2) // _ADPCM_ROW_STEP[row], 7)
+        code |= (diff >> 28) & 8  # sign bit
+        row += code
+        predicted = np.minimum(np.maximum(predicted + _ADPCM_DELTA[row], -32768), 32767)
+        row = _ADPCM_NEXT[row]
+        codes[:, k - 1] = code
+
+    packed = codes[:, 0::2] | (codes[:, 1::2] << 4)
+    out = np.concatenate([header, packed], axis=1)
+    tail = count - (nblocks - 1) * block_samples  # samples in the last block
+    if tail == block_samples:
+        return out.tobytes()
+    out[-1, 3] = (tail - 1) & 1
+    return out[:-1].tobytes() + out[-1, :_ADPCM_HEADER + tail // 2].tobytes()
+
+
+def adpcm_decode(data, block_samples=ADPCM_BLOCK_SAMPLES) -> bytes:
+    """IMA-ADPCM blocks -> PCM16."""
+    data = np.frombuffer(data, dtype=np.uint8)
+    if len(data) == 0:
+        return b''
+    block_bytes = _ADPCM_HEADER + block_samples // 2
+    nblocks = -(-len(data) // block_bytes)
+    last = len(data) - (nblocks - 1) * block_bytes  # bytes in the last block
+    if last < _ADPCM_HEADER:
+        raise ValueError("Truncated ADPCM block")
+    blocks = np.pad(data, (0, nblocks * block_bytes - len(data))).reshape(nblocks, block_bytes)
+
+    predicted = blocks[:, :2].copy().view('<i2').reshape(-1).astype(np.int32)
+    row = np.minimum(blocks[:, 2], 88).astype(np.intp) * 16
+    packed = blocks[:, _ADPCM_HEADER:]
+    codes = np.empty((nblocks, packed.shape[1] * 2), dtype=np.intp)
+    codes[:, 0::2] = packed & 0x0F
+    codes[:, 1::2] = packed >> 4
+
+    out = np.empty((nblocks, block_samples), dtype='<i2')
+    out[:, 0] = predicted
+    for k in range(1, block_samples):
+        row += codes[:, k - 1]
+        predicted = np.minimum(np.maximum(predicted + _ADPCM_DELTA[row], -32768), 32767)
+        row = _ADPCM_NEXT[row]
+        out[:, k] = predicted
+
+    # The last block may be shorter (its flags mark a padding nibble)
+    tail = 1 + (last - _ADPCM_HEADER) * 2 - int(blocks[-1, 3] & 1)
+    return out.reshape(-1)[:(nblocks - 1) * block_samples + tail].tobytes()
+
+
+# --- Negotiation ---
+
+class AudioCodec:
+    """
+    One browser-leg codec. `upstream_format` is the realtime session's
+    input/output_audio_format; `sample_rate` applies to both legs.
+    """
+    def __init__(self, name, sample_rate, upstream_format, encode=None, decode=None, slow_encode=False):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.upstream_format = upstream_format
+        self._encode = encode  # None: wire bytes are the upstream bytes
+        self._decode = decode
+        self.slow_encode = slow_encode  # encoding a frame costs more than an executor hop
+        # Bytes per second of audio in the upstream format (PCM16, or mu-law for g711_ulaw)
+        self.upstream_bytes_per_s = sample_rate * (1 if upstream_format == 'g711_ulaw' else 2)
+
+    @property
+    def passthrough(self):
+        """Assistant audio goes to the browser exactly as the realtime API sent it."""
+        return self._encode is None
+
+    def to_wire(self, upstream_bytes) -> bytes:
+        """Assistant audio (upstream format) -> browser frame payload."""
+        return bytes(upstream_bytes) if self._encode is None else self._encode(upstream_bytes)
+
+    def from_wire(self, payload) -> bytes:
+        """Browser microphone payload -> PCM16 at sample_rate (for VAD and capture)."""
+        if self.upstream_format == 'g711_ulaw':
+            return mulaw_decode(payload)
+        return bytes(payload) if self._decode is None else self._decode(payload)
+
+    def wire_to_upstream(self, payload) -> bytes:
+        """Browser microphone payload -> the session's input_audio_format (no decode for g711_ulaw)."""
+        return bytes(payload) if self.upstream_format == 'g711_ulaw' else self.from_wire(payload)
+
+    def to_upstream(self, pcm_bytes) -> bytes:
+        """Captured PCM16 -> the session's input_audio_format."""
+        return mulaw_encode(pcm_bytes) if self.upstream_format == 'g711_ulaw' else pcm_bytes
+
+    def upstream_to_pcm16(self, upstream_bytes) -> bytes:
+        """Assistant audio (upstream format) -> PCM16, e.g. for WAV replay."""
+        return mulaw_decode(upstream_bytes) if self.upstream_format == 'g711_ulaw' else upstream_bytes
+
+
+CODECS = {
+    'pcm16': AudioCodec('pcm16', 24000, 'pcm16'),
+    'mulaw': AudioCodec('mulaw', 24000, 'pcm16', mulaw_encode, mulaw_decode),
+    'adpcm': AudioCodec('adpcm', 24000, 'pcm16', adpcm_encode, adpcm_decode, slow_encode=True),
+    'g711_ulaw': AudioCodec('g711_ulaw', 8000, 'g711_ulaw'),
+}
+PCM16 = CODECS['pcm16']
+
+
+def get_codec(name):
+    """Codec for a ?codec= value (None or '' -> pcm16); ValueError for unknown names."""
+    if not name:
+        return PCM16
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec {name!r}, expected one of {', '.join(CODECS)}")
+    return CODECS[name]
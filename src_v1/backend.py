@@ -6,21 +6,27 @@ import asyncio
 import websocket
 import threading
 from typing import Optional
+from urllib.parse import urlencode
+
+from src_v1.codec import base64_to_pcm16, pcm16_to_base64
+
+DEFAULT_REALTIME_URI = 'wss://pegasus-001-resource.cognitiveservices.azure.com/openai/realtime'
+
 
 class RealtimeOpenAIClient:
     """
     Client for Azure OpenAI Realtime API (text/audio chat).
     Handles WebSocket connection, sending prompts, and receiving responses.
     """
-    def __init__(self, api_key: str, api_version: str, deployment_name: str, text_callback=None, audio_callback=None, audio_done_callback=None):
+    def __init__(self, api_key: str, api_version: str, deployment_name: str, text_callback=None, audio_callback=None, audio_done_callback=None, retain_audio: bool = True, uri: Optional[str] = None):
         # --- API and connection config ---
         self.api_key = api_key
         self.api_version = api_version
         self.deployment_name = deployment_name
-        self.uri = (
-            f'wss://pegasus-001-resource.cognitiveservices.azure.com/openai/realtime?'
-            f'api-version={self.api_version}&deployment={self.deployment_name}&api-key={self.api_key}'
-        )
+        # uri: realtime endpoint without query string (another Azure resource, or a local
+        # src_v1.mock_realtime server); defaults to DEFAULT_REALTIME_URI
+        query = urlencode({'api-version': api_version, 'deployment': deployment_name, 'api-key': api_key})
+        self.uri = f'{uri or DEFAULT_REALTIME_URI}?{query}'
         self.headers = [
             f"Authorization: Bearer {self.api_key}",
             "OpenAI-Beta: realtime=v1"
@@ -30,13 +36,39 @@ class RealtimeOpenAIClient:
         self._ws = None
         self._thread = None
         self._is_connected = False
-        self._total_audio_data = ''  # Accumulates base64 audio deltas
+        # Decoded PCM16 chunks of the last response (only when retain_audio; the server streams
+        # deltas out as they arrive and does not need them)
+        self.retain_audio = retain_audio
+        self._audio_chunks = []
+        self._audio_bytes = 0
+        self._turn_detection_disabled = False
+        self.server_vad = False  # turn detection by the service (input_mode server_vad)
+        self.input_transcription = None  # input_audio_transcription model, once enabled
+        self.window = None  # ConversationWindow bounding the upstream conversation (set_context_window)
+        self.audio_format = 'pcm16'  # input/output_audio_format of the session ('pcm16' or 'g711_ulaw')
+        self.conversation_started = False  # True once user input was sent (session can't be reused)
+        # --- Response in flight (barge-in) ---
+        self.response_active = False  # response.create sent, response.done not received yet
+        self.response_id = None
+        self.audio_item_id = None     # assistant item of the last audio response (for truncate)
+        self._cancel_pending = False  # cancel requested before response.created arrived
+        self._cancelled = set()       # response ids whose remaining events are dropped
+        self.input_item_id = None     # last user item (speculative rollback deletes it)
+        self.response_item_id = None  # assistant item of the response in flight
+        self._delete_next_input = False  # rolled back before conversation.item.created arrived
 
         # --- Callbacks for external handling of responses ---
         self.text_callback = text_callback
         self.audio_callback = audio_callback
         self.response_done_event = asyncio.Event()
         self.audio_done_callback = audio_done_callback
+        self.sent_callback = None  # called with the event type once an event was written to the socket
+        self.text_delta_callback = None  # called with each transcript / text delta as it arrives
+        # called with (event type, event) for input_audio_buffer.speech_started / speech_stopped / committed
+        self.input_event_callback = None
+        # called with (item id, transcript) of the user's audio (enable_input_transcription)
+        self.input_transcript_callback = None
+        self.journal_callback = None  # called with (raw message, parsed event) of every server event
 
     def _on_open(self, ws):
         """WebSocket open event handler."""
@@ -48,10 +80,72 @@ class RealtimeOpenAIClient:
         server_event = json.loads(message)
         try:
             event_type = server_event.get('type')
+            if self.journal_callback:
+                self.journal_callback(message, server_event)
+            if self.window is not None:
+                self.window.observe(server_event)
+
+            if event_type in ('input_audio_buffer.speech_started', 'input_audio_buffer.speech_stopped',
+                              'input_audio_buffer.committed'):
+                if self.input_event_callback:
+                    self.input_event_callback(event_type, server_event)
+                return
+
+            if event_type == 'conversation.item.input_audio_transcription.completed':
+                if self.input_transcript_callback:
+                    self.input_transcript_callback(server_event.get('item_id'), server_event.get('transcript', ''))
+                return
+
+            if event_type == 'response.created':
+                self.response_id = server_event.get('response', {}).get('id')
+                if self.server_vad and not self._cancel_pending:
+                    # Created by the service's turn detection, not by response.create
+                    self.response_active = True
+                    self.response_item_id = None
+                    self._reset_audio()
+                if self._cancel_pending:
+                    self._cancel_pending = False
+                    self._cancelled.add(self.response_id)
+                    self._send_event({"type": "response.cancel"})
+                return
 
-            if event_type == 'response.audio_transcript.done':
+            if event_type == 'conversation.item.created':
+                item = server_event.get('item', {})
+                if item.get('role') == 'user':
+                    if self._delete_next_input:
+                        self._delete_next_input = False
+                        self._send_event({"type": "conversation.item.delete", "item_id": item.get('id')})
+                    else:
+                        self.input_item_id = item.get('id')
+                return
+
+            if event_type == 'response.output_item.added':
+                if server_event.get('response_id') not in self._cancelled:
+                    self.response_item_id = server_event.get('item', {}).get('id')
+                return
+
+            if event_type == 'response.done':
+                response_id = server_event.get('response', {}).get('id')
+                self._cancelled.discard(response_id)
+                if response_id == self.response_id:
+                    self.response_active = False
+                if self.window is not None:
+                    self._trim_context()
+                self._set_response_done()
+                return
+
+            if server_event.get('response_id') in self._cancelled:
+                # Rest of an interrupted response: nobody will hear it
+                return
+
+            if event_type in ('response.audio_transcript.delta', 'response.text.delta'):
+                # --- Partial text (transcript of the audio, or a text-only reply) ---
+                if self.text_delta_callback and server_event.get('delta'):
+                    self.text_delta_callback(server_event['delta'])
+
+            elif event_type in ('response.audio_transcript.done', 'response.text.done'):
                 # --- Text response received ---
-                text = server_event.get('transcript')
+                text = server_event.get('transcript', server_event.get('text'))
                 print(f'\nAnswer(Text): {text}')
                 if self.text_callback:
                     self.text_callback(text)
@@ -59,8 +153,14 @@ class RealtimeOpenAIClient:
             elif event_type == 'response.audio.delta':
                 # --- Audio chunk received ---
                 delta_audio = server_event.get('delta')
+                self.audio_item_id = server_event.get('item_id') or self.audio_item_id
                 if delta_audio:
-                    self._total_audio_data += delta_audio
+                    if self.retain_audio:
+                        chunk = base64_to_pcm16(delta_audio)
+                        self._audio_chunks.append(chunk)
+                        self._audio_bytes += len(chunk)
+                    else:
+                        self._audio_bytes += len(delta_audio) * 3 // 4
                     if self.audio_callback:
                         self.audio_callback(delta_audio)
 
@@ -72,15 +172,18 @@ class RealtimeOpenAIClient:
                 # แสดงความยาวของ audio data ที่สะสมไว้
                 self.print_audio_data_length()
                 # set response_done_event ที่นี่!
-                try:
-                    loop = asyncio.get_running_loop()
-                    loop.call_soon_threadsafe(self.response_done_event.set)
-                except RuntimeError:
-                    self.response_done_event.set()
+                self._set_response_done()
 
         except Exception as e:
             print(f'Error processing WebSocket message: {e}')
 
+    def _set_response_done(self):
+        try:
+            loop = asyncio.get_running_loop()
+            loop.call_soon_threadsafe(self.response_done_event.set)
+        except RuntimeError:
+            self.response_done_event.set()
+
     def _on_error(self, ws, error):
         """WebSocket error event handler."""
         print(f'WebSocket error: {error}')
@@ -131,11 +234,15 @@ class RealtimeOpenAIClient:
         if modalities is None:
             modalities = ["text", "audio"]
 
-        self._total_audio_data = ""  # Reset audio buffer
+        self._reset_audio()
+        self.conversation_started = True
+        self.input_item_id = None
 
         content = [{"type": "input_text", "text": prompt}]
         if audio_base64:
             content.append({"type": "input_audio", "audio": audio_base64})
+            if self.window is not None:
+                self.window.add_input_audio(len(audio_base64) * 3 // 4)
 
         event_message = {
             "type": "conversation.item.create",
@@ -145,15 +252,156 @@ class RealtimeOpenAIClient:
                 "content": content,
             },
         }
-        self._ws.send(json.dumps(event_message))
-
-        event_response = {
-            "type": "response.create",
-            "response": {"modalities": modalities},
-        }
-        self._ws.send(json.dumps(event_response))
+        self._send_event(event_message)
+        self._request_response(modalities)
         print("Prompt sent. Waiting for response...")
 
+    def _request_response(self, modalities):
+        """Send response.create and mark a response as in flight."""
+        self.response_active = True
+        self.response_id = None
+        self.response_item_id = None
+        self._cancel_pending = False
+        return self._send_event({"type": "response.create", "response": {"modalities": modalities}})
+
+    def cancel_response(self, audio_end_ms=None):
+        """
+        Barge-in: stop the response in flight (response.cancel) and cut the assistant item
+        at `audio_end_ms` of played audio (conversation.item.truncate) so the conversation
+        only holds what the user heard. Remaining events of the cancelled response are dropped.
+        Returns True when a response was still being generated.
+        """
+        cancelled = self.response_active
+        if cancelled:
+            self.response_active = False
+            if self.response_id:
+                self._cancelled.add(self.response_id)
+                self._send_event({"type": "response.cancel"})
+            else:
+                # response.created not seen yet: cancel as soon as it arrives
+                self._cancel_pending = True
+        if self.audio_item_id and audio_end_ms is not None:
+            self._send_event({
+                "type": "conversation.item.truncate",
+                "item_id": self.audio_item_id,
+                "content_index": 0,
+                "audio_end_ms": int(audio_end_ms)
+            })
+        self._reset_audio()
+        self._set_response_done()
+        return cancelled
+
+    def rollback_response(self):
+        """
+        Speculative turn rejected (the user kept talking): cancel the response and delete
+        its user input and assistant output from the conversation, so the extended
+        utterance can be submitted as if nothing had been sent.
+        """
+        self.cancel_response()
+        if self.input_item_id:
+            self._send_event({"type": "conversation.item.delete", "item_id": self.input_item_id})
+        else:
+            self._delete_next_input = True
+        if self.response_item_id:
+            self._send_event({"type": "conversation.item.delete", "item_id": self.response_item_id})
+        self.input_item_id = None
+        self.response_item_id = None
+
+    def _send_event(self, event: dict) -> bool:
+        if not self._is_connected or self._ws is None:
+            print("Not connected to WebSocket. Please call connect() first.")
+            return False
+        self._ws.send(json.dumps(event))
+        if self.sent_callback:
+            self.sent_callback(event.get('type'))
+        return True
+
+    def disable_turn_detection(self):
+        """
+        Turn off the service-side VAD so appended audio is only answered after commit_input_audio().
+        Sent once per connection.
+        """
+        if self._turn_detection_disabled:
+            return
+        if self._send_event({"type": "session.update", "session": {"turn_detection": None}}):
+            self._turn_detection_disabled = True
+            self.server_vad = False
+
+    def enable_server_vad(self, silence_duration_ms: int = 500, threshold: float = 0.5, prefix_padding_ms: int = 300):
+        """
+        Let the service end turns (server_vad): appended audio is committed and answered by the
+        service, which reports input_audio_buffer.speech_started / speech_stopped / committed.
+        """
+        if self.server_vad:
+            return
+        if self._send_event({"type": "session.update", "session": {"turn_detection": {
+                "type": "server_vad",
+                "threshold": threshold,
+                "prefix_padding_ms": prefix_padding_ms,
+                "silence_duration_ms": silence_duration_ms,
+                "create_response": True}}}):
+            self.server_vad = True
+            self._turn_detection_disabled = False
+
+    def enable_input_transcription(self, model: str = 'whisper-1'):
+        """Transcribe the user's audio items (conversation.item.input_audio_transcription.completed)."""
+        if self.input_transcription == model:
+            return
+        if self._send_event({"type": "session.update", "session": {"input_audio_transcription": {"model": model}}}):
+            self.input_transcription = model
+
+    def set_context_window(self, window):
+        """Keep the upstream conversation within `window` (a ConversationWindow); None tracks nothing."""
+        self.window = window
+        if window is not None:
+            window.audio_format = self.audio_format
+
+    def _trim_context(self):
+        """After each response: delete the turns that fell out of the window, refresh the summary item."""
+        for item_id in self.window.evict():
+            self._send_event({"type": "conversation.item.delete", "item_id": item_id})
+        summary = self.window.take_summary()
+        if summary is not None:
+            old_id, item = summary
+            if old_id:
+                self._send_event({"type": "conversation.item.delete", "item_id": old_id})
+            self._send_event({"type": "conversation.item.create", "previous_item_id": "root", "item": item})
+
+    def set_audio_format(self, audio_format: str):
+        """
+        Switch input and output audio to 'pcm16' (24 kHz) or 'g711_ulaw' (8 kHz mu-law).
+        Audio events sent afterwards must use the new format.
+        """
+        if audio_format == self.audio_format:
+            return
+        if self._send_event({"type": "session.update", "session": {
+                "input_audio_format": audio_format, "output_audio_format": audio_format}}):
+            self.audio_format = audio_format
+            if self.window is not None:
+                self.window.audio_format = audio_format
+
+    def append_input_audio(self, audio_base64: str):
+        """Stream a chunk of base64 audio (session input format) into the input audio buffer."""
+        if not self.server_vad:
+            self.disable_turn_detection()
+        self.conversation_started = True
+        if self._send_event({"type": "input_audio_buffer.append", "audio": audio_base64}) and self.window is not None:
+            self.window.add_input_audio(len(audio_base64) * 3 // 4)
+
+    def commit_input_audio(self, modalities: Optional[list] = None):
+        """Commit the streamed input audio as a user message and request a response."""
+        if modalities is None:
+            modalities = ["text", "audio"]
+        self._reset_audio()
+        self.input_item_id = None
+        if self._send_event({"type": "input_audio_buffer.commit"}):
+            self._request_response(modalities)
+            print("Audio committed. Waiting for response...")
+
+    def clear_input_audio(self):
+        """Drop audio appended since the last commit."""
+        self._send_event({"type": "input_audio_buffer.clear"})
+
     def send_prompt_with_voice(self, prompt: str, base64_string: str, modalities: Optional[list] = None):
         """Backward compatible wrapper for sending text and audio."""
         return self.send_prompt(prompt, audio_base64=base64_string, modalities=modalities)
@@ -167,7 +415,9 @@ class RealtimeOpenAIClient:
             return
         if modalities is None:
             modalities = ['text', 'audio']
-        self._total_audio_data = ''  # Reset audio buffer
+        self._reset_audio()
+        self.conversation_started = True
+        self.input_item_id = None
         # Build and send message event
         event_message = {
             "type": "conversation.item.create",
@@ -179,14 +429,10 @@ class RealtimeOpenAIClient:
                 ]
             }
         }
-        self._ws.send(json.dumps(event_message))
+        self._send_event(event_message)
 
         # Request response with specified modalities
-        event_response = {
-            "type": "response.create",
-            "response": {"modalities": modalities}
-        }
-        self._ws.send(json.dumps(event_response))
+        self._request_response(modalities)
         print("Prompt sent. Waiting for response...")
 
     def close(self):
@@ -199,15 +445,24 @@ class RealtimeOpenAIClient:
             self._is_connected = False
             print("WebSocket connection closed by client.")
 
+    def _reset_audio(self):
+        """Reset the per-response audio buffer."""
+        self._audio_chunks = []
+        self._audio_bytes = 0
+
     def get_accumulated_audio(self) -> str:
         """
         Get all accumulated audio data (base64) from the last response.
+        Empty when the client was created with retain_audio=False.
         """
-        return self._total_audio_data
+        return pcm16_to_base64(b''.join(self._audio_chunks))
+
+    def get_accumulated_pcm(self) -> bytes:
+        """Raw PCM16 of the last response (retain_audio=True only)."""
+        return b''.join(self._audio_chunks)
 
     def print_audio_data_length(self):
         """
-        แสดงความยาวของ base64 audio data ที่สะสมไว้
+        แสดงความยาวของ audio data ที่ได้รับใน response ล่าสุด
         """
-        print(f"[DEBUG] total_audio_data length: {len(self._total_audio_data)} characters")
-        # print(f"example: {self._total_audio_data}")
+        print(f"[DEBUG] response audio: {self._audio_bytes} bytes PCM16")
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+class CaptureBuffer:
+    """
+    Preallocated PCM16 store for one utterance.
+
+    Sized once from `max_duration` x `fs`, so appending a frame is a single
+    slice copy instead of `bytes += frame` re-copying everything captured so
+    far. `view()` / `pcm()` expose the captured audio without copying.
+
+    With `pre_roll_ms`, non-speech frames are kept in a small ring; when speech
+    (re)starts the last `pre_roll_ms` of them are written in front of it, so the
+    onset the VAD needed a few frames to detect is not clipped.
+    """
+    def __init__(self, max_duration=30, fs=24000, pre_roll_ms=0):
+        self.fs = fs
+        self.capacity = int(max_duration * fs)
+        self._data = np.empty(self.capacity, dtype='<i2')
+        self._end = 0
+        self.overflowed = False
+
+        self.pre_roll_samples = int(fs * pre_roll_ms / 1000)
+        self._ring = np.empty(self.pre_roll_samples, dtype='<i2')
+        self._ring_pos = 0     # next write position in the ring
+        self._ring_fill = 0    # valid samples in the ring
+
+    def reset(self):
+        self._end = 0
+        self._ring_pos = 0
+        self._ring_fill = 0
+        self.overflowed = False
+
+    def push(self, frame, is_speech):
+        """Add one PCM16 frame: speech is captured, non-speech only feeds the pre-roll."""
+        samples = np.frombuffer(frame, dtype='<i2')
+        if is_speech:
+            if self._ring_fill:
+                self._flush_pre_roll()
+            self._write(samples)
+        elif self.pre_roll_samples:
+            self._hold(samples)
+
+    def _write(self, samples):
+        n = min(len(samples), self.capacity - self._end)
+        if n < len(samples):
+            self.overflowed = True
+        self._data[self._end:self._end + n] = samples[:n]
+        self._end += n
+
+    def _hold(self, samples):
+        size = self.pre_roll_samples
+        samples = samples[-size:]
+        first = min(len(samples), size - self._ring_pos)
+        self._ring[self._ring_pos:self._ring_pos + first] = samples[:first]
+        self._ring[:len(samples) - first] = samples[first:]
+        self._ring_pos = (self._ring_pos + len(samples)) % size
+        self._ring_fill = min(size, self._ring_fill + len(samples))
+
+    def _flush_pre_roll(self):
+        start = (self._ring_pos - self._ring_fill) % self.pre_roll_samples
+        if start + self._ring_fill <= self.pre_roll_samples:
+            self._write(self._ring[start:start + self._ring_fill])
+        else:
+            self._write(self._ring[start:])
+            self._write(self._ring[:self._ring_pos])
+        self._ring_fill = 0
+
+    def view(self, start=0):
+        """int16 samples captured so far, from sample `start` (no copy)."""
+        return self._data[start:self._end]
+
+    def pcm(self, start_byte=0):
+        """Captured PCM16 as a memoryview, from byte offset `start_byte` (no copy)."""
+        return memoryview(self._data[:self._end]).cast('B')[start_byte:]
+
+    @property
+    def nbytes(self):
+        return self._end * 2
+
+    @property
+    def duration(self):
+        return self._end / self.fs
+
+    def __len__(self):
+        return self._end
+
+    def __bool__(self):
+        return self._end > 0
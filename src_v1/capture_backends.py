@@ -0,0 +1,50 @@
+"""
+Audio capture stacks, imported on first use instead of with the server.
+
+    stream      - local VAD on browser audio (StreamingVADSession): scipy.signal
+                  for the resampler, plus webrtcvad for VAD_ENGINE=webrtc
+    server_mic  - the server's own microphone (AudioRecorder): the above plus
+                  sounddevice, which initializes PortAudio on import
+
+input_mode server_vad needs neither, so a worker that only serves it (or a host
+without an audio device) never loads them. load_capture_backend() blocks for
+the import; call it from an executor, not the event loop.
+"""
+
+import importlib
+import threading
+import time
+
+CAPTURE_BACKENDS = {
+    "stream": ("src_v1.resample", "src_v1.vad_engine"),
+    "server_mic": ("src_v1.resample", "src_v1.vad_engine", "src_v1.audio"),
+}
+_ENGINE_MODULES = {"webrtc": ("webrtcvad",)}  # VAD engines that import a module of their own
+
+_lock = threading.Lock()
+_loaded = {}  # (backend, vad_engine) -> seconds the import took
+
+
+def load_capture_backend(name, vad_engine="webrtc"):
+    """Import everything backend `name` needs; returns the seconds it took (0 when already loaded)."""
+    key = (name, vad_engine)
+    if key in _loaded:
+        return 0.0
+    with _lock:
+        if key in _loaded:
+            return 0.0
+        start = time.perf_counter()
+        for module in CAPTURE_BACKENDS[name] + _ENGINE_MODULES.get(vad_engine, ()):
+            importlib.import_module(module)
+        _loaded[key] = time.perf_counter() - start
+        print(f"🎙️ capture backend {name} ({vad_engine}) loaded in {_loaded[key] * 1000:.0f} ms")
+        return _loaded[key]
+
+
+def is_loaded(name, vad_engine="webrtc"):
+    return (name, vad_engine) in _loaded
+
+
+def loaded_backends():
+    """{backend: import ms} for /health"""
+    return {name: round(seconds * 1000, 1) for (name, _), seconds in _loaded.items()}
@@ -0,0 +1,61 @@
+"""
+NumPy-backed PCM16 helpers shared by the recorders and the realtime client.
+
+All functions operate on little-endian 16-bit mono PCM, the format the
+Azure OpenAI Realtime API expects for ``input_audio`` / ``response.audio.delta``.
+"""
+
+import base64
+import io
+import wave
+
+import numpy as np
+
+PCM16_SCALE = 32767
+
+
+def float32_to_pcm16(float32_array) -> bytes:
+    """
+    Clip float samples to [-1.0, 1.0] and convert to PCM16 bytes.
+    Produces the same bytes as the previous per-sample ``struct.pack('<h', int(x * 32767))``
+    path: scaling happens in the input's own float precision and truncates toward zero.
+    """
+    samples = np.asarray(float32_array).reshape(-1)
+    if not np.issubdtype(samples.dtype, np.floating):
+        samples = samples.astype(np.float64)
+    # max(-1, min(1, nan)) == 1.0 in the old list comprehension
+    samples = np.nan_to_num(samples, nan=1.0, posinf=1.0, neginf=-1.0)
+    np.clip(samples, -1.0, 1.0, out=samples)
+    samples *= samples.dtype.type(PCM16_SCALE)
+    return samples.astype('<i2').tobytes()
+
+
+def pcm16_to_float32(pcm_bytes) -> np.ndarray:
+    """Convert PCM16 bytes to a float32 array in [-1.0, 1.0]."""
+    return np.frombuffer(pcm_bytes, dtype='<i2').astype(np.float32) / PCM16_SCALE
+
+
+def pcm16_to_base64(pcm_bytes) -> str:
+    """Encode raw PCM16 bytes (bytes, bytearray or memoryview) as base64 text."""
+    return base64.b64encode(pcm_bytes).decode('ascii')
+
+
+def base64_to_pcm16(audio_base64: str) -> bytes:
+    """Decode base64 text back to raw PCM16 bytes."""
+    return base64.b64decode(audio_base64)
+
+
+def float32_to_base64(float32_array) -> str:
+    """Clip, convert to PCM16 and base64-encode in one call."""
+    return pcm16_to_base64(float32_to_pcm16(float32_array))
+
+
+def pcm16_to_wav(pcm_bytes, sample_rate=24000) -> bytes:
+    """Wrap raw PCM16 mono in a WAV container."""
+    with io.BytesIO() as wav_io:
+        with wave.open(wav_io, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)  # 16-bit PCM
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(pcm_bytes)
+        return wav_io.getvalue()
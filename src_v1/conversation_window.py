@@ -0,0 +1,188 @@
+"""
+Sliding window over the upstream realtime conversation.
+
+Every turn leaves a user item and an assistant item in the realtime API's
+conversation, and the model reads all of them again for each response, so a
+long kiosk session gets slower and costlier with every turn. The window follows
+the conversation from server events (items created, audio deltas, truncations,
+deletions, input transcriptions). When a response is done, evict() names the
+oldest whole turns to delete (conversation.item.delete) so what is left fits
+
+    max_turns    - user turns kept (0 = no limit)
+    max_audio_s  - seconds of user + assistant audio
+    max_tokens   - estimated tokens: audio in ~10 / s, audio out ~20 / s, text ~4 chars each
+
+The newest turn is always kept. With summarize=True the text of evicted turns
+(typed prompt or input transcription, answer transcript) is folded into one
+text item at the start of the conversation, the last `summary_chars` of it.
+That is a transcript of what was said, not a model-written summary.
+"""
+
+import collections
+
+USER_AUDIO_TOKENS_PER_S = 10
+ASSISTANT_AUDIO_TOKENS_PER_S = 20
+CHARS_PER_TOKEN = 4
+ITEM_TOKENS = 4  # per-item overhead
+_BYTES_PER_MS = {'pcm16': 48, 'g711_ulaw': 8}
+SUMMARY_PREFIX = 'Earlier in this conversation:\n'
+
+
+class ContextItem:
+    __slots__ = ('item_id', 'role', 'turn', 'audio_ms', 'text')
+
+    def __init__(self, item_id, role, turn, audio_ms=0.0, text=''):
+        self.item_id = item_id
+        self.role = role
+        self.turn = turn
+        self.audio_ms = audio_ms
+        self.text = text
+
+    @property
+    def tokens(self):
+        per_s = USER_AUDIO_TOKENS_PER_S if self.role == 'user' else ASSISTANT_AUDIO_TOKENS_PER_S
+        return ITEM_TOKENS + self.audio_ms / 1000 * per_s + len(self.text) / CHARS_PER_TOKEN
+
+
+def _text_of(item):
+    """input_text / text / transcript parts of a conversation item"""
+    parts = []
+    for part in item.get('content') or ():
+        text = part.get('text') or part.get('transcript')
+        if text:
+            parts.append(text)
+    return ' '.join(parts)
+
+
+class ConversationWindow:
+    def __init__(self, max_turns=0, max_audio_s=0.0, max_tokens=0, summarize=False, summary_chars=1000):
+        self.max_turns = max_turns
+        self.max_audio_s = max_audio_s
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.summary_chars = summary_chars
+        self.audio_format = 'pcm16'  # kept in sync by the client (set_audio_format)
+        self.items = collections.OrderedDict()  # item id -> ContextItem, in conversation order
+        self.turns = 0  # user items seen
+        self.pending_input_ms = 0.0  # input audio sent since the last user item was created
+        self.summary_id = None  # text item holding the evicted turns
+        self.summary_text = ''
+        self._summary_seq = 0
+        self._summary_dirty = False
+        self.evicted_turns = 0
+        self.evicted_items = 0
+
+    @property
+    def enabled(self):
+        return bool(self.max_turns or self.max_audio_s or self.max_tokens)
+
+    def add_input_audio(self, audio_bytes):
+        """Audio (session format) appended to the input buffer or sent in a user item"""
+        self.pending_input_ms += audio_bytes / _BYTES_PER_MS.get(self.audio_format, 48)
+
+    def observe(self, event):
+        """Update the tracked conversation from one server event."""
+        event_type = event.get('type')
+        if event_type == 'response.audio.delta':
+            entry = self.items.get(event.get('item_id'))
+            if entry is not None:
+                entry.audio_ms += len(event.get('delta', '')) * 3 / 4 / _BYTES_PER_MS.get(self.audio_format, 48)
+        elif event_type in ('conversation.item.created', 'response.output_item.added'):
+            item = event.get('item', {})
+            item_id = item.get('id')
+            if item_id is None or item_id in self.items or item_id == self.summary_id:
+                return
+            role = item.get('role')
+            audio_ms = 0.0
+            if role == 'user':
+                self.turns += 1
+                if any(part.get('type') == 'input_audio' for part in item.get('content') or ()):
+                    audio_ms, self.pending_input_ms = self.pending_input_ms, 0.0
+            self.items[item_id] = ContextItem(item_id, role, self.turns, audio_ms, _text_of(item))
+        elif event_type in ('response.audio_transcript.done', 'response.text.done',
+                            'conversation.item.input_audio_transcription.completed'):
+            entry = self.items.get(event.get('item_id'))
+            if entry is not None:
+                entry.text = event.get('transcript', event.get('text')) or entry.text
+        elif event_type == 'conversation.item.truncated':
+            entry = self.items.get(event.get('item_id'))
+            if entry is not None:
+                entry.audio_ms = min(entry.audio_ms, event.get('audio_end_ms', entry.audio_ms))
+        elif event_type == 'conversation.item.deleted':
+            self.items.pop(event.get('item_id'), None)
+        elif event_type == 'input_audio_buffer.cleared':
+            self.pending_input_ms = 0.0
+
+    def usage(self):
+        """(turns, audio seconds, estimated tokens) of the tracked conversation"""
+        turns = len({entry.turn for entry in self.items.values()})
+        audio_s = sum(entry.audio_ms for entry in self.items.values()) / 1000
+        tokens = sum(entry.tokens for entry in self.items.values()) + len(self.summary_text) / CHARS_PER_TOKEN
+        return turns, audio_s, tokens
+
+    def _over(self, turns, audio_s, tokens):
+        return ((self.max_turns and turns > self.max_turns)
+                or (self.max_audio_s and audio_s > self.max_audio_s)
+                or (self.max_tokens and tokens > self.max_tokens))
+
+    def evict(self):
+        """Ids of the items to delete, oldest whole turns first; they are forgotten right away."""
+        if not self.enabled:
+            return []
+        by_turn = collections.OrderedDict()
+        for entry in self.items.values():
+            by_turn.setdefault(entry.turn, []).append(entry)
+        turns, audio_s, tokens = self.usage()
+        evicted = []
+        while len(by_turn) > 1 and self._over(turns, audio_s, tokens):
+            _, entries = by_turn.popitem(last=False)
+            turns -= 1
+            audio_s -= sum(entry.audio_ms for entry in entries) / 1000
+            tokens -= sum(entry.tokens for entry in entries)
+            if self.summarize:
+                before = len(self.summary_text)
+                self._fold(entries)
+                tokens += (len(self.summary_text) - before) / CHARS_PER_TOKEN
+            evicted.extend(entries)
+            self.evicted_turns += 1
+        for entry in evicted:
+            del self.items[entry.item_id]
+        self.evicted_items += len(evicted)
+        return [entry.item_id for entry in evicted]
+
+    def _fold(self, entries):
+        lines = [f"{'User' if entry.role == 'user' else 'Assistant'}: {entry.text}" for entry in entries if entry.text]
+        if lines:
+            text = '\n'.join(filter(None, [self.summary_text] + lines))
+            self.summary_text = text[-self.summary_chars:]
+            self._summary_dirty = True
+
+    def take_summary(self):
+        """
+        (old summary id or None, new summary item) after evict() folded turns into it,
+        else None. The item goes first in the conversation (previous_item_id "root").
+        """
+        if not self._summary_dirty:
+            return None
+        self._summary_dirty = False
+        self._summary_seq += 1
+        old_id, self.summary_id = self.summary_id, f'ctx_summary_{self._summary_seq}'
+        item = {
+            "id": self.summary_id,
+            "type": "message",
+            "role": "system",
+            "content": [{"type": "input_text", "text": SUMMARY_PREFIX + self.summary_text}],
+        }
+        return old_id, item
+
+    def stats(self):
+        turns, audio_s, tokens = self.usage()
+        return {
+            "turns": turns,
+            "items": len(self.items),
+            "audio_s": round(audio_s, 1),
+            "tokens": round(tokens),
+            "summary_chars": len(self.summary_text),
+            "evicted_turns": self.evicted_turns,
+            "evicted_items": self.evicted_items,
+        }
@@ -0,0 +1,86 @@
+"""
+Two-stage endpointing: a speculative response at a short, tentative silence.
+
+    single      - the utterance is sent once the final silence threshold is reached
+    speculative - it is sent at the tentative silence; the response is held back
+                  and released to the browser when the final threshold confirms
+                  the end of the turn, or cancelled if the user speaks again
+    aggressive  - like speculative, but the response plays as soon as it arrives
+                  (a rollback then also flushes the browser's playback)
+"""
+
+import time
+
+ENDPOINTING_MODES = ("single", "speculative", "aggressive")
+
+
+class SpeculativeTurn:
+    """One speculative response, from the tentative end of speech to confirm / rollback."""
+    def __init__(self, hold=True):
+        self.hold = hold                 # keep upstream output until confirmed
+        self.held = []                   # deferred deliveries, in upstream order
+        self.tentative_at = time.monotonic()
+        self.first_delta_at = None
+        self.released_audio = False      # audio already went out (aggressive mode)
+        self.discarded = False           # rolled back: late output is dropped
+
+    def deliver(self, fn, is_audio=False):
+        """Run a delivery now, or keep it for release() while the turn is unconfirmed."""
+        if self.discarded:
+            return
+        if is_audio and self.first_delta_at is None:
+            self.first_delta_at = time.monotonic()
+        if self.hold:
+            self.held.append(fn)
+            return
+        if is_audio:
+            self.released_audio = True
+        fn()
+
+    def discard(self):
+        self.discarded = True
+        self.held = []
+
+    def release(self):
+        """Confirmed: run the held deliveries and pass later ones straight through."""
+        held, self.held = self.held, []
+        self.hold = False
+        for fn in held:
+            fn()
+
+    def saved_s(self, final_at):
+        """
+        Time gained over sending at the final threshold (the model's think time is the same):
+        held output starts at max(final, first delta), unheld output at the first delta.
+        """
+        if self.hold:
+            first = self.first_delta_at if self.first_delta_at is not None else final_at
+            return max(0.0, min(final_at, first) - self.tentative_at)
+        return max(0.0, final_at - self.tentative_at)
+
+
+class SpeculationStats:
+    """Per-session speculation outcome counters."""
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_s = 0.0
+
+    def hit(self, saved_s):
+        self.hits += 1
+        self.saved_s += saved_s
+
+    def miss(self):
+        self.misses += 1
+
+    def as_dict(self):
+        decided = self.hits + self.misses
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / decided, 3) if decided else None,
+            "saved_ms_total": round(self.saved_s * 1000, 1),
+            "saved_ms_avg": round(self.saved_s * 1000 / self.hits, 1) if self.hits else None,
+        }
@@ -0,0 +1,235 @@
+"""
+Per-session event journal: what a session received, decided and sent, with
+monotonic timestamps, for replaying production traffic offline
+(benchmarks/replay_journal.py).
+
+File layout (append-only):
+
+    b'SJv1' | uint32 meta length | meta (JSON: client id, codec, config, ...)
+    record* = kind (uint8) | t (float64, seconds since the journal opened) | length (uint32) | payload
+
+Kinds:
+
+    INBOUND_BINARY  browser WebSocket binary message, as received
+    INBOUND_TEXT    browser WebSocket text message (utf-8)
+    MIC_AUDIO       PCM16 block from the server microphone (AudioRecorder)
+    STAGE           turn stage / VAD and endpointing decision (utf-8 name)
+    UPSTREAM_IN     realtime server event (utf-8 JSON) except audio deltas
+    UPSTREAM_AUDIO  response.audio.delta: uint32 decoded bytes only
+    UPSTREAM_OUT    type of an event sent upstream (utf-8)
+    OUTBOUND_TEXT   text message written to the browser (utf-8 JSON, without audio)
+    OUTBOUND_AUDIO  audio written to the browser: uint32 turn id, uint32 bytes
+
+record() only appends to an in-memory buffer under a lock; full buffers (and,
+every `flush_s`, partial ones) are written by one background thread shared by
+all journals. A journal stops recording at `max_bytes` and says so in a final
+STAGE record ("journal_truncated"). A torn last record (crash) is ignored by
+read_journal().
+"""
+
+import json
+import queue
+import struct
+import threading
+import time
+
+MAGIC = b'SJv1'
+_META_LEN = struct.Struct('<I')
+_RECORD = struct.Struct('<BdI')
+_U32 = struct.Struct('<I')
+_U32X2 = struct.Struct('<II')
+
+INBOUND_BINARY = 1
+INBOUND_TEXT = 2
+MIC_AUDIO = 3
+STAGE = 4
+UPSTREAM_IN = 5
+UPSTREAM_AUDIO = 6
+UPSTREAM_OUT = 7
+OUTBOUND_TEXT = 8
+OUTBOUND_AUDIO = 9
+KIND_NAMES = {INBOUND_BINARY: 'inbound_binary', INBOUND_TEXT: 'inbound_text', MIC_AUDIO: 'mic_audio',
+              STAGE: 'stage', UPSTREAM_IN: 'upstream_in', UPSTREAM_AUDIO: 'upstream_audio',
+              UPSTREAM_OUT: 'upstream_out', OUTBOUND_TEXT: 'outbound_text', OUTBOUND_AUDIO: 'outbound_audio'}
+
+
+class _JournalWriter:
+    """The thread that does all journal file I/O."""
+    def __init__(self, flush_s=1.0):
+        self.flush_s = flush_s
+        self._queue = queue.SimpleQueue()
+        self._open = set()  # journals with a file open (flushed every flush_s)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.errors = 0
+
+    def submit(self, journal, data=None, close=False):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='journal-writer', daemon=True)
+                    self._thread.start()
+        self._queue.put((journal, data, close))
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_s
+        while True:
+            try:
+                journal, data, close = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+                if journal is None:
+                    data.set()  # drain(): everything queued before it is written
+                else:
+                    self._write(journal, data, close)
+            except queue.Empty:
+                pass
+            if time.monotonic() >= next_flush:
+                for journal in list(self._open):
+                    self._write(journal, journal._take(), False, flush=True)
+                next_flush = time.monotonic() + self.flush_s
+
+    def _write(self, journal, data, close, flush=False):
+        try:
+            if journal._file is None and not journal._file_closed:
+                journal._file = open(journal.path, 'ab')
+                self._open.add(journal)
+            if data and journal._file is not None:
+                journal._file.write(data)
+            if flush and journal._file is not None:
+                journal._file.flush()  # readable (and mostly kept after a crash) within flush_s
+            if close and journal._file is not None:
+                journal._file.close()
+                journal._file = None
+                journal._file_closed = True
+                self._open.discard(journal)
+        except OSError as e:
+            self.errors += 1
+            print(f"⚠️ journal {journal.path}: {e}")
+
+    def drain(self, timeout=5.0):
+        """Wait until everything submitted so far is written (tests, shutdown)."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put((None, done, False))
+        return done.wait(timeout)
+
+
+_writer = _JournalWriter()
+
+
+def drain(timeout=5.0):
+    """Wait until every journal record submitted so far is on disk (shutdown, tests)."""
+    return _writer.drain(timeout)
+
+
+class SessionJournal:
+    def __init__(self, path, meta, max_bytes=64 << 20, buffer_bytes=64 << 10):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.buffer_bytes = buffer_bytes
+        self.origin = time.monotonic()
+        self.bytes = 0
+        self.records = 0
+        self.truncated = False
+        self.closed = False
+        self._lock = threading.Lock()
+        self._file = None  # owned by the writer thread
+        self._file_closed = False
+        meta_bytes = json.dumps(dict(meta, started_at=time.time()), ensure_ascii=False).encode('utf-8')
+        self._buf = bytearray(MAGIC + _META_LEN.pack(len(meta_bytes)) + meta_bytes)
+        _writer.submit(self, self._take())
+
+    def record(self, kind, payload=b''):
+        """Append one record; cheap enough for every frame (no I/O on the caller's thread)."""
+        if self.closed or self.truncated:
+            return
+        t = time.monotonic() - self.origin
+        data = None
+        with self._lock:
+            size = _RECORD.size + len(payload)
+            if self.bytes + size > self.max_bytes:
+                self.truncated = True
+                payload = b'journal_truncated'
+                kind, size = STAGE, _RECORD.size + len(payload)
+            self._buf += _RECORD.pack(kind, t, len(payload))
+            self._buf += payload
+            self.bytes += size
+            self.records += 1
+            if len(self._buf) >= self.buffer_bytes:
+                data, self._buf = self._buf, bytearray()
+        if data:
+            _writer.submit(self, data)
+
+    def _take(self):
+        with self._lock:
+            data, self._buf = self._buf, bytearray()
+        return bytes(data)
+
+    # --- typed helpers for the hooks ---
+
+    def stage(self, name):
+        self.record(STAGE, name.encode('utf-8'))
+
+    def inbound(self, message):
+        if isinstance(message, (bytes, bytearray)):
+            self.record(INBOUND_BINARY, bytes(message))
+        else:
+            self.record(INBOUND_TEXT, message.encode('utf-8'))
+
+    def mic_audio(self, pcm16):
+        self.record(MIC_AUDIO, pcm16)
+
+    def upstream_in(self, message, event):
+        if event.get('type') == 'response.audio.delta':
+            self.record(UPSTREAM_AUDIO, _U32.pack(len(event.get('delta', '')) * 3 // 4))
+        else:
+            self.record(UPSTREAM_IN, message.encode('utf-8') if isinstance(message, str) else message)
+
+    def upstream_out(self, event_type):
+        self.record(UPSTREAM_OUT, (event_type or '').encode('utf-8'))
+
+    def outbound(self, message, audio_turn=None):
+        size = len(message) if isinstance(message, bytes) else len(message.encode('utf-8'))
+        if audio_turn is not None:
+            self.record(OUTBOUND_AUDIO, _U32X2.pack(audio_turn, size))
+        else:
+            self.record(OUTBOUND_TEXT, message.encode('utf-8'))
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        _writer.submit(self, self._take(), close=True)
+
+    def stats(self):
+        return {"path": self.path, "bytes": self.bytes, "records": self.records, "truncated": self.truncated}
+
+
+def read_journal(path):
+    """(meta, [(kind, t, payload)]) of a journal file; a torn last record is dropped."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path}: not a session journal")
+    (meta_len,) = _META_LEN.unpack_from(data, 4)
+    offset = 4 + _META_LEN.size
+    meta = json.loads(data[offset:offset + meta_len].decode('utf-8'))
+    offset += meta_len
+    records = []
+    while offset + _RECORD.size <= len(data):
+        kind, t, length = _RECORD.unpack_from(data, offset)
+        start = offset + _RECORD.size
+        if start + length > len(data):
+            break
+        records.append((kind, t, data[start:start + length]))
+        offset = start + length
+    return meta, records
+
+
+def decode_u32(payload):
+    return _U32.unpack(payload)[0]
+
+
+def decode_outbound_audio(payload):
+    """(turn id, bytes written)"""
+    return _U32X2.unpack(payload)
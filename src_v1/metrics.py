@@ -0,0 +1,249 @@
+"""
+Minimal Prometheus-style metrics (text exposition format 0.0.4), per-turn timelines
+and event loop lag.
+
+No client library: Counter / Gauge / Histogram keep their values in dicts keyed
+by label values, and MetricsRegistry.render() produces the text served on /metrics.
+"""
+
+import asyncio
+import collections
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _value(v):
+    if v == math.inf:
+        return '+Inf'
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()  # callbacks of the thread client update metrics off the loop
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _Scalar(_Metric):
+    """One number per label set, updated in place or computed at scrape time with set_function()."""
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+        self._function = None
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def set_function(self, fn):
+        """fn() returns a number, or a dict {label values tuple: number} for labelled metrics."""
+        self._function = fn
+
+    def _samples(self):
+        values = self._values
+        if self._function is not None:
+            result = self._function()
+            values = result if isinstance(result, dict) else {(): result}
+        return [f"{self.name}{_labels(self.labelnames, key)} {_value(v)}" for key, v in sorted(values.items())]
+
+
+class Counter(_Scalar):
+    kind = 'counter'
+
+
+class Gauge(_Scalar):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self):
+        lines = []
+        for key, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                le = [('le', _value(bound) if bound == math.inf else repr(float(bound)))]
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_value(float(series[-2]))}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class TurnTimeline:
+    """
+    Monotonic timestamps of one voice turn, in pipeline order:
+
+        speech_start -> end_of_speech -> payload_encoded -> upstream_sent
+        -> first_audio_delta -> transcript_done -> audio_done -> last_byte_flushed
+
+    Stages can be missing (e.g. no speech_start for typed prompts) and some can
+    swap (transcript_done may follow audio_done); intervals are taken between
+    recorded stages in time order.
+    """
+    SPEECH_START = 'speech_start'
+    END_OF_SPEECH = 'end_of_speech'
+    PAYLOAD_ENCODED = 'payload_encoded'
+    UPSTREAM_SENT = 'upstream_sent'
+    FIRST_AUDIO_DELTA = 'first_audio_delta'
+    TRANSCRIPT_DONE = 'transcript_done'
+    AUDIO_DONE = 'audio_done'
+    LAST_BYTE_FLUSHED = 'last_byte_flushed'
+    STAGES = (SPEECH_START, END_OF_SPEECH, PAYLOAD_ENCODED, UPSTREAM_SENT,
+              FIRST_AUDIO_DELTA, TRANSCRIPT_DONE, AUDIO_DONE, LAST_BYTE_FLUSHED)
+
+    def __init__(self, turn_id, mode=None):
+        self.turn_id = turn_id
+        self.mode = mode
+        self.stamps = {}
+
+    def mark(self, stage, timestamp=None):
+        """Record a stage once; later marks of the same stage are ignored."""
+        if stage not in self.stamps:
+            self.stamps[stage] = time.monotonic() if timestamp is None else timestamp
+
+    def clear(self, *stages):
+        """Forget stages, e.g. those of a speculative submit that was rolled back."""
+        for stage in stages:
+            self.stamps.pop(stage, None)
+
+    def has(self, stage):
+        return stage in self.stamps
+
+    def elapsed(self, start, end):
+        if start in self.stamps and end in self.stamps:
+            return self.stamps[end] - self.stamps[start]
+        return None
+
+    def intervals(self):
+        """[(stage, seconds since the previous recorded stage)] in time order."""
+        ordered = sorted(self.stamps.items(), key=lambda item: (item[1], self.STAGES.index(item[0])))
+        return [(stage, t - prev_t) for (_, prev_t), (stage, t) in zip(ordered, ordered[1:])]
+
+    def offsets_ms(self):
+        """{stage: ms since the first recorded stage}"""
+        if not self.stamps:
+            return {}
+        origin = min(self.stamps.values())
+        return {stage: round((self.stamps[stage] - origin) * 1000, 1) for stage in self.STAGES if stage in self.stamps}
+
+
+class LoopLagMonitor:
+    """
+    Event loop responsiveness: a task wakes up every `interval` seconds and records
+    how late it was. Anything that blocks the loop (CPU work, blocking calls) shows
+    up as lag, and so as delayed audio for every session on this worker.
+    """
+    def __init__(self, interval=0.05, histogram=None, window=1200):
+        self.interval = interval
+        self.histogram = histogram  # optional Histogram observing every lag sample
+        self.samples = collections.deque(maxlen=window)  # recent lag samples (s)
+        self.max_lag_s = 0.0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        expected = loop.time() + self.interval
+        while True:
+            await asyncio.sleep(max(0.0, expected - loop.time()))
+            now = loop.time()
+            lag = max(0.0, now - expected)
+            self.samples.append(lag)
+            self.max_lag_s = max(self.max_lag_s, lag)
+            if self.histogram is not None:
+                self.histogram.observe(lag)
+            expected = now + self.interval
+
+    def stats(self):
+        recent = sorted(self.samples)
+        if not recent:
+            return {"interval_ms": self.interval * 1000, "samples": 0}
+
+        def pct(p):
+            return round(recent[min(len(recent) - 1, int(p / 100 * len(recent)))] * 1000, 2)
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": len(recent),
+            "p50_ms": pct(50),
+            "p99_ms": pct(99),
+            "recent_max_ms": round(recent[-1] * 1000, 2),
+            "max_ms": round(self.max_lag_s * 1000, 2),
+        }
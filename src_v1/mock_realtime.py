@@ -0,0 +1,329 @@
+"""
+Local stand-in for the Azure OpenAI Realtime WebSocket, for benchmarks and offline runs.
+
+Speaks the subset of the realtime protocol this project uses:
+
+    client -> mock: session.update, conversation.item.create,
+                    input_audio_buffer.append / commit / clear, response.create,
+                    response.cancel, conversation.item.truncate / delete
+    mock -> client: session.updated, conversation.item.created,
+                    input_audio_buffer.committed / cleared,
+                    input_audio_buffer.speech_started / speech_stopped (server_vad),
+                    conversation.item.input_audio_transcription.completed,
+                    response.created,
+                    response.output_item.added, response.audio.delta,
+                    response.audio_transcript.delta / done, response.audio.done,
+                    response.text.delta / done (text-only responses),
+                    response.done, conversation.item.truncated / deleted
+
+A response starts `think_ms` (+/- `think_jitter_ms`) after `response.create`, then
+sends `delta_count` deltas of `delta_ms` audio every `delta_ms` (the cadence), with
+the transcript split over the first of them (8 kHz mu-law after session.update
+selects g711_ulaw output).
+
+Turn detection is off until session.update sets turn_detection to server_vad; then
+appended audio runs through an energy detector (level above -60 + 40 x threshold
+dBFS is speech), speech reports speech_started (and interrupts a response in
+flight), silence_duration_ms without speech reports speech_stopped, commits the
+buffer and, with create_response, starts a response.
+With input_audio_transcription set by session.update, every audio item gets a
+transcription (`input_transcript`) right after it is created.
+The mock keeps the conversation's items (created, truncated, deleted) and, with
+`think_ms_per_ktoken`, thinks longer the more estimated tokens it holds, like a
+model that reads the whole conversation for every response.
+Point the server at it with REALTIME_URI=ws://127.0.0.1:8765/openai/realtime.
+
+    python -m src_v1.mock_realtime --port 8765 --think-ms 300
+"""
+
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import random
+import struct
+import time
+
+import numpy as np
+import websockets
+
+from src_v1.conversation_window import (ASSISTANT_AUDIO_TOKENS_PER_S, CHARS_PER_TOKEN, ITEM_TOKENS,
+                                        USER_AUDIO_TOKENS_PER_S)
+
+
+def _item_tokens(role, audio_ms, text=''):
+    per_s = USER_AUDIO_TOKENS_PER_S if role == 'user' else ASSISTANT_AUDIO_TOKENS_PER_S
+    return ITEM_TOKENS + audio_ms / 1000 * per_s + len(text) / CHARS_PER_TOKEN
+
+
+class _ServerVAD:
+    """server_vad turn detection of one connection, over appended chunks."""
+    def __init__(self, config):
+        self.silence_ms = config.get('silence_duration_ms', 500)
+        self.prefix_ms = config.get('prefix_padding_ms', 300)
+        self.threshold_db = -60 + 40 * config.get('threshold', 0.5)
+        self.create_response = config.get('create_response', True)
+        self.audio_ms = 0.0        # audio appended so far
+        self.in_speech = False
+        self.last_speech_ms = 0.0  # end of the last chunk with speech
+
+    def feed(self, audio, audio_format):
+        """Returns [(event type, audio ms)] for this chunk."""
+        if audio_format == 'g711_ulaw':
+            codes = ~np.frombuffer(audio, dtype=np.uint8).astype(np.int32) & 0xFF
+            magnitude = (((codes & 0x0F) << 3) + 0x84) << ((codes >> 4) & 0x07)
+            samples = np.where(codes & 0x80, 0x84 - magnitude, magnitude - 0x84)
+            rate = 8000
+        else:
+            samples = np.frombuffer(audio, dtype='<i2')
+            rate = 24000
+        if not len(samples):
+            return []
+        start, self.audio_ms = self.audio_ms, self.audio_ms + len(samples) * 1000 / rate
+        rms = np.sqrt(np.mean(samples.astype(np.float64) ** 2)) / 32768
+        events = []
+        if rms > 0 and 20 * np.log10(rms) > self.threshold_db:
+            if not self.in_speech:
+                self.in_speech = True
+                events.append(('input_audio_buffer.speech_started', max(0.0, start - self.prefix_ms)))
+            self.last_speech_ms = self.audio_ms
+        elif self.in_speech and self.audio_ms - self.last_speech_ms >= self.silence_ms:
+            self.in_speech = False
+            events.append(('input_audio_buffer.speech_stopped', self.audio_ms))
+        return events
+
+
+class MockRealtimeServer:
+    def __init__(self, host='127.0.0.1', port=8765, delta_count=20, delta_ms=40,
+                 sample_rate=24000, transcript='สวัสดีค่ะ', timestamp_deltas=False,
+                 think_ms=0, think_jitter_ms=0, input_transcript='สวัสดี', think_ms_per_ktoken=0):
+        self.host = host
+        self.port = port
+        self.delta_count = delta_count
+        self.delta_ms = delta_ms
+        self.think_ms = think_ms            # model "thinking" time before the first delta
+        self.think_jitter_ms = think_jitter_ms
+        self.think_ms_per_ktoken = think_ms_per_ktoken  # extra think time per 1000 tokens in the conversation
+        self.sample_rate = sample_rate
+        self.transcript = transcript
+        self.input_transcript = input_transcript  # "what the user said", for input_audio_transcription
+        # Prefix each delta's PCM with time.monotonic_ns() so clients can measure delivery latency
+        self.timestamp_deltas = timestamp_deltas
+        self._server = None
+        self._ids = itertools.count(1)
+
+    @property
+    def uri(self):
+        return f'ws://{self.host}:{self.port}/openai/realtime'
+
+    def _delta(self, audio_format='pcm16'):
+        if audio_format == 'g711_ulaw':
+            # 8 kHz mu-law silence (0xFF decodes to 0)
+            return base64.b64encode(b'\xff' * (8 * self.delta_ms)).decode('ascii')
+        pcm = bytes(int(self.sample_rate * self.delta_ms / 1000) * 2)
+        if self.timestamp_deltas:
+            pcm = struct.pack('<q', time.monotonic_ns()) + pcm[8:]
+        return base64.b64encode(pcm).decode('ascii')
+
+    def _think_s(self, conversation=None):
+        jitter = random.uniform(-self.think_jitter_ms, self.think_jitter_ms) if self.think_jitter_ms else 0
+        context = self.think_ms_per_ktoken * sum(conversation.values()) / 1000 if conversation else 0
+        return max(0.0, self.think_ms + context + jitter) / 1000
+
+    def _transcript_deltas(self):
+        n = len(self.transcript)
+        k = max(1, min(self.delta_count, n))
+        return [self.transcript[i * n // k:(i + 1) * n // k] for i in range(k)]
+
+    async def _respond(self, ws, response_id, modalities=('text', 'audio'), audio_format='pcm16', conversation=None):
+        item_id = f'item_{next(self._ids)}'
+        await ws.send(json.dumps({'type': 'response.created', 'response': {'id': response_id}}))
+        try:
+            await asyncio.sleep(self._think_s(conversation))
+            await ws.send(json.dumps({'type': 'response.output_item.added', 'response_id': response_id,
+                                      'item': {'id': item_id, 'type': 'message', 'role': 'assistant'}}))
+            if conversation is not None:
+                audio_ms = self.delta_count * self.delta_ms if 'audio' in modalities else 0
+                conversation[item_id] = _item_tokens('assistant', audio_ms, self.transcript)
+            text = self._transcript_deltas()
+            if 'audio' not in modalities:
+                for delta in text:
+                    await ws.send(json.dumps({'type': 'response.text.delta', 'response_id': response_id,
+                                              'item_id': item_id, 'delta': delta}))
+                    await asyncio.sleep(self.delta_ms / 1000)
+                await ws.send(json.dumps({'type': 'response.text.done', 'response_id': response_id,
+                                          'item_id': item_id, 'text': self.transcript}))
+            for i in range(self.delta_count if 'audio' in modalities else 0):
+                await ws.send(json.dumps({'type': 'response.audio.delta', 'response_id': response_id,
+                                          'item_id': item_id, 'content_index': 0,
+                                          'delta': self._delta(audio_format)}))
+                if i < len(text):
+                    await ws.send(json.dumps({'type': 'response.audio_transcript.delta', 'response_id': response_id,
+                                              'item_id': item_id, 'delta': text[i]}))
+                await asyncio.sleep(self.delta_ms / 1000)
+            if 'audio' in modalities:
+                await ws.send(json.dumps({'type': 'response.audio_transcript.done', 'response_id': response_id,
+                                          'item_id': item_id, 'transcript': self.transcript}))
+                await ws.send(json.dumps({'type': 'response.audio.done', 'response_id': response_id,
+                                          'item_id': item_id}))
+        except asyncio.CancelledError:
+            # response.cancel: the response ends right away with status "cancelled"
+            try:
+                await ws.send(json.dumps({'type': 'response.done',
+                                          'response': {'id': response_id, 'status': 'cancelled'}}))
+            except websockets.ConnectionClosed:
+                pass
+            raise
+        await ws.send(json.dumps({'type': 'response.done', 'response': {'id': response_id, 'status': 'completed'}}))
+
+    def _item_created(self, item):
+        item = dict(item, id=item.get('id') or f'item_{next(self._ids)}')
+        return {'type': 'conversation.item.created', 'item': item}
+
+    async def _handler(self, ws, path=None):
+        input_bytes = 0  # input_audio_buffer size
+        responses = {}  # response id -> streaming task
+        audio_format = 'pcm16'  # output_audio_format from session.update
+        input_format = 'pcm16'
+        vad = None  # _ServerVAD while turn_detection is server_vad
+        speech_item = None  # user item of the speech in progress
+        transcription = None  # input_audio_transcription from session.update
+        conversation = {}  # item id -> estimated tokens, in conversation order
+
+        def input_ms(audio_bytes):
+            return audio_bytes / (8 if input_format == 'g711_ulaw' else 48)
+
+        async def transcribe(item_id):
+            if transcription:
+                await ws.send(json.dumps({'type': 'conversation.item.input_audio_transcription.completed',
+                                          'item_id': item_id, 'content_index': 0,
+                                          'transcript': self.input_transcript}))
+
+        def start_response(modalities=('text', 'audio')):
+            response_id = f'resp_{next(self._ids)}'
+            task = asyncio.create_task(self._respond(ws, response_id, modalities, audio_format, conversation))
+            responses[response_id] = task
+            task.add_done_callback(lambda _, rid=response_id: responses.pop(rid, None))
+
+        async def commit(item_id):
+            nonlocal input_bytes
+            await ws.send(json.dumps({'type': 'input_audio_buffer.committed', 'item_id': item_id}))
+            await ws.send(json.dumps(self._item_created(
+                {'id': item_id, 'type': 'message', 'role': 'user',
+                 'content': [{'type': 'input_audio', 'audio_bytes': input_bytes}]})))
+            conversation[item_id] = _item_tokens('user', input_ms(input_bytes))
+            input_bytes = 0
+            await transcribe(item_id)
+
+        try:
+            async for message in ws:
+                event = json.loads(message)
+                event_type = event.get('type')
+                if event_type == 'session.update':
+                    session = event.get('session', {})
+                    audio_format = session.get('output_audio_format', audio_format)
+                    input_format = session.get('input_audio_format', input_format)
+                    if 'input_audio_transcription' in session:
+                        transcription = session['input_audio_transcription']
+                    if 'turn_detection' in session:
+                        detection = session['turn_detection']
+                        vad = _ServerVAD(detection) if detection and detection.get('type') == 'server_vad' else None
+                    await ws.send(json.dumps({'type': 'session.updated', 'session': event.get('session', {})}))
+                elif event_type == 'conversation.item.create':
+                    created = self._item_created(event.get('item', {}))
+                    await ws.send(json.dumps(created))
+                    content = created['item'].get('content', [])
+                    conversation[created['item']['id']] = _item_tokens(
+                        created['item'].get('role', 'user'),
+                        input_ms(sum(len(part.get('audio', '')) * 3 // 4 for part in content)),
+                        ''.join(part.get('text', '') for part in content))
+                    if any(part.get('type') == 'input_audio' for part in created['item'].get('content', [])):
+                        await transcribe(created['item']['id'])
+                elif event_type == 'input_audio_buffer.append':
+                    input_bytes += len(event.get('audio', '')) * 3 // 4
+                    for vad_event, audio_ms in vad.feed(base64.b64decode(event.get('audio', '')), input_format) \
+                            if vad else ():
+                        if vad_event == 'input_audio_buffer.speech_started':
+                            speech_item = f'item_{next(self._ids)}'
+                            # interrupt_response: the answer in flight stops when the user talks
+                            for task in list(responses.values()):
+                                task.cancel()
+                            await ws.send(json.dumps({'type': vad_event, 'audio_start_ms': int(audio_ms),
+                                                      'item_id': speech_item}))
+                        else:
+                            await ws.send(json.dumps({'type': vad_event, 'audio_end_ms': int(audio_ms),
+                                                      'item_id': speech_item}))
+                            await commit(speech_item)
+                            if vad.create_response:
+                                start_response()
+                elif event_type == 'input_audio_buffer.commit':
+                    await commit(f'item_{next(self._ids)}')
+                elif event_type == 'input_audio_buffer.clear':
+                    input_bytes = 0
+                    if vad:
+                        vad.in_speech = False
+                    await ws.send(json.dumps({'type': 'input_audio_buffer.cleared'}))
+                elif event_type == 'response.create':
+                    # Keep reading (e.g. more input) while the response streams
+                    start_response(event.get('response', {}).get('modalities') or ('text', 'audio'))
+                elif event_type == 'response.cancel':
+                    for task in list(responses.values()):
+                        task.cancel()
+                elif event_type == 'conversation.item.delete':
+                    conversation.pop(event.get('item_id'), None)
+                    await ws.send(json.dumps({'type': 'conversation.item.deleted', 'item_id': event.get('item_id')}))
+                elif event_type == 'conversation.item.truncate':
+                    if event.get('item_id') in conversation:
+                        conversation[event['item_id']] = _item_tokens('assistant', event.get('audio_end_ms', 0),
+                                                                      self.transcript)
+                    await ws.send(json.dumps({'type': 'conversation.item.truncated', 'item_id': event.get('item_id'),
+                                              'content_index': event.get('content_index', 0),
+                                              'audio_end_ms': event.get('audio_end_ms', 0)}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in list(responses.values()):
+                task.cancel()
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port, max_size=None, compression=None)
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+async def _serve(args):
+    server = await MockRealtimeServer(
+        host=args.host, port=args.port, delta_count=args.delta_count,
+        delta_ms=args.delta_ms, timestamp_deltas=args.timestamp_deltas,
+        think_ms=args.think_ms, think_jitter_ms=args.think_jitter_ms, transcript=args.transcript,
+        input_transcript=args.input_transcript, think_ms_per_ktoken=args.think_ms_per_ktoken
+    ).start()
+    print(f'Mock realtime server listening on {server.uri}', flush=True)
+    await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delta-count', type=int, default=20, help='audio deltas per response')
+    parser.add_argument('--delta-ms', type=int, default=40, help='audio per delta / interval between deltas')
+    parser.add_argument('--think-ms', type=int, default=0, help='delay between response.create and the first delta')
+    parser.add_argument('--think-jitter-ms', type=int, default=0)
+    parser.add_argument('--think-ms-per-ktoken', type=float, default=0,
+                        help='extra think time per 1000 estimated tokens in the conversation')
+    parser.add_argument('--timestamp-deltas', action='store_true')
+    parser.add_argument('--transcript', default='สวัสดีค่ะ', help='text of every response (streamed in deltas)')
+    parser.add_argument('--input-transcript', default='สวัสดี', help='transcription of every audio input item')
+    asyncio.run(_serve(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
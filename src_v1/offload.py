@@ -0,0 +1,80 @@
+"""
+Executor layer for CPU-bound work that should not run on the event loop.
+
+    thread()   - ThreadPoolExecutor, for NumPy / zlib / wave work. Much of it releases
+                 the GIL; what does not is still preempted every sys.getswitchinterval()
+                 (5 ms), so the loop keeps getting turns instead of stalling for the
+                 whole job
+    process()  - ProcessPoolExecutor, for pure-Python work (regex formatting); the
+                 function and its arguments must pickle. With processes=0 these jobs
+                 use the thread pool
+
+Jobs smaller than `min_bytes` run inline: handing them to a pool costs more than
+running them. threads=0 runs everything inline (the old behaviour, for comparison).
+"""
+
+import asyncio
+import concurrent.futures
+import time
+
+OFFLOAD_POOLS = ("inline", "thread", "process")
+
+
+class Offloader:
+    def __init__(self, threads=2, processes=0, min_bytes=32768, on_job=None):
+        self.min_bytes = min_bytes
+        self.on_job = on_job  # callback(job name, pool, seconds) for every job
+        self._threads = concurrent.futures.ThreadPoolExecutor(threads, thread_name_prefix='offload') \
+            if threads > 0 else None
+        self._process_workers = processes
+        self._processes = None  # started on first use (workers fork lazily)
+        self.jobs = dict.fromkeys(OFFLOAD_POOLS, 0)
+        self.busy_s = dict.fromkeys(OFFLOAD_POOLS, 0.0)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def thread(self, fn, *args, size=None, name=None):
+        """fn(*args) on the thread pool; inline when `size` (bytes) is below min_bytes."""
+        return await self._run(self._threads, 'thread', fn, args, size, name)
+
+    async def process(self, fn, *args, size=None, name=None):
+        """fn(*args) on the process pool (thread pool when there is none)."""
+        if self._process_workers > 0 and self._processes is None:
+            self._processes = concurrent.futures.ProcessPoolExecutor(self._process_workers)
+        if self._processes is None:
+            return await self.thread(fn, *args, size=size, name=name)
+        return await self._run(self._processes, 'process', fn, args, size, name)
+
+    async def _run(self, executor, pool, fn, args, size, name):
+        if executor is None or (size is not None and size < self.min_bytes):
+            executor, pool = None, 'inline'
+        start = time.perf_counter()
+        if executor is None:
+            result = fn(*args)
+        else:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+            finally:
+                self.in_flight -= 1
+        seconds = time.perf_counter() - start
+        self.jobs[pool] += 1
+        self.busy_s[pool] += seconds
+        if self.on_job:
+            self.on_job(name or getattr(fn, '__name__', 'job'), pool, seconds)
+        return result
+
+    def shutdown(self):
+        for executor in (self._threads, self._processes):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "min_bytes": self.min_bytes,
+            "jobs": dict(self.jobs),
+            "busy_s": {pool: round(seconds, 3) for pool, seconds in self.busy_s.items()},
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
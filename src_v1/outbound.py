@@ -0,0 +1,328 @@
+"""
+Ordered outbound queue for one browser WebSocket that coalesces when the browser falls behind.
+
+All messages for a connection go through one OutboundSender whose single
+task sends them in order, so JSON control messages and audio can no longer
+overtake each other. Every wire message gets the next sequence number
+(``"seq"`` in JSON, the header sequence in binary frames).
+
+Audio deltas that are already queued when the sender gets to them are merged
+into one frame of up to `coalesce_ms` of audio: no extra delay while the
+browser keeps up, fewer and larger frames when it falls behind.
+
+Slow consumer: the queue is full (`max_queue` messages) or the oldest queued
+message is older than `max_lag_ms`. The sender then merges new audio into the
+turn's newest queued audio (past text_delta messages queued after it) and new
+text_delta messages into a queued one of the same turn, without a size limit,
+and calls `on_slow(policy)` once; the owner applies the policy:
+
+    coalesce     - only the harder coalescing above
+    drop_replay  - also stop retaining audio for WAV replay
+    disconnect   - close the connection
+
+JSON messages count toward `max_queue` and the lag. Under congestion only
+audio and text_delta messages are merged. Other JSON messages (status,
+text_response, audio_response_done, playback_flush, ...) are never merged or
+dropped. The queue can therefore exceed `max_queue` only by those, a handful
+per turn. Only the disconnect policy bounds a browser that stops reading
+altogether.
+
+Audio is kept as the realtime API sent it until the frame is written, then
+encoded once per (coalesced) frame with the connection's codec
+(src_v1/audio_codecs.py). With an Offloader (src_v1/offload.py) large frames and
+slow codecs are encoded on its thread pool, and a JSON message may be an
+awaitable (e.g. text formatted in a pool) - the sender waits for it in its place
+in the queue, so order is kept.
+
+Barge-in: the sender mirrors the browser's gapless player (each frame starts at
+max(now + 50 ms, end of the previous one)) to estimate how much of the current
+turn was already heard, and flush_audio() drops the turn's queued audio.
+"""
+
+import asyncio
+import collections
+import inspect
+import json
+import time
+
+from src_v1.audio_codecs import PCM16
+from src_v1.codec import base64_to_pcm16, pcm16_to_base64
+from src_v1.wire import FRAME_AUDIO_OUT, PROTOCOL_BINARY, pack_frame
+
+SLOW_CONSUMER_POLICIES = ("coalesce", "drop_replay", "disconnect")
+PLAYER_LEAD_S = 0.05  # PCMPlayer in index.html schedules the first frame 50 ms ahead
+
+
+class _Outbound:
+    __slots__ = ("data", "turn_id", "chunks", "ms", "enqueued_at", "on_sent")
+
+    def __init__(self, data=None, turn_id=0, chunk=None, ms=0.0, on_sent=None):
+        self.data = data               # JSON message (dict, awaitable, or callable building it at send time)
+        self.on_sent = on_sent         # called after the message was written
+        self.turn_id = turn_id
+        self.chunks = [chunk] if chunk is not None else None  # base64 audio deltas
+        self.ms = ms
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def is_audio(self):
+        return self.chunks is not None
+
+
+class OutboundSender:
+    def __init__(self, websocket, protocol, codec=PCM16, max_queue=256, coalesce_ms=120,
+                 max_lag_ms=2000, policy="coalesce", on_slow=None, on_bytes=None, offload=None, on_frame=None):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.websocket = websocket
+        self.protocol = protocol
+        self.codec = codec
+        self.max_queue = max_queue
+        self.coalesce_ms = coalesce_ms
+        self.max_lag_ms = max_lag_ms
+        self.policy = policy
+        self.on_slow = on_slow
+        self.on_bytes = on_bytes  # callback(nbytes) for every message written
+        self.on_frame = on_frame  # callback(message, audio turn id or None) for every message written
+        self.offload = offload    # Offloader for audio encoding (None: on the loop)
+
+        self._queue = collections.deque()
+        self._ready = asyncio.Event()
+        self._task = None
+        self.closed = False
+        self.slow = False
+
+        self.seq = 0
+        self.sent = 0
+        self.deltas = 0
+        self.coalesced = 0         # deltas merged into another frame
+        self.text_coalesced = 0    # text_delta messages merged into a queued one
+        self.bytes_sent = 0
+        self.audio_bytes_sent = 0
+        self.max_depth = 0
+        self.slow_events = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_seen_ms = 0.0
+        self._lag_total_ms = 0.0
+
+        # Estimated browser playback of the last turn that had audio
+        self.playback_turn = None
+        self._playback_ms = 0.0    # audio of playback_turn written to the socket
+        self._play_end = 0.0       # monotonic time the browser runs out of audio
+        self.flushed_chunks = 0
+        self._flushed_turn = None  # turn of the last flush_audio(), and how many flushes so far
+        self._flushes = 0
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def close(self):
+        self.closed = True
+        self._queue.clear()
+        if self._task is not None:
+            self._task.cancel()
+
+    def send_json(self, data, on_sent=None):
+        """
+        Queue a JSON message; `data` may be a callable evaluated right before sending
+        or an awaitable resolving to the message, `on_sent` is called once it was
+        written to the socket.
+        """
+        congested = self._congested()  # JSON bursts report a slow consumer too
+        if congested and on_sent is None and self._merge_text_delta(data):
+            return
+        self._put(_Outbound(data=data, on_sent=on_sent))
+
+    @staticmethod
+    def _is_text_delta(item, turn_id):
+        return (not item.is_audio and item.on_sent is None and isinstance(item.data, dict)
+                and item.data.get("type") == "text_delta" and item.data.get("turn_id") == turn_id)
+
+    def _merge_text_delta(self, data):
+        """Congested: append a text_delta to the one queued last if it is of the same turn."""
+        if not isinstance(data, dict) or data.get("type") != "text_delta" or not self._queue:
+            return False
+        tail = self._queue[-1]
+        if not self._is_text_delta(tail, data.get("turn_id")):
+            return False
+        tail.data = {**tail.data, "text": tail.data["text"] + data["text"]}
+        self.text_coalesced += 1
+        return True
+
+    def _audio_tail(self, turn_id):
+        """Newest queued audio of turn_id, looking past the turn's text deltas queued after it."""
+        for item in reversed(self._queue):
+            if item.is_audio:
+                return item if item.turn_id == turn_id else None
+            if not self._is_text_delta(item, turn_id):
+                return None
+        return None
+
+    def send_audio(self, turn_id, audio_b64):
+        """Queue one base64 audio delta of `turn_id` (PCM16, or mu-law for g711_ulaw sessions)."""
+        ms = len(audio_b64) * 3 / 4 / self.codec.upstream_bytes_per_s * 1000
+        self.deltas += 1
+        if self._congested():
+            # Transcript deltas arrive between audio deltas: audio may overtake the turn's queued text
+            tail = self._audio_tail(turn_id)
+            if tail is not None:
+                tail.chunks.append(audio_b64)
+                tail.ms += ms
+                self.coalesced += 1
+                return
+        self._put(_Outbound(turn_id=turn_id, chunk=audio_b64, ms=ms))
+
+    def playback_position(self):
+        """(turn id, ms of it played, ms still queued in the browser) - estimated from send times."""
+        remaining = max(0.0, self._play_end - time.monotonic()) * 1000
+        return self.playback_turn, max(0.0, self._playback_ms - remaining), remaining
+
+    @property
+    def playing(self):
+        return self.playback_turn is not None and self._play_end > time.monotonic()
+
+    def flush_audio(self, turn_id):
+        """Drop queued audio of turn_id (the browser flushes what it has); returns ms dropped."""
+        kept, dropped = collections.deque(), []
+        for item in self._queue:
+            (dropped if item.is_audio and item.turn_id == turn_id else kept).append(item)
+        self._queue = kept
+        self._flushed_turn = turn_id
+        self._flushes += 1
+        self.flushed_chunks += sum(len(item.chunks) for item in dropped)
+        if turn_id == self.playback_turn:
+            self._play_end = 0.0
+        return sum(item.ms for item in dropped)
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def _congested(self):
+        if not self._queue:
+            if self.slow:
+                self.slow = False
+            return False
+        lag_ms = (time.monotonic() - self._queue[0].enqueued_at) * 1000
+        congested = len(self._queue) >= self.max_queue or lag_ms > self.max_lag_ms
+        if congested and not self.slow:
+            self.slow = True
+            self.slow_events += 1
+            if self.on_slow:
+                self.on_slow(self.policy)
+        elif not congested and self.slow and len(self._queue) < self.max_queue // 2:
+            self.slow = False
+        return self.slow
+
+    def _put(self, item):
+        if self.closed:
+            return
+        self._queue.append(item)
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._ready.set()
+
+    def _take(self):
+        """Pop the next message, merging queued audio of the same turn up to the latency budget."""
+        item = self._queue.popleft()
+        if not item.is_audio:
+            return item
+        while self._queue:
+            nxt = self._queue[0]
+            if not nxt.is_audio or nxt.turn_id != item.turn_id or item.ms + nxt.ms > self.coalesce_ms:
+                break
+            self._queue.popleft()
+            item.chunks.extend(nxt.chunks)
+            item.ms += nxt.ms
+            self.coalesced += len(nxt.chunks)
+        return item
+
+    async def _encode(self, item, seq):
+        if not item.is_audio:
+            data = item.data() if callable(item.data) else item.data
+            if inspect.isawaitable(data):
+                data = await data
+            return json.dumps({**data, "seq": seq})
+        if self.offload is None:
+            return self._encode_audio(item, seq)
+        # Decoded size; slow codecs go to the pool whatever the size
+        size = None if self.codec.slow_encode else sum(len(chunk) for chunk in item.chunks) * 3 // 4
+        return await self.offload.thread(self._encode_audio, item, seq, size=size, name='encode_audio')
+
+    def _encode_audio(self, item, seq):
+        if self.protocol == PROTOCOL_BINARY:
+            audio = b''.join(base64_to_pcm16(chunk) for chunk in item.chunks)
+            return pack_frame(FRAME_AUDIO_OUT, item.turn_id, seq, self.codec.to_wire(audio))
+        if len(item.chunks) == 1 and self.codec.passthrough:
+            audio = item.chunks[0]
+        else:
+            audio = pcm16_to_base64(self.codec.to_wire(b''.join(base64_to_pcm16(chunk) for chunk in item.chunks)))
+        return json.dumps({"type": "audio_chunk", "audio": audio, "turn_id": item.turn_id, "seq": seq})
+
+    async def _run(self):
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                item = self._take()
+                flushes = self._flushes
+                message = await self._encode(item, self.seq)
+                if item.is_audio and self._flushes != flushes and item.turn_id == self._flushed_turn:
+                    # Flushed while it was being encoded in the pool
+                    self.flushed_chunks += len(item.chunks)
+                    continue
+                self.seq += 1
+                if isinstance(message, bytes):
+                    await self.websocket.send_bytes(message)
+                    size = len(message)
+                else:
+                    await self.websocket.send_text(message)
+                    size = len(message.encode('utf-8'))
+
+                now = time.monotonic()
+                lag_ms = (now - item.enqueued_at) * 1000
+                self.sent += 1
+                self.bytes_sent += size
+                if item.is_audio:
+                    self.audio_bytes_sent += size
+                    if item.turn_id != self.playback_turn:
+                        self.playback_turn = item.turn_id
+                        self._playback_ms = 0.0
+                    self._playback_ms += item.ms
+                    self._play_end = max(now + PLAYER_LEAD_S, self._play_end) + item.ms / 1000
+                self.last_lag_ms = lag_ms
+                self.max_lag_seen_ms = max(self.max_lag_seen_ms, lag_ms)
+                self._lag_total_ms += lag_ms
+                if self.on_bytes:
+                    self.on_bytes(size)
+                if self.on_frame:
+                    self.on_frame(message, item.turn_id if item.is_audio else None)
+                if item.on_sent:
+                    item.on_sent()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Socket gone: the receive loop handles the disconnect
+            print(f"Outbound sender stopped: {e}")
+            self.closed = True
+            self._queue.clear()
+
+    def stats(self):
+        return {
+            "depth": len(self._queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "deltas": self.deltas,
+            "coalesced": self.coalesced,
+            "text_coalesced": self.text_coalesced,
+            "bytes_sent": self.bytes_sent,
+            "last_lag_ms": round(self.last_lag_ms, 1),
+            "avg_lag_ms": round(self._lag_total_ms / self.sent, 1) if self.sent else 0.0,
+            "max_lag_ms": round(self.max_lag_seen_ms, 1),
+            "slow": self.slow,
+            "slow_events": self.slow_events,
+            "policy": self.policy,
+            "codec": self.codec.name,
+            "flushed_chunks": self.flushed_chunks,
+        }
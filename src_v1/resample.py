@@ -0,0 +1,88 @@
+import collections
+from math import gcd
+
+import numpy as np
+from scipy import signal
+
+
+class StreamingResampler:
+    """
+    Polyphase resampler that keeps filter state between calls.
+
+    The anti-aliasing FIR is designed once (same Kaiser design as
+    scipy.signal.resample_poly) and lfilter carries its delay line from one
+    block to the next, so consecutive blocks resample exactly like one long
+    signal: no per-frame filter design and no edge artifacts at block borders.
+    """
+    def __init__(self, original_fs, target_fs):
+        g = gcd(int(original_fs), int(target_fs))
+        self.up = int(target_fs) // g
+        self.down = int(original_fs) // g
+        max_rate = max(self.up, self.down)
+        half_len = 10 * max_rate
+        self.taps = signal.firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0)) * self.up
+        self._zi = np.zeros(len(self.taps) - 1)
+        self._phase = 0  # index (in the upsampled stream) of the next output sample
+
+    def reset(self):
+        self._zi[:] = 0
+        self._phase = 0
+
+    def process(self, samples):
+        """Resample a block of float samples; returns float64 output for this block."""
+        samples = np.asarray(samples, dtype=np.float64).reshape(-1)
+        if self.up == 1 and self.down == 1:
+            return samples
+        upsampled = np.zeros(len(samples) * self.up)
+        upsampled[::self.up] = samples
+        filtered, self._zi = signal.lfilter(self.taps, 1.0, upsampled, zi=self._zi)
+        out = filtered[self._phase::self.down]
+        self._phase = (self._phase - len(upsampled)) % self.down
+        return out
+
+
+class VADFrameResampler:
+    """
+    Cuts a PCM16 stream into `frame_duration_ms` frames and pairs every frame
+    with its 16 kHz PCM16 copy for webrtcvad. Each incoming block is converted
+    and resampled in one vectorized call.
+    """
+    VAD_FS = 16000
+
+    def __init__(self, fs=24000, frame_duration_ms=30):
+        self.fs = fs
+        self.frame_bytes = int(fs * frame_duration_ms / 1000) * 2
+        self.vad_frame_size = int(self.VAD_FS * frame_duration_ms / 1000)
+        self.resampler = StreamingResampler(fs, self.VAD_FS)
+        self._pending = b''  # partial input frame
+        self._frames = collections.deque()  # input frames waiting for their 16 kHz samples
+        self._vad_samples = np.zeros(0, dtype=np.int16)
+
+    def reset(self):
+        self.resampler.reset()
+        self._pending = b''
+        self._frames.clear()
+        self._vad_samples = np.zeros(0, dtype=np.int16)
+
+    def process(self, pcm_bytes):
+        """Return [(frame_pcm16, frame_pcm16_16k), ...] for every complete frame."""
+        data = self._pending + bytes(pcm_bytes)
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = data[usable:]
+        if not usable:
+            return []
+
+        for i in range(0, usable, self.frame_bytes):
+            self._frames.append(data[i:i + self.frame_bytes])
+
+        block = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32) / 32767.0
+        resampled = self.resampler.process(block)
+        resampled = (np.clip(resampled, -1.0, 1.0) * 32767).astype(np.int16)
+        self._vad_samples = np.concatenate([self._vad_samples, resampled])
+
+        pairs = []
+        n = self.vad_frame_size
+        while self._frames and len(self._vad_samples) >= n:
+            pairs.append((self._frames.popleft(), self._vad_samples[:n].tobytes()))
+            self._vad_samples = self._vad_samples[n:]
+        return pairs
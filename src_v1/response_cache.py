@@ -0,0 +1,277 @@
+"""
+Cache of complete assistant answers (transcript + audio) for repeated prompts.
+
+Kiosk-style deployments hear the same few questions all day; a hit replays the
+stored answer without an upstream call. Keys are the normalized prompt text
+(see normalize_prompt) plus what changes the answer's bytes: the session's audio
+format and the requested modalities.
+
+Storage is one append-only file, read through mmap:
+
+    record = header | key (utf-8) | transcript (utf-8) | audio
+    header = magic b'RCv1', flags (1 = tombstone), key / transcript / audio
+             lengths, created (unix time), first_audio_s of the original answer
+
+The index (key -> offsets, LRU order) lives in memory and is rebuilt by scanning
+the file on open, so the cache survives restarts. Entries expire after `ttl_s`;
+beyond `max_bytes` of audio + transcript or `max_entries` the least recently
+used go first. Evicted and replaced entries leave a tombstone; once the file is
+`compact_ratio` times the live data it is rewritten with the live records only.
+
+put() writes to disk: call it from an executor. get() / read_audio() only touch
+memory and the page cache.
+"""
+
+import collections
+import mmap
+import os
+import struct
+import threading
+import time
+import unicodedata
+
+_HEADER = struct.Struct('<4sHHIIdd')
+_MAGIC = b'RCv1'
+_TOMBSTONE = 1
+_MIN_COMPACT_BYTES = 1 << 20  # smaller files are not worth rewriting
+_MAX_KEY_BYTES = 4096         # key_len is a uint16; a prompt this long is not a repeated question anyway
+
+
+def normalize_prompt(text):
+    """Case-folded text with punctuation dropped and whitespace collapsed (Thai marks are kept)."""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return ' '.join(''.join(' ' if unicodedata.category(c)[0] in 'PZC' else c for c in text).split())
+
+
+def cache_key(text, audio_format='pcm16', modalities=None):
+    """Key of an answer to `text`; None when nothing is left after normalizing, or for very long prompts."""
+    prompt = normalize_prompt(text)
+    if not prompt:
+        return None
+    key = f"{audio_format}|{','.join(sorted(modalities or ('audio', 'text')))}|{prompt}"
+    return key if len(key.encode('utf-8')) <= _MAX_KEY_BYTES else None
+
+
+class CacheEntry:
+    __slots__ = ('key', 'record_offset', 'audio_offset', 'audio_len', 'transcript', 'created', 'first_audio_s',
+                 'hits', 'record_len')
+
+    def __init__(self, key, record_offset, audio_offset, audio_len, transcript, created, first_audio_s, record_len):
+        self.key = key
+        self.record_offset = record_offset
+        self.audio_offset = audio_offset
+        self.audio_len = audio_len
+        self.transcript = transcript
+        self.created = created
+        self.first_audio_s = first_audio_s  # prompt -> first audio delta when it was generated
+        self.hits = 0
+        self.record_len = record_len
+
+    @property
+    def size(self):
+        return self.audio_len + len(self.transcript.encode('utf-8'))
+
+
+class PendingAnswer:
+    """An upstream answer being recorded for the cache; the key may only be known later (input transcription)."""
+    __slots__ = ('key', 'turn_id', 'chunks', 'transcript', 'started', 'first_audio_s', 'done')
+
+    def __init__(self, turn_id, key=None):
+        self.key = key
+        self.turn_id = turn_id
+        self.chunks = []
+        self.transcript = None
+        self.started = time.monotonic()
+        self.first_audio_s = None
+        self.done = False
+
+    def add_audio(self, data):
+        if self.first_audio_s is None:
+            self.first_audio_s = time.monotonic() - self.started
+        self.chunks.append(data)
+
+    @property
+    def storable(self):
+        return self.done and self.key is not None and bool(self.chunks) and self.transcript is not None
+
+
+class ResponseCache:
+    def __init__(self, path, max_bytes=64 << 20, max_entries=256, ttl_s=86400.0, compact_ratio=2.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._index = collections.OrderedDict()  # key -> CacheEntry, least recently used first
+        self._bytes = 0        # live audio + transcript bytes
+        self._file_size = 0
+        self._map = None
+        self._map_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compactions = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a+b')
+        self._load()
+
+    # --- index ---
+
+    def _load(self):
+        """Rebuild the index from the file; a torn record at the end (crash mid-write) is cut off."""
+        self._file.seek(0, os.SEEK_END)
+        size = self._file_size = self._file.tell()
+        self._ensure_map(size)
+        data = self._map
+        offset = 0
+        now = time.time()
+        while offset + _HEADER.size <= size:
+            magic, flags, key_len, transcript_len, audio_len, created, first_audio_s = \
+                _HEADER.unpack_from(data, offset)
+            record_len = _HEADER.size + key_len + transcript_len + audio_len
+            if magic != _MAGIC or offset + record_len > size:
+                break
+            start = offset + _HEADER.size
+            key = bytes(data[start:start + key_len]).decode('utf-8')
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if not flags & _TOMBSTONE and now - created < self.ttl_s:
+                transcript = bytes(data[start + key_len:start + key_len + transcript_len]).decode('utf-8')
+                entry = CacheEntry(key, offset, start + key_len + transcript_len, audio_len, transcript,
+                                   created, first_audio_s, record_len)
+                self._index[key] = entry
+                self._bytes += entry.size
+            offset += record_len
+        if offset < size:
+            print(f"⚠️ response cache: dropping {size - offset} bytes of a torn record in {self.path}")
+            self._close_map()
+            self._file.truncate(offset)
+        self._file_size = offset
+        self._evict()
+
+    def get(self, key):
+        """Entry for key (marked recently used), or None; expired entries are dropped."""
+        with self._lock:
+            entry = self._index.get(key) if key is not None else None
+            if entry is not None and time.time() - entry.created >= self.ttl_s:
+                self._remove(entry)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            return entry
+
+    def _remove(self, entry, tombstone=True):
+        del self._index[entry.key]
+        self._bytes -= entry.size
+        if tombstone:
+            self._append(_TOMBSTONE, entry.key, '', b'', 0.0)
+
+    def _evict(self):
+        now = time.time()
+        for entry in [e for e in self._index.values() if now - e.created >= self.ttl_s]:
+            self._remove(entry)
+            self.evictions += 1
+        while self._index and (self._bytes > self.max_bytes or len(self._index) > self.max_entries):
+            self._remove(next(iter(self._index.values())))
+            self.evictions += 1
+
+    # --- file ---
+
+    def _append(self, flags, key, transcript, audio, first_audio_s):
+        key_bytes = key.encode('utf-8')
+        transcript_bytes = transcript.encode('utf-8')
+        offset = self._file_size
+        header = _HEADER.pack(_MAGIC, flags, len(key_bytes), len(transcript_bytes), len(audio), time.time(),
+                              first_audio_s)
+        self._file.write(header + key_bytes + transcript_bytes)
+        self._file.write(audio)
+        self._file.flush()
+        record_len = _HEADER.size + len(key_bytes) + len(transcript_bytes) + len(audio)
+        self._file_size += record_len
+        return offset, offset + _HEADER.size + len(key_bytes) + len(transcript_bytes), record_len
+
+    def put(self, key, transcript, audio, first_audio_s=0.0):
+        """Store an answer (replacing an older one for key); blocking file I/O. Returns the entry."""
+        with self._lock:
+            old = self._index.get(key)
+            if old is not None:
+                self._remove(old, tombstone=False)  # the new record supersedes it on reload
+            record_offset, audio_offset, record_len = self._append(0, key, transcript, audio, first_audio_s)
+            entry = CacheEntry(key, record_offset, audio_offset, len(audio), transcript, time.time(),
+                               first_audio_s, record_len)
+            self._index[key] = entry
+            self._bytes += entry.size
+            self._evict()
+            if self._file_size > _MIN_COMPACT_BYTES and self._file_size > self.compact_ratio * self._live_records():
+                self._compact()
+            return entry
+
+    def _live_records(self):
+        return sum(entry.record_len for entry in self._index.values())
+
+    def _compact(self):
+        """Rewrite the file with the live records only (LRU order kept)."""
+        tmp_path = self.path + '.compact'
+        self._ensure_map(self._file_size)
+        with open(tmp_path, 'wb') as out:
+            offset = 0
+            for entry in self._index.values():
+                out.write(self._map[entry.record_offset:entry.record_offset + entry.record_len])
+                entry.audio_offset += offset - entry.record_offset
+                entry.record_offset = offset
+                offset += entry.record_len
+        self._close_map()
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a+b')
+        self._file_size = offset
+        self.compactions += 1
+
+    def _ensure_map(self, end):
+        if end <= self._map_size or self._file_size == 0:
+            return
+        self._close_map()
+        self._map = mmap.mmap(self._file.fileno(), self._file_size, access=mmap.ACCESS_READ)
+        self._map_size = self._file_size
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = None
+        self._map_size = 0
+
+    def read_audio(self, entry, start=0, end=None):
+        """Bytes [start, end) of the entry's audio, from the mapped file."""
+        end = entry.audio_len if end is None else min(end, entry.audio_len)
+        if start >= end:
+            return b''
+        with self._lock:
+            if entry.key not in self._index or self._index[entry.key] is not entry:
+                raise KeyError(entry.key)  # evicted while it was being played
+            self._ensure_map(entry.audio_offset + end)
+            return self._map[entry.audio_offset + start:entry.audio_offset + end]
+
+    def close(self):
+        with self._lock:
+            self._close_map()
+            self._file.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "file_bytes": self._file_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "compactions": self.compactions,
+        }
@@ -0,0 +1,233 @@
+import time
+import asyncio
+import collections
+
+
+class RealtimeSessionPool:
+    """
+    Pool of pre-connected, pre-configured realtime clients.
+
+    Browser sessions lease a warm client instead of paying the TLS + WebSocket
+    handshake on connect. A client whose conversation was used is never handed
+    to another browser: on release it is closed and the pool refills in the
+    background. A maintenance task keeps `warm_size` idle clients, evicts idle
+    clients beyond that after `idle_timeout`, retires clients older than
+    `max_age` and pings idle clients every `health_interval` seconds.
+    """
+    def __init__(self, factory, warm_size=2, max_size=100, idle_timeout=300.0,
+                 max_age=1500.0, health_interval=10.0, lease_timeout=5.0):
+        self.factory = factory  # async () -> connected client
+        self.warm_size = warm_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self.health_interval = health_interval
+        self.lease_timeout = lease_timeout
+
+        self._idle = collections.deque()  # (client, idle_since)
+        self._leased = set()
+        self._created_at = {}  # client -> monotonic creation time
+        self._connecting = 0
+        self._waiters = collections.deque()  # futures waiting for a free slot
+        self._wakeup = None
+        self._task = None
+
+        self.counters = collections.Counter()
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def size(self):
+        return len(self._idle) + len(self._leased) + self._connecting
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._maintain())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while self._idle:
+            client, _ = self._idle.popleft()
+            self._close(client)
+
+    def _healthy(self, client, now):
+        return client._is_connected and now - self._created_at.get(client, now) < self.max_age
+
+    def _close(self, client):
+        self._created_at.pop(client, None)
+        try:
+            client.close()
+        except Exception as e:
+            print(f"Pool: error closing session: {e}")
+
+    def _notify(self):
+        """Wake one lease() waiting for capacity and the maintenance task."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _create(self):
+        self._connecting += 1
+        try:
+            client = await self.factory()
+        finally:
+            self._connecting -= 1
+        self._created_at[client] = time.monotonic()
+        self.counters['created'] += 1
+        return client
+
+    async def lease(self):
+        """
+        Return a connected client: an idle warm one if available (hit), a new
+        connection if below max_size (miss), otherwise wait up to lease_timeout.
+        Raises ConnectionError when no session becomes available.
+        """
+        start = time.monotonic()
+        waited = False
+        while True:
+            now = time.monotonic()
+            while self._idle:
+                client, _ = self._idle.popleft()
+                if self._healthy(client, now):
+                    self.counters['hits'] += 1
+                    return self._lease_done(client, start, waited)
+                self.counters['evicted_unhealthy'] += 1
+                self._close(client)
+
+            if self.size < self.max_size:
+                self.counters['misses'] += 1
+                try:
+                    client = await self._create()
+                except Exception:
+                    self._notify()
+                    raise
+                return self._lease_done(client, start, waited)
+
+            remaining = self.lease_timeout - (now - start)
+            if remaining <= 0:
+                self.counters['timeouts'] += 1
+                raise ConnectionError(f"Realtime session pool exhausted ({self.max_size} sessions)")
+            waited = True
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def _lease_done(self, client, start, waited):
+        wait = time.monotonic() - start
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        if waited:
+            self.counters['waits'] += 1
+        self._leased.add(client)
+        if self._wakeup is not None:
+            self._wakeup.set()  # top the warm set back up
+        return client
+
+    def release(self, client):
+        """
+        Give a leased client back. Unused, healthy clients go back to the idle
+        set; anything else is closed and replaced by the maintenance task.
+        """
+        self._leased.discard(client)
+        client.text_callback = None
+        client.audio_callback = None
+        client.audio_done_callback = None
+        client.sent_callback = None
+        client.text_delta_callback = None
+        client.input_event_callback = None
+        client.input_transcript_callback = None
+        client.journal_callback = None
+        # Nothing of the departed session may stay reachable from an idle client
+        client.set_context_window(None)
+        if not client.conversation_started and self._healthy(client, time.monotonic()):
+            self._idle.append((client, time.monotonic()))
+            self.counters['returned'] += 1
+        else:
+            self._close(client)
+            self.counters['recycled'] += 1
+        self._notify()
+
+    async def _check_idle(self):
+        """Drop idle clients that are dead, too old, idle past idle_timeout or fail a ping."""
+        now = time.monotonic()
+        keep = collections.deque()
+        for client, idle_since in self._idle:
+            if not self._healthy(client, now):
+                self.counters['evicted_unhealthy'] += 1
+                self._close(client)
+            elif len(keep) >= self.warm_size and now - idle_since > self.idle_timeout:
+                self.counters['evicted_idle'] += 1
+                self._close(client)
+            else:
+                keep.append((client, idle_since))
+        self._idle = keep
+
+        pingable = [(client, idle_since) for client, idle_since in self._idle if hasattr(client, 'ping')]
+        if pingable:
+            results = await asyncio.gather(*(client.ping() for client, _ in pingable))
+            dead = {client for (client, _), ok in zip(pingable, results) if not ok}
+            if dead:
+                self._idle = collections.deque(entry for entry in self._idle if entry[0] not in dead)
+                for client in dead:
+                    self.counters['evicted_unhealthy'] += 1
+                    self._close(client)
+
+    async def _maintain(self):
+        last_check = 0.0
+        while True:
+            self._wakeup.clear()
+            try:
+                if time.monotonic() - last_check >= self.health_interval:
+                    last_check = time.monotonic()
+                    await self._check_idle()
+
+                while len(self._idle) + self._connecting < self.warm_size and self.size < self.max_size:
+                    try:
+                        client = await self._create()
+                    except Exception as e:
+                        self.counters['connect_errors'] += 1
+                        print(f"Pool: failed to pre-warm session: {e}")
+                        break
+                    self._idle.append((client, time.monotonic()))
+                    self._notify()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Pool maintenance error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.health_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        leases = self.counters['hits'] + self.counters['misses']
+        return {
+            "warm_size": self.warm_size,
+            "max_size": self.max_size,
+            "idle": len(self._idle),
+            "leased": len(self._leased),
+            "connecting": self._connecting,
+            "hits": self.counters['hits'],
+            "misses": self.counters['misses'],
+            "hit_rate": round(self.counters['hits'] / leases, 3) if leases else None,
+            "waits": self.counters['waits'],
+            "timeouts": self.counters['timeouts'],
+            "avg_wait_ms": round(self._wait_total / leases * 1000, 2) if leases else 0.0,
+            "max_wait_ms": round(self._wait_max * 1000, 2),
+            "created": self.counters['created'],
+            "returned": self.counters['returned'],
+            "recycled": self.counters['recycled'],
+            "evicted_idle": self.counters['evicted_idle'],
+            "evicted_unhealthy": self.counters['evicted_unhealthy'],
+            "connect_errors": self.counters['connect_errors'],
+        }
@@ -0,0 +1,223 @@
+"""
+Session ownership across worker processes and hosts.
+
+Every worker (one uvicorn process) has an id and a public base URL and
+heartbeats its stats into a registry; every browser session is claimed by the
+worker that holds its WebSocket. Any worker can then answer who owns a
+client_id, where a new client_id should go and how many sessions run in total.
+
+    LocalSessionRegistry   - in-process dicts (single worker, the default)
+    SqliteSessionRegistry  - one SQLite file shared by the workers of a host
+
+Sticky routing uses rendezvous hashing over the configured nodes, so adding or
+removing a node only moves the client ids that hashed to it.
+"""
+
+import abc
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def rendezvous_node(client_id, nodes):
+    """Highest-random-weight choice of a node for client_id (None without nodes)."""
+    best, best_score = None, -1
+    for node in nodes:
+        digest = hashlib.blake2b(f"{node}|{client_id}".encode('utf-8'), digest_size=8).digest()
+        score = int.from_bytes(digest, 'big')
+        if score > best_score:
+            best, best_score = node, score
+    return best
+
+
+class SessionRegistry(abc.ABC):
+    """
+    Interface shared by the implementations. Workers whose last heartbeat is older
+    than `ttl` seconds are treated as gone, together with their sessions.
+    """
+    def __init__(self, ttl=15.0):
+        self.ttl = ttl
+
+    @abc.abstractmethod
+    def heartbeat(self, worker_id, url, stats):
+        """Record that worker_id (reachable at url) is alive; stats is a JSON-able dict."""
+
+    @abc.abstractmethod
+    def remove_worker(self, worker_id):
+        """Forget worker_id and every session it owns."""
+
+    @abc.abstractmethod
+    def claim(self, client_id, worker_id):
+        """Take ownership of client_id; returns the current owner (another live worker keeps it)."""
+
+    @abc.abstractmethod
+    def release(self, client_id, worker_id):
+        """Give up client_id if worker_id owns it."""
+
+    @abc.abstractmethod
+    def owner(self, client_id):
+        """(worker_id, url) of the live owner of client_id, or None."""
+
+    @abc.abstractmethod
+    def workers(self):
+        """[{worker_id, url, sessions, age_s, stats}] of live workers."""
+
+    def close(self):
+        pass
+
+
+class LocalSessionRegistry(SessionRegistry):
+    def __init__(self, ttl=15.0):
+        super().__init__(ttl)
+        self._workers = {}   # worker_id -> (url, stats, last heartbeat)
+        self._sessions = {}  # client_id -> worker_id
+
+    def _alive(self, worker_id, now):
+        worker = self._workers.get(worker_id)
+        return worker is not None and now - worker[2] < self.ttl
+
+    def heartbeat(self, worker_id, url, stats):
+        self._workers[worker_id] = (url, stats, time.time())
+
+    def remove_worker(self, worker_id):
+        self._workers.pop(worker_id, None)
+        for client_id in [c for c, w in self._sessions.items() if w == worker_id]:
+            del self._sessions[client_id]
+
+    def claim(self, client_id, worker_id):
+        current = self._sessions.get(client_id)
+        if current is not None and current != worker_id and self._alive(current, time.time()):
+            return current
+        self._sessions[client_id] = worker_id
+        return worker_id
+
+    def release(self, client_id, worker_id):
+        if self._sessions.get(client_id) == worker_id:
+            del self._sessions[client_id]
+
+    def owner(self, client_id):
+        worker_id = self._sessions.get(client_id)
+        if worker_id is None or not self._alive(worker_id, time.time()):
+            return None
+        return worker_id, self._workers[worker_id][0]
+
+    def workers(self):
+        now = time.time()
+        counts = {}
+        for worker_id in self._sessions.values():
+            counts[worker_id] = counts.get(worker_id, 0) + 1
+        return [
+            {"worker_id": worker_id, "url": url, "sessions": counts.get(worker_id, 0),
+             "age_s": round(now - seen, 1), "stats": stats}
+            for worker_id, (url, stats, seen) in sorted(self._workers.items())
+            if now - seen < self.ttl
+        ]
+
+
+class SqliteSessionRegistry(SessionRegistry):
+    """
+    Registry in a SQLite file (WAL mode) shared by the workers of one host.
+    Calls are short blocking transactions; async callers run them in an executor.
+    """
+    def __init__(self, path, ttl=15.0):
+        super().__init__(ttl)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS workers ('
+                         'worker_id TEXT PRIMARY KEY, url TEXT, stats TEXT, seen REAL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS sessions ('
+                         'client_id TEXT PRIMARY KEY, worker_id TEXT, since REAL)')
+
+    def _write(self, statements):
+        """Run statements in one write transaction; a callable statement gets the cursor."""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                result = None
+                for statement in statements:
+                    if callable(statement):
+                        result = statement(self._db)
+                    else:
+                        self._db.execute(*statement)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+        return result
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def heartbeat(self, worker_id, url, stats):
+        now = time.time()
+        self._write([
+            ('INSERT OR REPLACE INTO workers VALUES (?, ?, ?, ?)', (worker_id, url, json.dumps(stats), now)),
+            # Sessions of workers that stopped heartbeating (crashed) are dropped
+            ('DELETE FROM sessions WHERE worker_id IN (SELECT worker_id FROM workers WHERE seen < ?)',
+             (now - self.ttl,)),
+            ('DELETE FROM workers WHERE seen < ?', (now - self.ttl,)),
+        ])
+
+    def remove_worker(self, worker_id):
+        self._write([
+            ('DELETE FROM sessions WHERE worker_id = ?', (worker_id,)),
+            ('DELETE FROM workers WHERE worker_id = ?', (worker_id,)),
+        ])
+
+    def claim(self, client_id, worker_id):
+        now = time.time()
+
+        def claim(db):
+            # Check and insert in the same transaction so two workers cannot both win
+            row = db.execute(
+                'SELECT s.worker_id FROM sessions s JOIN workers w USING (worker_id) '
+                'WHERE s.client_id = ? AND s.worker_id != ? AND w.seen >= ?',
+                (client_id, worker_id, now - self.ttl)).fetchone()
+            if row:
+                return row[0]
+            db.execute('INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)', (client_id, worker_id, now))
+            return worker_id
+        return self._write([claim])
+
+    def release(self, client_id, worker_id):
+        self._write([('DELETE FROM sessions WHERE client_id = ? AND worker_id = ?', (client_id, worker_id))])
+
+    def owner(self, client_id):
+        rows = self._read(
+            'SELECT w.worker_id, w.url FROM sessions s JOIN workers w USING (worker_id) '
+            'WHERE s.client_id = ? AND w.seen >= ?', (client_id, time.time() - self.ttl))
+        return tuple(rows[0]) if rows else None
+
+    def workers(self):
+        now = time.time()
+        rows = self._read(
+            'SELECT w.worker_id, w.url, w.stats, w.seen, COUNT(s.client_id) FROM workers w '
+            'LEFT JOIN sessions s USING (worker_id) WHERE w.seen >= ? '
+            'GROUP BY w.worker_id ORDER BY w.worker_id', (now - self.ttl,))
+        return [
+            {"worker_id": worker_id, "url": url, "sessions": sessions,
+             "age_s": round(now - seen, 1), "stats": json.loads(stats)}
+            for worker_id, url, stats, seen, sessions in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def create_session_registry(spec, ttl=15.0):
+    """'' or 'local' -> in-process; 'sqlite:///path/to/file.db' or a file path -> shared SQLite file."""
+    if not spec or spec == 'local':
+        return LocalSessionRegistry(ttl)
+    path = spec[len('sqlite:///'):] if spec.startswith('sqlite:///') else spec
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return SqliteSessionRegistry(path, ttl)
@@ -0,0 +1,132 @@
+"""
+In-memory static assets for the web UI.
+
+Each asset is read once and kept with its precompressed variants (gzip, and
+brotli when the `brotli` package is installed), so serving the page is a dict
+lookup: no disk read and no compression per request. Responses pick the
+variant from Accept-Encoding, carry a strong ETag per variant plus
+Cache-Control and Vary: Accept-Encoding, and revalidations that match
+(If-None-Match) get an empty 304.
+
+reload=True (development) re-reads an asset when its file's mtime changes.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Served in this order of preference when the client accepts several
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _compress(encoding, body):
+    if encoding == "br":
+        return brotli.compress(body, quality=11)
+    return gzip.compress(body, compresslevel=9, mtime=0)  # mtime=0: same bytes on every worker
+
+
+def parse_accept_encoding(header):
+    """Accept-Encoding -> {coding: q}; codings with q=0 are refused."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class StaticAsset:
+    """One file: identity bytes plus compressed variants, each with its own strong ETag."""
+    def __init__(self, path, body, mtime, min_compress_bytes=256):
+        self.path = path
+        self.mtime = mtime
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type.endswith(("javascript", "json")):
+            self.content_type += "; charset=utf-8"
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.variants = {"identity": (body, f'"{digest}"')}
+        if len(body) >= min_compress_bytes:
+            for encoding in ENCODINGS:
+                compressed = _compress(encoding, body)
+                if len(compressed) < len(body):
+                    self.variants[encoding] = (compressed, f'"{digest}-{encoding}"')
+
+    def select(self, accept_encoding):
+        """(encoding, body, etag) of the smallest variant the client accepts"""
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        for encoding in ENCODINGS:
+            if encoding in self.variants and accepted.get(encoding, wildcard) > 0:
+                return (encoding,) + self.variants[encoding]
+        return ("identity",) + self.variants["identity"]
+
+
+class StaticAssetCache:
+    def __init__(self, directory, reload=False, max_age=0, min_compress_bytes=256):
+        self.directory = directory
+        self.reload = reload
+        # 0: browsers revalidate on every load (index.html is not content-addressed)
+        self.cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+        self.min_compress_bytes = min_compress_bytes
+        self._assets = {}  # name -> StaticAsset
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+
+    def load(self, name):
+        path = os.path.join(self.directory, name)
+        with open(path, "rb") as f:
+            body = f.read()
+        asset = StaticAsset(path, body, os.stat(path).st_mtime_ns, self.min_compress_bytes)
+        self._assets[name] = asset
+        return asset
+
+    def get(self, name):
+        asset = self._assets.get(name)
+        if asset is None:
+            return self.load(name)
+        if self.reload and os.stat(asset.path).st_mtime_ns != asset.mtime:
+            print(f"🔄 static: reload {name}")
+            return self.load(name)
+        return asset
+
+    def respond(self, name, accept_encoding=None, if_none_match=None):
+        """(status, body, headers) for a GET of `name`"""
+        encoding, body, etag = self.get(name).select(accept_encoding)
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        self.requests += 1
+        if if_none_match and (if_none_match.strip() == "*" or etag in
+                              (tag.strip() for tag in if_none_match.split(","))):
+            self.not_modified += 1
+            return 304, b"", headers
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        headers["Content-Type"] = self._assets[name].content_type
+        self.bytes_sent += len(body)
+        return 200, body, headers
+
+    def stats(self):
+        return {
+            "assets": {name: {encoding: len(body) for encoding, (body, _) in asset.variants.items()}
+                       for name, asset in self._assets.items()},
+            "reload": self.reload,
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "bytes_sent": self.bytes_sent,
+        }
@@ -0,0 +1,143 @@
+from src_v1.capture import CaptureBuffer
+
+
+class StreamingVADSession:
+    """
+    Server-side VAD for PCM16 chunks pushed by the browser (no sounddevice).
+
+    Same endpointing rules as AudioRecorder.record_with_vad_auto_send: only speech
+    frames are kept, the utterance ends after `silence_threshold` seconds without
+    speech once something was captured, and listening stops after `max_duration`.
+    Time is measured in received audio, so results do not depend on network jitter.
+    `pre_roll_ms` of audio before each speech onset is kept as well (see CaptureBuffer).
+
+    With `tentative_silence` (seconds, below silence_threshold) a shorter pause first
+    reports TENTATIVE_END, and SPEECH_RESUMED if the user goes on talking before the
+    final threshold (two-stage endpointing, see src_v1/endpointing.py).
+    """
+    SPEECH_START = 'speech_start'
+    TENTATIVE_END = 'tentative_end'
+    SPEECH_RESUMED = 'speech_resumed'
+    END_OF_UTTERANCE = 'end_of_utterance'
+    TIMEOUT = 'timeout'
+
+    def __init__(self, fs=24000, max_duration=30, silence_threshold=1.0, frame_duration_ms=30,
+                 pre_roll_ms=0, vad_engine='webrtc', tentative_silence=None, **vad_options):
+        # The resampler (scipy.signal) and VAD engine load with the first local-VAD session:
+        # server_vad sessions and workers that never record do not import them
+        from src_v1.resample import VADFrameResampler
+        from src_v1.vad_engine import create_vad_engine
+        self.fs = fs
+        self.max_duration = max_duration
+        self.silence_threshold = silence_threshold
+        self.tentative_silence = tentative_silence
+        self.vad = create_vad_engine(vad_engine, frame_duration_ms=frame_duration_ms, **vad_options)
+        self.frame_duration_ms = frame_duration_ms
+        self.frame_size = int(fs * frame_duration_ms / 1000)
+        self.frame_bytes = self.frame_size * 2
+        # Splits chunks into frames and resamples to 16kHz for the VAD engine with state kept across chunks
+        self.frames = VADFrameResampler(fs, frame_duration_ms)
+
+        self.capture = CaptureBuffer(max_duration, fs, pre_roll_ms)
+        self.is_recording = True
+        self._sent = 0             # bytes of captured audio already handed out by take_unsent()
+        self._elapsed = 0.0        # seconds of audio processed
+        self._last_speech_time = 0.0
+        self._tentative = False    # TENTATIVE_END reported for the current pause
+
+    def feed(self, pcm_bytes):
+        """
+        Process a chunk of PCM16 audio. Returns the list of events it triggered (SPEECH_START,
+        TENTATIVE_END, SPEECH_RESUMED, END_OF_UTTERANCE, TIMEOUT); empty once recording stopped.
+        """
+        if not self.is_recording:
+            return []
+        frames = list(self.frames.process(pcm_bytes))
+        decisions = []
+        for _, frame_16k in frames:
+            try:
+                decisions.append(self.vad.is_speech(frame_16k, self.frames.VAD_FS))
+            except Exception:
+                decisions.append(None)
+        return self.feed_frames(frames, decisions)
+
+    async def feed_batched(self, pcm_bytes, batcher):
+        """feed(), with the VAD decisions scored together with other sessions' (EnergyVADBatcher)."""
+        if not self.is_recording:
+            return []
+        frames = list(self.frames.process(pcm_bytes))
+        decisions = await batcher.is_speech(self.vad, [frame_16k for _, frame_16k in frames])
+        return self.feed_frames(frames, decisions)
+
+    def feed_frames(self, frames, decisions):
+        """Endpointing over (24 kHz frame, 16 kHz frame) pairs and their VAD decisions (None = skip)."""
+        events = []
+        if not self.is_recording:
+            return events
+
+        for (frame, _), is_speech in zip(frames, decisions):
+            self._elapsed += self.frame_duration_ms / 1000
+            if is_speech is None:
+                continue
+
+            if is_speech and not self.capture:
+                events.append(self.SPEECH_START)
+            self.capture.push(frame, is_speech)  # Store original 24kHz audio
+            if is_speech:
+                self._last_speech_time = self._elapsed
+                if self._tentative:
+                    self._tentative = False
+                    events.append(self.SPEECH_RESUMED)
+            elif (self.tentative_silence and not self._tentative and self.capture
+                  and self._elapsed - self._last_speech_time > self.tentative_silence):
+                self._tentative = True
+                events.append(self.TENTATIVE_END)
+            elif self._elapsed - self._last_speech_time > self.silence_threshold and self.capture:
+                self.is_recording = False
+                events.append(self.END_OF_UTTERANCE)
+                return events
+
+            if self._elapsed >= self.max_duration:
+                self.is_recording = False
+                events.append(self.TIMEOUT)
+                return events
+        return events
+
+    @property
+    def audio_buffer(self):
+        """Captured PCM16 speech (memoryview, no copy)."""
+        return self.capture.pcm()
+
+    def take_unsent(self):
+        """Return speech captured since the previous call (for streaming it upstream)."""
+        chunk = self.capture.pcm(self._sent)
+        self._sent = self.capture.nbytes
+        return chunk
+
+    def rewind(self):
+        """Make take_unsent() return the whole utterance again (resubmitting it after a rollback)."""
+        self._sent = 0
+
+    def stop(self):
+        self.is_recording = False
+        self.vad.close()
+
+    @property
+    def duration(self):
+        """Seconds of speech captured so far."""
+        return self.capture.duration
+
+
+class ServerVADSession:
+    """
+    Browser microphone in input_mode server_vad: no local VAD, resampling or capture.
+    Every chunk goes straight to input_audio_buffer.append and the realtime API's
+    server_vad turn detection decides where turns start and end.
+    """
+    def __init__(self, fs=24000):
+        self.fs = fs
+        self.is_recording = True
+        self.forwarded_bytes = 0  # microphone audio appended upstream (session input format)
+
+    def stop(self):
+        self.is_recording = False
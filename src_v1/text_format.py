@@ -1,19 +1,98 @@
 import html
 import re
 
-def format_text(text: str) -> str:
-    # Escape HTML
-    safe = html.escape(text)
-    # ตัวหนา **...**
-    safe = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', safe)
-    # ตัวเอียง *...*
-    safe = re.sub(r'\*(.+?)\*', r'<i>\1</i>', safe)
+# ตัวหนา **...**, ตัวเอียง *...*, list 1. 2. 3. - compiled once, shared by both formatters
+_BOLD = re.compile(r'\*\*(.+?)\*\*')
+_ITALIC = re.compile(r'\*(.+?)\*')
+_NUMBERED = re.compile(r'(\d+)\. ')
+_DIGIT = re.compile(r'\d')
+
+
+def _format(safe: str) -> str:
+    """Markup passes on escaped text (no strip)"""
+    safe = _BOLD.sub(r'<b>\1</b>', safe)
+    safe = _ITALIC.sub(r'<i>\1</i>', safe)
     # Bullet/numbered list: 1. ... 2. ... 3. ...
-    safe = re.sub(r'(\d+)\. ', r'<br><b>\1.</b> ', safe)
+    safe = _NUMBERED.sub(r'<br><b>\1.</b> ', safe)
     # ขึ้นบรรทัดใหม่หลัง "เช่น:" หรือ "ค่ะ", "ครับ"
     # safe = re.sub(r'(เช่น:|ค่ะ|ครับ)', r'\1<br>', safe)
     # เปลี่ยน \n เป็น <br>
-    safe = safe.replace('\n', '<br>')
-    # ตัดช่องว่างหัวท้าย
-    safe = safe.strip()
-    return safe
+    return safe.replace('\n', '<br>')
+
+
+def format_text(text: str) -> str:
+    # Escape HTML, markup, ตัดช่องว่างหัวท้าย
+    return _format(html.escape(text)).strip()
+
+
+def _settled(safe: str) -> bool:
+    """
+    True if no pass can match across the end of `safe` (escaped text starting where
+    matching starts fresh), so later text cannot change how it is formatted.
+    """
+    bold = _BOLD.sub(r'<b>\1</b>', safe)
+    # An unmatched ** or a trailing * is still waiting for its closing marker
+    if '**' in bold or bold.endswith('*'):
+        return False
+    if '*' in _ITALIC.sub(r'<i>\1</i>', bold):
+        return False
+    # "12" or "12." may still become a list number
+    return not (safe.endswith('.') or _DIGIT.match(safe[-1:]))
+
+
+class IncrementalFormatter:
+    """
+    format_text for a streamed answer: feed() takes each transcript delta and returns
+    the HTML that is final so far; finish() returns the rest. Text after an unclosed
+    ** or *, or a number that may start a list item, is kept until it is settled.
+    Concatenated, the output equals format_text() of the whole text.
+    """
+    def __init__(self):
+        self.text = ''       # raw text fed so far
+        self.html = ''       # everything returned so far
+        self._pending = ''   # escaped text not formatted yet (starts where matching starts fresh)
+        self._space = ''     # trailing whitespace held back (dropped if the text ends there)
+        self._started = False
+
+    def feed(self, delta: str) -> str:
+        if not delta:
+            return ''
+        self.text += delta
+        self._pending += html.escape(delta)
+        cut = self._cut()
+        if not cut:
+            return ''
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._emit(_format(ready))
+
+    def finish(self) -> str:
+        """End of the answer: format what is left; returns its HTML"""
+        rest, self._pending = self._pending, ''
+        out = self._emit(_format(rest))
+        self._space = ''
+        return out
+
+    def _cut(self) -> int:
+        """Length of the longest pending prefix whose formatting is final"""
+        pending = self._pending
+        # Markers never match across a newline
+        line_start = pending.rfind('\n') + 1
+        line = pending[line_start:]
+        # Candidates: the whole line, else just before one of its '*' (last first)
+        candidates = [len(line)] + [i for i in range(len(line) - 1, -1, -1) if line[i] == '*']
+        for end in candidates:
+            if end and _settled(line[:end]):
+                return line_start + end
+        return line_start
+
+    def _emit(self, out: str) -> str:
+        if not self._started:
+            out = out.lstrip()
+            if not out:
+                return ''
+            self._started = True
+        out = self._space + out
+        body = out.rstrip()
+        self._space = out[len(body):]
+        self.html += body
+        return body
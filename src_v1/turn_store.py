@@ -0,0 +1,53 @@
+import collections
+
+from src_v1.codec import pcm16_to_wav
+
+
+class TurnAudioStore:
+    """
+    Decoded PCM16 of recent assistant turns, kept only for sessions that opted in
+    to replay. Chunks are stored as a list (no string concatenation); the WAV is
+    built on request from GET /turns/{client_id}/{turn_id}.wav.
+    """
+    def __init__(self, max_turns_per_client=3, sample_rate=24000):
+        self.max_turns_per_client = max_turns_per_client
+        self.sample_rate = sample_rate
+        self._turns = {}  # client_id -> OrderedDict(turn_id -> [bytes, ...])
+        self._rates = {}  # client_id -> sample rate when it differs from sample_rate
+
+    def set_sample_rate(self, client_id: str, sample_rate: int):
+        self._rates[client_id] = sample_rate
+
+    def append(self, client_id: str, turn_id: int, pcm_chunk: bytes):
+        turns = self._turns.setdefault(client_id, collections.OrderedDict())
+        if turn_id not in turns:
+            turns[turn_id] = []
+            while len(turns) > self.max_turns_per_client:
+                turns.popitem(last=False)
+        turns[turn_id].append(pcm_chunk)
+
+    def has_turn(self, client_id: str, turn_id: int) -> bool:
+        return turn_id in self._turns.get(client_id, {})
+
+    def snapshot(self, client_id: str, turn_id: int):
+        """(chunks so far, sample rate) of one turn, or None - for building the WAV off the loop."""
+        chunks = self._turns.get(client_id, {}).get(turn_id)
+        if chunks is None:
+            return None
+        return list(chunks), self._rates.get(client_id, self.sample_rate)
+
+    def wav_bytes(self, client_id: str, turn_id: int):
+        """WAV for one turn, or None if it was never stored or already evicted."""
+        turn = self.snapshot(client_id, turn_id)
+        return build_wav(*turn) if turn is not None else None
+
+    def retained_bytes(self, client_id: str) -> int:
+        return sum(len(chunk) for chunks in self._turns.get(client_id, {}).values() for chunk in chunks)
+
+    def drop_client(self, client_id: str):
+        self._turns.pop(client_id, None)
+        self._rates.pop(client_id, None)
+
+
+def build_wav(chunks, sample_rate):
+    return pcm16_to_wav(b''.join(chunks), sample_rate)
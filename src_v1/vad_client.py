@@ -1,17 +1,21 @@
 import asyncio
-import webrtcvad
 import sounddevice as sd
 import numpy as np
-import base64
 import time
 from src_v1.backend import RealtimeOpenAIClient
+from src_v1.capture import CaptureBuffer
+from src_v1.codec import pcm16_to_base64
+from src_v1.resample import VADFrameResampler
+from src_v1.vad_engine import create_vad_engine
 
 class VADRealtimeClient(RealtimeOpenAIClient):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, vad_engine='webrtc', vad_options=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.vad = webrtcvad.Vad(2)  # Medium aggressiveness
         self.fs = 24000
         self.frame_duration_ms = 30
+        # webrtcvad only accepts 8/16/32/48 kHz, so 24kHz frames are resampled to 16kHz first
+        self.vad = create_vad_engine(vad_engine, frame_duration_ms=self.frame_duration_ms, **(vad_options or {}))
+        self.vad_frames = VADFrameResampler(self.fs, self.frame_duration_ms)
         self.frame_size = int(self.fs * self.frame_duration_ms / 1000)
         self.is_listening = False
         
@@ -21,11 +25,13 @@ class VADRealtimeClient(RealtimeOpenAIClient):
         """
         print("🎤 เริ่มฟังเสียง (พูดได้เลย)...")
         
-        audio_buffer = b''
+        audio_buffer = CaptureBuffer(max_duration, self.fs)
         last_speech_time = time.time()
+        self.vad_frames.reset()
+        self.vad.reset()
         
         def audio_callback(indata, frames, time_info, status):
-            nonlocal audio_buffer, last_speech_time
+            nonlocal last_speech_time
             
             if status:
                 print(f"Audio status: {status}")
@@ -34,18 +40,16 @@ class VADRealtimeClient(RealtimeOpenAIClient):
             audio_bytes = (indata * 32767).astype(np.int16).tobytes()
             
             # Process each frame
-            for i in range(0, len(audio_bytes), self.frame_size * 2):
-                frame = audio_bytes[i:i + self.frame_size * 2]
-                if len(frame) == self.frame_size * 2:
-                    is_speech = self.vad.is_speech(frame, self.fs)
-                    
-                    if is_speech:
-                        audio_buffer += frame
-                        last_speech_time = time.time()
-                        print("🔊 กำลังฟัง...", end="\r")
-                    elif time.time() - last_speech_time > 1.0:  # 1 second silence
-                        print("\n🔇 หยุดฟัง (ไม่พบเสียงพูด)")
-                        return False  # Stop recording
+            for frame, frame_16k in self.vad_frames.process(audio_bytes):
+                is_speech = self.vad.is_speech(frame_16k, VADFrameResampler.VAD_FS)
+                
+                audio_buffer.push(frame, is_speech)
+                if is_speech:
+                    last_speech_time = time.time()
+                    print("🔊 กำลังฟัง...", end="\r")
+                elif time.time() - last_speech_time > 1.0:  # 1 second silence
+                    print("\n🔇 หยุดฟัง (ไม่พบเสียงพูด)")
+                    return False  # Stop recording
         
         try:
             with sd.InputStream(
@@ -64,8 +68,8 @@ class VADRealtimeClient(RealtimeOpenAIClient):
             return None
             
         if audio_buffer:
-            print(f"✅ อัดเสียงเสร็จแล้ว ({len(audio_buffer)/self.fs/2:.1f}s)")
-            return audio_buffer
+            print(f"✅ อัดเสียงเสร็จแล้ว ({audio_buffer.duration:.1f}s)")
+            return audio_buffer.pcm()
         else:
             print("❌ ไม่พบเสียงพูด")
             return None
@@ -78,7 +82,7 @@ class VADRealtimeClient(RealtimeOpenAIClient):
         
         if audio_data:
             # Convert to base64
-            base64_audio = base64.b64encode(audio_data).decode('utf-8')
+            base64_audio = pcm16_to_base64(audio_data)
             
             # Send to AI
             self.response_done_event.clear()
@@ -0,0 +1,282 @@
+"""
+Pluggable voice activity detection engines.
+
+Every engine takes 16 kHz PCM16 frames (10/20/30 ms) and returns a speech
+decision, smoothed with optional min-speech (onset) and hangover (release)
+settings. `is_speech(frame, sample_rate)` keeps webrtcvad's call signature so
+engines drop into the existing recorder loops.
+
+    webrtc  - webrtcvad, one frame per call (imported with the first engine, so
+              the energy engine does not need it installed)
+    energy  - NumPy log-energy + speech-band ratio with an adaptive noise floor;
+              BatchEnergyVAD scores frames from many sessions in one call, and
+              EnergyVADBatcher gathers them from the sessions of one worker
+"""
+
+import abc
+import asyncio
+
+import numpy as np
+
+VAD_SAMPLE_RATE = 16000
+
+
+class DecisionSmoother:
+    """
+    Vectorized onset/hangover smoothing for N independent streams.
+    A stream enters speech after `min_speech_frames` consecutive raw speech
+    frames and leaves it after `hangover_frames` consecutive non-speech frames.
+    """
+    def __init__(self, size=1, min_speech_frames=1, hangover_frames=0):
+        self.min_speech_frames = max(1, int(min_speech_frames))
+        self.hangover_frames = max(0, int(hangover_frames))
+        self._run = np.zeros(size, dtype=np.int32)    # consecutive raw speech frames
+        self._hang = np.zeros(size, dtype=np.int32)   # hangover frames left
+        self._active = np.zeros(size, dtype=bool)
+
+    def reset(self, index=None):
+        target = slice(None) if index is None else index
+        self._run[target] = 0
+        self._hang[target] = 0
+        self._active[target] = False
+
+    def update(self, raw, index=None):
+        """raw: bool array of raw decisions for `index` (all streams when None)."""
+        target = slice(None) if index is None else index
+        raw = np.asarray(raw, dtype=bool)
+        was_active = self._active[target]
+        hang_left = self._hang[target]
+        run = np.where(raw, self._run[target] + 1, 0)
+        active = np.where(raw, was_active | (run >= self.min_speech_frames), was_active & (hang_left > 0))
+        hang = np.where(raw & active, self.hangover_frames, np.where(raw, hang_left, np.maximum(hang_left - 1, 0)))
+        self._run[target] = run
+        self._hang[target] = hang
+        self._active[target] = active
+        return active
+
+
+class VADEngine(abc.ABC):
+    """Base class: subclasses implement classify() (raw decision for one 16 kHz frame)."""
+    name = 'base'
+
+    def __init__(self, frame_duration_ms=30, min_speech_ms=0, hangover_ms=0):
+        self.frame_duration_ms = frame_duration_ms
+        self.smoother = DecisionSmoother(
+            1,
+            min_speech_frames=int(np.ceil(min_speech_ms / frame_duration_ms)),
+            hangover_frames=int(np.ceil(hangover_ms / frame_duration_ms)),
+        )
+
+    @abc.abstractmethod
+    def classify(self, frame: bytes) -> bool:
+        """Raw (unsmoothed) decision for one frame."""
+
+    def is_speech(self, frame: bytes, sample_rate: int = VAD_SAMPLE_RATE) -> bool:
+        if sample_rate != VAD_SAMPLE_RATE:
+            raise ValueError(f"VAD engines expect {VAD_SAMPLE_RATE} Hz frames, got {sample_rate}")
+        return self.smooth(self.classify(frame))
+
+    def smooth(self, raw: bool) -> bool:
+        """Smoothed decision for the next frame given its raw one (classified elsewhere, e.g. in a batch)."""
+        return bool(self.smoother.update([raw])[0])
+
+    def reset(self):
+        self.smoother.reset()
+
+    def close(self):
+        pass
+
+
+class WebRTCVADEngine(VADEngine):
+    name = 'webrtc'
+
+    def __init__(self, aggressiveness=2, **kwargs):
+        import webrtcvad
+        super().__init__(**kwargs)
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def classify(self, frame: bytes) -> bool:
+        return self.vad.is_speech(frame, VAD_SAMPLE_RATE)
+
+
+class BatchEnergyVAD:
+    """
+    Energy/spectral detector that scores frames from many sessions per call.
+
+    Each session owns a slot with its own adaptive noise floor and smoothing
+    state. `process(frames, slots)` takes a 2-D int16 array (one row per frame)
+    and the slot of each row, so one worker can score N sessions per tick.
+    A frame is raw speech when its log energy is `threshold_db` above the
+    slot's noise floor (and above `min_energy_db`) and at least
+    `min_band_ratio` of its energy lies in the 300-3400 Hz speech band.
+    """
+    def __init__(self, max_sessions=1024, frame_duration_ms=30, threshold_db=9.0, min_energy_db=-55.0,
+                 min_band_ratio=0.5, floor_adapt=0.05, min_speech_ms=0, hangover_ms=0):
+        self.frame_size = VAD_SAMPLE_RATE * frame_duration_ms // 1000
+        self.max_sessions = max_sessions
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.min_band_ratio = min_band_ratio
+        self.floor_adapt = floor_adapt
+
+        freqs = np.fft.rfftfreq(self.frame_size, 1.0 / VAD_SAMPLE_RATE)
+        self._band = (freqs >= 300) & (freqs <= 3400)
+        self._window = np.hanning(self.frame_size).astype(np.float32)
+
+        self._floor = np.full(max_sessions, np.nan)
+        self._free = list(range(max_sessions - 1, -1, -1))
+        self.smoother = DecisionSmoother(
+            max_sessions,
+            min_speech_frames=int(np.ceil(min_speech_ms / frame_duration_ms)),
+            hangover_frames=int(np.ceil(hangover_ms / frame_duration_ms)),
+        )
+
+    def allocate(self) -> int:
+        if not self._free:
+            raise RuntimeError("BatchEnergyVAD: no free session slots")
+        slot = self._free.pop()
+        self.reset(slot)
+        return slot
+
+    def reset(self, slot: int):
+        """Forget the slot's noise floor and smoothing state (a new utterance or session)."""
+        self._floor[slot] = np.nan
+        self.smoother.reset(slot)
+
+    def release(self, slot: int):
+        self._free.append(slot)
+
+    @property
+    def sessions(self):
+        """Slots in use"""
+        return self.max_sessions - len(self._free)
+
+    def classify(self, frames, slots):
+        """Raw (unsmoothed) decisions for a (N, frame_size) int16 array."""
+        slots = np.asarray(slots)
+        x = np.asarray(frames, dtype=np.float32) / 32768.0
+        energy_db = 10 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+        spectrum = np.abs(np.fft.rfft(x * self._window, axis=1)) ** 2
+        band_ratio = spectrum[:, self._band].sum(axis=1) / (spectrum.sum(axis=1) + 1e-12)
+
+        floor = self._floor[slots]
+        floor = np.where(np.isnan(floor), energy_db, floor)
+        raw = (energy_db > floor + self.threshold_db) & (energy_db > self.min_energy_db) \
+            & (band_ratio >= self.min_band_ratio)
+
+        # Noise floor: drops immediately to quieter frames, rises slowly on non-speech frames
+        rising = floor + self.floor_adapt * (energy_db - floor)
+        self._floor[slots] = np.where(energy_db < floor, energy_db, np.where(raw, floor, rising))
+        return raw
+
+    def process(self, frames, slots):
+        """Smoothed decisions for a (N, frame_size) int16 array, one row per slot."""
+        return self.smoother.update(self.classify(frames, slots), np.asarray(slots))
+
+
+class EnergyVADEngine(VADEngine):
+    """Single-session view onto a (possibly shared) BatchEnergyVAD slot."""
+    name = 'energy'
+
+    def __init__(self, batch=None, **kwargs):
+        super().__init__(**kwargs)
+        self.batch = batch or BatchEnergyVAD(max_sessions=1, frame_duration_ms=self.frame_duration_ms)
+        self.slot = self.batch.allocate()
+        self.closed = False
+
+    def classify(self, frame: bytes) -> bool:
+        samples = np.frombuffer(frame, dtype=np.int16)[None, :]
+        return bool(self.batch.classify(samples, [self.slot])[0])
+
+    def reset(self):
+        super().reset()
+        self.batch.reset(self.slot)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.batch.release(self.slot)
+
+
+class EnergyVADBatcher:
+    """
+    One BatchEnergyVAD per worker, shared by its stream sessions: the frames that
+    every session submits within one event loop tick are scored together.
+
+    A session's frames depend on each other (each updates the slot's noise floor
+    for the next), so the tick's frames go in rounds - the first frame of every
+    session, then the second, ... - one classify() call each. A 100 ms browser
+    chunk holds 3-4 frames, so N sessions that submit in the same tick cost 3-4
+    calls instead of ~4N.
+    Decisions are smoothed by each session's own engine.
+    """
+    def __init__(self, max_sessions=1024, frame_duration_ms=30, **options):
+        self.batch = BatchEnergyVAD(max_sessions=max_sessions, frame_duration_ms=frame_duration_ms, **options)
+        self._pending = []  # (engine, 16 kHz frames, future) submitted this tick
+        self.ticks = 0
+        self.calls = 0
+        self.frames = 0
+
+    async def is_speech(self, engine, frames):
+        """Smoothed decisions for `engine`'s frames (an EnergyVADEngine on this batch), in order."""
+        if not frames:
+            return []
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            # Runs after every task that is already ready this tick has submitted its frames
+            loop.call_soon(self._flush)
+        self._pending.append((engine, frames, future))
+        return [engine.smooth(raw) for raw in await future]
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        # A session stopped while it waited may have handed its slot to another one
+        live = [(engine, frames, future) for engine, frames, future in pending if not engine.closed]
+        for engine, frames, future in pending:
+            if engine.closed and not future.done():
+                future.set_result([False] * len(frames))
+        try:
+            raw = [[] for _ in live]
+            for j in range(max((len(frames) for _, frames, _ in live), default=0)):
+                rows = [i for i, (_, frames, _) in enumerate(live) if j < len(frames)]
+                samples = np.frombuffer(b''.join(live[i][1][j] for i in rows), dtype=np.int16)
+                decisions = self.batch.classify(samples.reshape(len(rows), self.batch.frame_size),
+                                                [live[i][0].slot for i in rows])
+                for i, decision in zip(rows, decisions):
+                    raw[i].append(bool(decision))
+                self.calls += 1
+                self.frames += len(rows)
+            self.ticks += 1
+        except Exception as e:
+            for _, _, future in live:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), decisions in zip(live, raw):
+            if not future.done():
+                future.set_result(decisions)
+
+    def stats(self):
+        return {
+            "sessions": self.batch.sessions,
+            "ticks": self.ticks,
+            "classify_calls": self.calls,
+            "frames": self.frames,
+            "frames_per_call": round(self.frames / self.calls, 1) if self.calls else None,
+        }
+
+
+VAD_ENGINES = {
+    WebRTCVADEngine.name: WebRTCVADEngine,
+    EnergyVADEngine.name: EnergyVADEngine,
+}
+
+
+def create_vad_engine(name='webrtc', **kwargs) -> VADEngine:
+    """Build a VAD engine by name ('webrtc' or 'energy')."""
+    try:
+        engine_class = VAD_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown VAD engine: {name} (choose from {', '.join(VAD_ENGINES)})")
+    return engine_class(**kwargs)
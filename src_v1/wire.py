@@ -0,0 +1,35 @@
+"""
+Binary WebSocket framing for audio between the browser and the server.
+
+Negotiated per connection with ``/ws/{client_id}?protocol=binary``; JSON stays in
+use for control messages. Every binary frame is an 8-byte little-endian header
+followed by mono audio in the connection's codec (PCM16 unless ?codec= says otherwise):
+
+    uint8  frame type   (FRAME_AUDIO_OUT / FRAME_AUDIO_IN)
+    uint8  flags        (reserved, 0)
+    uint16 turn id      (wraps at 65536)
+    uint32 sequence     (per direction, per connection)
+"""
+
+import struct
+
+HEADER = struct.Struct('<BBHI')
+HEADER_SIZE = HEADER.size
+
+FRAME_AUDIO_OUT = 1  # server -> browser: assistant audio
+FRAME_AUDIO_IN = 2   # browser -> server: microphone audio
+
+PROTOCOL_JSON = 'json'
+PROTOCOL_BINARY = 'binary'
+
+
+def pack_frame(frame_type: int, turn_id: int, seq: int, payload, flags: int = 0) -> bytes:
+    return HEADER.pack(frame_type, flags, turn_id & 0xFFFF, seq & 0xFFFFFFFF) + payload
+
+
+def unpack_frame(data):
+    """Split a binary frame into (frame_type, flags, turn_id, seq, payload memoryview)."""
+    if len(data) < HEADER_SIZE:
+        raise ValueError(f"Binary frame shorter than {HEADER_SIZE}-byte header")
+    frame_type, flags, turn_id, seq = HEADER.unpack_from(data)
+    return frame_type, flags, turn_id, seq, memoryview(data)[HEADER_SIZE:]